@@ -33,6 +33,18 @@ for i in range(N):
 print((time.time() - t) / N * 1e9, 'ns')
 
 
+import numpy as np
+N = 1000000
+indices = np.stack([np.arange(N) & 7] * 2, axis=1)
+t = time.time()
+x.scatter(indices, 1.0)
+print((time.time() - t) / N * 1e9, 'ns (scatter)')
+
+t = time.time()
+a = x.gather(indices).sum()
+print((time.time() - t) / N * 1e9, 'ns (gather)')
+
+
 t = time.time()
 N = 1000000
 a = 0
@@ -51,6 +51,26 @@ def Tape(loss, clear_gradients=True):
   loss.grad[None] = 1
   return runtime.get_tape(loss)
 
+def memory_report(verbose=True):
+  get_runtime().materialize()
+  prog = core.get_current_program()
+  fields = ['snode_id', 'type', 'num_bytes', 'node_size', 'num_active_nodes',
+            'max_num_nodes', 'element_list_size', 'element_list_max_size',
+            'element_list_capacity']
+  stats = []
+  for stat in prog.get_memory_stats():
+    stats.append({f: getattr(stat, f) for f in fields})
+  if verbose:
+    header = ['snode', 'type', 'bytes', 'node size', 'active', 'peak',
+              'list', 'list peak', 'list cap']
+    print(''.join('{:>12}'.format(h) for h in header))
+    for stat in stats:
+      print(''.join('{:>12}'.format(stat[f]) for f in fields))
+    print('{} bytes in nodes, {} bytes of address space reserved'.format(
+        sum(stat['num_bytes'] for stat in stats),
+        prog.get_total_requested_memory()))
+  return stats
+
 def clear_all_gradients():
   get_runtime().materialize()
   core.get_current_program().clear_all_gradients()
@@ -0,0 +1,148 @@
+import ctypes
+import numpy as np
+
+# DLPack (https://github.com/dmlc/dlpack) tensors are exchanged as PyCapsules
+# named 'dltensor' that point to a DLManagedTensor. A consumer renames the
+# capsule to 'used_dltensor' and calls the deleter when it is done.
+
+kDLCPU = 1
+kDLGPU = 2
+kDLCPUPinned = 3
+
+_dtype_codes = {'i': 0, 'u': 1, 'f': 2}
+
+
+class DLContext(ctypes.Structure):
+  _fields_ = [('device_type', ctypes.c_int), ('device_id', ctypes.c_int)]
+
+
+class DLDataType(ctypes.Structure):
+  _fields_ = [('code', ctypes.c_uint8), ('bits', ctypes.c_uint8),
+              ('lanes', ctypes.c_uint16)]
+
+
+class DLTensor(ctypes.Structure):
+  _fields_ = [('data', ctypes.c_void_p), ('ctx', DLContext),
+              ('ndim', ctypes.c_int), ('dtype', DLDataType),
+              ('shape', ctypes.POINTER(ctypes.c_int64)),
+              ('strides', ctypes.POINTER(ctypes.c_int64)),
+              ('byte_offset', ctypes.c_uint64)]
+
+
+DLDeleter = ctypes.CFUNCTYPE(None, ctypes.c_void_p)
+
+
+class DLManagedTensor(ctypes.Structure):
+  _fields_ = [('dl_tensor', DLTensor), ('manager_ctx', ctypes.c_void_p),
+              ('deleter', DLDeleter)]
+
+
+def _capsule_api(name, restype, *argtypes):
+  return ctypes.PYFUNCTYPE(restype, *argtypes)((name, ctypes.pythonapi))
+
+
+_capsule_get_pointer = _capsule_api('PyCapsule_GetPointer', ctypes.c_void_p,
+                                    ctypes.py_object, ctypes.c_char_p)
+_capsule_set_name = _capsule_api('PyCapsule_SetName', ctypes.c_int,
+                                 ctypes.py_object, ctypes.c_char_p)
+_CapsuleDestructor = ctypes.CFUNCTYPE(None, ctypes.c_void_p)
+_capsule_new = _capsule_api('PyCapsule_New', ctypes.py_object,
+                            ctypes.c_void_p, ctypes.c_char_p,
+                            _CapsuleDestructor)
+# The destructor receives a capsule that is being destroyed, which must not
+# be turned back into a Python object
+_raw_capsule_is_valid = _capsule_api('PyCapsule_IsValid', ctypes.c_int,
+                                     ctypes.c_void_p, ctypes.c_char_p)
+_raw_capsule_get_pointer = _capsule_api('PyCapsule_GetPointer',
+                                        ctypes.c_void_p, ctypes.c_void_p,
+                                        ctypes.c_char_p)
+
+
+def compact_strides(shape):
+  # The strides (in elements) of a compact row-major array
+  strides = []
+  stride = 1
+  for n in reversed(shape):
+    strides.insert(0, stride)
+    stride *= n
+  return tuple(strides)
+
+
+class DLPackArray:
+  """An array imported from an object that implements __dlpack__.
+
+  The producer's memory is kept alive until this object is destroyed.
+  Strides are in elements, as in DLPack.
+  """
+
+  def __init__(self, obj):
+    capsule = obj.__dlpack__()
+    self.managed = ctypes.cast(
+        _capsule_get_pointer(capsule, b'dltensor'),
+        ctypes.POINTER(DLManagedTensor))
+    _capsule_set_name(capsule, b'used_dltensor')
+    tensor = self.managed.contents.dl_tensor
+    dtype = tensor.dtype
+    kinds = {code: kind for kind, code in _dtype_codes.items()}
+    assert dtype.code in kinds and dtype.lanes == 1, \
+      'Unsupported DLPack dtype (code={}, bits={}, lanes={})'.format(
+          dtype.code, dtype.bits, dtype.lanes)
+    self.dtype = np.dtype('{}{}'.format(kinds[dtype.code], dtype.bits // 8))
+    self.itemsize = self.dtype.itemsize
+    self.shape = tuple(tensor.shape[i] for i in range(tensor.ndim))
+    if tensor.strides:
+      self.strides = tuple(tensor.strides[i] for i in range(tensor.ndim))
+    else:
+      self.strides = compact_strides(self.shape)
+    self.device_type = tensor.ctx.device_type
+    self.data = (tensor.data or 0) + tensor.byte_offset
+
+  def __del__(self):
+    if not hasattr(self, 'managed'):
+      return
+    deleter = self.managed.contents.deleter
+    if deleter:
+      deleter(ctypes.cast(self.managed, ctypes.c_void_p))
+
+
+# Exported tensors and the objects they keep alive, by DLManagedTensor address
+_exported = {}
+
+
+@DLDeleter
+def _release(managed):
+  _exported.pop(managed, None)
+
+
+@_CapsuleDestructor
+def _destroy_capsule(capsule):
+  # Capsules that were never consumed still own their tensor
+  if _raw_capsule_is_valid(capsule, b'dltensor'):
+    _release(_raw_capsule_get_pointer(capsule, b'dltensor'))
+
+
+def to_dlpack(address, shape, strides, dtype, owner=None):
+  """Returns a DLPack capsule of a CPU array.
+
+  `strides` are in bytes and must be multiples of the item size. `owner` is
+  kept alive until the consumer releases the tensor.
+  """
+  dtype = np.dtype(dtype)
+  assert all(s % dtype.itemsize == 0 for s in strides)
+  ndim = len(shape)
+  shape_buffer = (ctypes.c_int64 * ndim)(*shape)
+  strides_buffer = (ctypes.c_int64 * ndim)(
+      *[s // dtype.itemsize for s in strides])
+  managed = DLManagedTensor()
+  tensor = managed.dl_tensor
+  tensor.data = address
+  tensor.ctx = DLContext(kDLCPU, 0)
+  tensor.ndim = ndim
+  tensor.dtype = DLDataType(_dtype_codes[dtype.kind], dtype.itemsize * 8, 1)
+  tensor.shape = shape_buffer
+  tensor.strides = strides_buffer
+  tensor.byte_offset = 0
+  managed.deleter = _release
+  _exported[ctypes.addressof(managed)] = (managed, shape_buffer,
+                                          strides_buffer, owner)
+  return _capsule_new(ctypes.addressof(managed), b'dltensor', _destroy_capsule)
@@ -12,8 +12,6 @@ class Expr:
     self.getter = None
     self.setter = None
     self.tb = tb
-    self.from_torch_ = None
-    self.to_torch_ = None
     if len(args) == 1:
       if isinstance(args[0], taichi_lang_core.Expr):
         self.ptr = args[0]
@@ -289,6 +287,100 @@ class Expr:
     tensor_to_numpy(self, arr)
     return arr
 
+  def _batch_indices(self, indices):
+    import numpy as np
+    indices = np.asarray(indices)
+    if indices.ndim == 1 and self.dim() == 1:
+      indices = indices.reshape(-1, 1)
+    assert indices.ndim == 2 and indices.shape[1] == self.dim(), \
+      'Expected indices of shape (n, {})'.format(self.dim())
+    # Checked before the conversion to i32, which could wrap them
+    shape = np.array(self.shape())
+    assert not (np.any(indices < 0) or np.any(indices >= shape)), \
+      'Indices out of the bounds of the tensor (shape {})'.format(
+        tuple(shape))
+    return np.ascontiguousarray(indices, dtype=np.int32)
+
+  def gather(self, indices):
+    from .meta import tensor_gather
+    import numpy as np
+    indices = self._batch_indices(indices)
+    n = indices.shape[0]
+    values = np.empty(n, dtype=to_numpy_type(self.snode().data_type()))
+    if n > 0:
+      tensor_gather(self, indices, values, n)
+    return values
+
+  def scatter(self, indices, values):
+    from .meta import tensor_scatter
+    import numpy as np
+    indices = self._batch_indices(indices)
+    n = indices.shape[0]
+    values = np.ascontiguousarray(
+        np.broadcast_to(values, (n, )),
+        dtype=to_numpy_type(self.snode().data_type()))
+    if n > 0:
+      tensor_scatter(self, indices, values, n)
+
+  def _dense_layout(self, api):
+    # Returns the address, shape, byte strides and dtype of a dense tensor
+    import numpy as np
+    if not Expr.layout_materialized:
+      self.materialize_layout_callback()
+    prog = taichi_lang_core.get_current_program()
+    assert prog.config.use_llvm and \
+           prog.config.arch == taichi_lang_core.Arch.x86_64, \
+      '{}() is only supported by the LLVM x86_64 backend'.format(api)
+    dt = self.snode().data_type()
+    assert dt in [f32, f64, i32, i64], \
+      '{}() does not support tensors of type {}'.format(
+          api, taichi_lang_core.data_type_name(dt))
+    offset, strides = self.snode().ptr.get_dense_layout()
+    dtype = np.dtype(to_numpy_type(dt))
+    address = prog.get_data_structure_address() + offset
+    return address, self.shape(), tuple(strides), dtype
+
+  @staticmethod
+  def _program_buffer(address, shape, strides, dtype):
+    # A buffer over the memory of the program, which holds a reference to the
+    # program. ti.reset() fails while such buffers are alive, since it frees
+    # the memory.
+    import ctypes
+    from .impl import get_runtime
+    size = dtype.itemsize + sum((n - 1) * s for n, s in zip(shape, strides))
+
+    class ProgramBuffer(ctypes.c_char * size):
+      pass
+
+    buffer = ProgramBuffer.from_address(address)
+    runtime = get_runtime()
+    buffer.prog = runtime.prog
+    runtime.exported_buffers.add(buffer)
+    return buffer
+
+  def numpy_view(self):
+    import numpy as np
+    address, shape, strides, dtype = self._dense_layout('numpy_view')
+    # The array keeps the buffer alive through its base
+    buffer = Expr._program_buffer(address, shape, strides, dtype)
+    return np.ndarray(shape=shape, dtype=dtype, buffer=buffer,
+                      strides=strides)
+
+  def to_dlpack(self):
+    from .dlpack import to_dlpack
+    address, shape, strides, dtype = self._dense_layout('to_dlpack')
+    # The buffer is kept alive until the consumer releases the tensor
+    buffer = Expr._program_buffer(address, shape, strides, dtype)
+    return to_dlpack(address, shape, strides, dtype, owner=buffer)
+
+  # The DLPack protocol, e.g. for np.from_dlpack(x) and torch.from_dlpack(x)
+  def __dlpack__(self, stream=None, **kwargs):
+    return self.to_dlpack()
+
+  def __dlpack_device__(self):
+    from .dlpack import kDLCPU
+    return kDLCPU, 0
+
   def from_numpy(self, arr):
     assert self.dim() == len(arr.shape)
     s = self.shape()
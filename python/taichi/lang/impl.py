@@ -1,4 +1,5 @@
 import inspect
+import weakref
 from .core import taichi_lang_core
 from .expr import Expr
 from .snode import SNode
@@ -39,8 +40,15 @@ def subscript(value, *indices):
     assert len(indices) == 1
     return value[indices[0]]
 
-  if len(indices) == 1 and is_taichi_class(indices[0]):
-    indices = indices[0].entries
+  # Vector indices are expanded in place, e.g. arr[I, p] for a grouped I
+  if any(is_taichi_class(i) for i in indices):
+    flattened = []
+    for i in indices:
+      if is_taichi_class(i):
+        flattened += i.entries
+      else:
+        flattened.append(i)
+    indices = tuple(flattened)
   if is_taichi_class(value):
     return value.subscript(*indices)
   else:
@@ -66,8 +74,11 @@ class PyTaichi:
     self.default_fp = f32
     self.default_ip = i32
     self.target_tape = None
+    self.target_launch_graph = None
     self.inside_complex_kernel = False
     self.kernels = kernels
+    # Buffers over the memory of prog, see Expr.numpy_view()
+    self.exported_buffers = weakref.WeakSet()
     Expr.materialize_layout_callback = self.materialize
   
   def set_default_fp(self, fp):
@@ -134,6 +145,11 @@ def make_constant_expr(val):
 def reset():
   global pytaichi
   global root
+  # Checked before any state is touched, so that a failed reset leaves the
+  # program usable
+  assert len(pytaichi.exported_buffers) == 0, \
+    'Arrays returned by numpy_view() or to_dlpack() are still alive. ' \
+    'Delete them before ti.reset(), which frees their memory.'
   old_kernels = pytaichi.kernels
   pytaichi.clear()
   pytaichi = PyTaichi(old_kernels)
@@ -141,6 +157,8 @@ def reset():
     k.reset()
   taichi_lang_core.reset_default_compile_config()
   root = SNode(taichi_lang_core.get_root())
+  from .kernel import transformed_code_cache
+  transformed_code_cache.clear()
 
 
 def inside_kernel():
@@ -192,6 +210,27 @@ def ti_print(var):
   taichi_lang_core.print_(Expr(var).ptr, arg_name)
 
 
+def kernel_return(value, ret_type):
+  # Each component is stored in an argument slot after the kernel arguments,
+  # which the host reads after the launch
+  from .matrix import Matrix
+  assert current_cfg().use_llvm, 'Kernel return values require the LLVM backends'
+  if isinstance(ret_type, (tuple, list)):
+    if isinstance(value, Matrix):
+      value = value.entries
+    assert isinstance(value, (tuple, list)) and len(value) == len(ret_type), \
+      'Kernels returning {} values must return a vector or tuple of {} elements'.format(
+          len(ret_type), len(ret_type))
+  else:
+    value, ret_type = [value], [ret_type]
+  for dt, v in zip(ret_type, value):
+    ret = taichi_lang_core.decl_ret(dt)
+    assert ret < taichi_lang_core.get_max_num_args(), \
+      'Kernels can have at most {} arguments and return values'.format(
+          taichi_lang_core.get_max_num_args())
+    taichi_lang_core.insert_arg_store(ret, Expr(v).ptr)
+
+
 def ti_int(var):
   if hasattr(var, '__ti_int__'):
     return var.__ti_int__()
@@ -235,5 +274,6 @@ def default_cfg():
   return taichi_lang_core.default_compile_config()
 
 from .kernel import *
+from .launch_graph import capture
 from .ops import *
 from .kernel_arguments import *
@@ -1,8 +1,10 @@
 import inspect
+import warnings
 from .transformer import ASTTransformer
 import ast
 from .kernel_arguments import *
 from .util import *
+from . import dlpack
 
 def remove_indent(lines):
   lines = lines.split('\n')
@@ -22,31 +24,55 @@ def remove_indent(lines):
 
   return '\n'.join(cleaned)
 
-# The ti.func decorator
+# Compiled code of transformed functions, keyed by the identities of the code
+# object and annotations of the original function, and the argument features
+# the transform depends on. Each entry holds references to the objects whose
+# ids are in its key, so that the ids are not reused. Cleared by ti.reset().
+transformed_code_cache = {}
 
-def func(foo):
+
+def get_transformed_code(func, features, create_transformer):
+  annotations = tuple(func.__annotations__.items())
+  key = (id(func.__code__),
+         tuple((name, id(a)) for name, a in annotations), features)
+  if key in transformed_code_cache:
+    return transformed_code_cache[key][2]
   from .impl import get_runtime
-  src = remove_indent(inspect.getsource(foo))
+  src = remove_indent(inspect.getsource(func))
   tree = ast.parse(src)
-  
+  if get_runtime().print_preprocessed:
+    import astor
+    print('Before preprocessing:')
+    print(astor.to_source(tree.body[0]))
+
   func_body = tree.body[0]
   func_body.decorator_list = []
-  
-  visitor = ASTTransformer(transform_args=False)
+
+  visitor = create_transformer()
   visitor.visit(tree)
   ast.fix_missing_locations(tree)
-  
+
   if get_runtime().print_preprocessed:
     import astor
     print('After preprocessing:')
     print(astor.to_source(tree.body[0], indent_with='  '))
-  
-  ast.increment_lineno(tree, inspect.getsourcelines(foo)[1] - 1)
-  
+
+  ast.increment_lineno(tree, inspect.getsourcelines(func)[1] - 1)
+
+  code = compile(tree, filename=inspect.getsourcefile(func), mode='exec')
+  transformed_code_cache[key] = (func.__code__, annotations, code)
+  return code
+
+# The ti.func decorator
+
+def func(foo):
+  code = get_transformed_code(
+    foo, 'func', lambda: ASTTransformer(transform_args=False))
+
   frame = inspect.currentframe().f_back
-  exec(compile(tree, filename=inspect.getsourcefile(foo), mode='exec'),
-       dict(frame.f_globals, **frame.f_locals), locals())
-  compiled = locals()[foo.__name__]
+  local_vars = {}
+  exec(code, dict(frame.f_globals, **frame.f_locals), local_vars)
+  compiled = local_vars[foo.__name__]
   return compiled
 
 
@@ -56,17 +82,17 @@ class KernelTemplateMapper:
     self.num_args = len(annotations)
     self.template_slot_locations = template_slot_locations
     self.mapping = {}
+    self.extractors = [(i, a.extract) for i, a in enumerate(annotations)
+                       if hasattr(a, 'extract')]
 
   def extract(self, args):
-    extracted = []
-    for i in range(self.num_args):
-      if hasattr(self.annotations[i], 'extract'):
-        extracted.append(self.annotations[i].extract(args[i]))
-      else:
-        extracted.append(None)
+    extracted = [None] * self.num_args
+    for i, extract in self.extractors:
+      extracted[i] = extract(args[i])
     return tuple(extracted)
 
-  def lookup(self, args):
+  # Returns the instance id and the extracted argument features
+  def lookup_instance(self, args):
     if len(args) != self.num_args:
       raise Exception(f'{self.num_args} argument(s) needed but {len(args)} provided.')
 
@@ -74,7 +100,10 @@ class KernelTemplateMapper:
     if key not in self.mapping:
       count = len(self.mapping)
       self.mapping[key] = count
-    return self.mapping[key]
+    return self.mapping[key], key
+
+  def lookup(self, args):
+    return self.lookup_instance(args)[0]
 
 
 class KernelDefError(Exception):
@@ -101,7 +130,10 @@ class Kernel:
     self.is_grad = is_grad
     self.arguments = []
     self.argument_names = []
+    self.return_type = None
     self.classkernel = classkernel
+    # Set by meta.accessor for host-side tensor access helpers
+    self.is_accessor = False
     self.extract_arguments()
     self.template_slot_locations = []
     for i in range(len(self.arguments)):
@@ -122,6 +154,8 @@ class Kernel:
 
   def extract_arguments(self):
     sig = inspect.signature(self.func)
+    if sig.return_annotation is not inspect.Signature.empty:
+      self.return_type = sig.return_annotation
     params = sig.parameters
     arg_names = params.keys()
     for i, arg_name in enumerate(arg_names):
@@ -155,34 +189,25 @@ class Kernel:
     if not self.runtime.materialized:
       self.runtime.materialize()
     if key in self.compiled_functions:
-      return
+      return None
     grad_suffix = ""
     if self.is_grad:
       grad_suffix = "_grad"
     kernel_name = "{}_{}_{}".format(self.func.__name__, key[1], grad_suffix)
     print("Compiling kernel {}...".format(kernel_name))
 
-    src = remove_indent(inspect.getsource(self.func))
-    tree = ast.parse(src)
-    if self.runtime.print_preprocessed:
-      import astor
-      print('Before preprocessing:')
-      print(astor.to_source(tree.body[0]))
-
-    func_body = tree.body[0]
-    func_body.decorator_list = []
-
-    visitor = ASTTransformer(excluded_paremeters=self.template_slot_locations, func=self, arg_features=arg_features)
-
-    visitor.visit(tree)
-    ast.fix_missing_locations(tree)
-
-    if self.runtime.print_preprocessed:
-      import astor
-      print('After preprocessing:')
-      print(astor.to_source(tree.body[0], indent_with='  '))
-
-    ast.increment_lineno(tree, inspect.getsourcelines(self.func)[1] - 1)
+    # Only the features of non-template arguments (i.e. external array
+    # types) change the transformed AST. Template values are injected as
+    # globals below.
+    if arg_features is None:
+      arg_features = (None,) * len(self.arguments)
+    features = ('kernel', self.classkernel) + tuple(
+      f for i, f in enumerate(arg_features)
+      if i not in self.template_slot_locations)
+    code = get_transformed_code(
+      self.func, features,
+      lambda: ASTTransformer(excluded_paremeters=self.template_slot_locations,
+                             func=self, arg_features=arg_features))
 
     # Discussions: https://github.com/yuanming-hu/taichi/issues/282
     import copy
@@ -202,8 +227,7 @@ class Kernel:
 
 
     local_vars = {}
-    exec(compile(tree, filename=inspect.getsourcefile(self.func), mode='exec'),
-         global_vars, local_vars)
+    exec(code, global_vars, local_vars)
     compiled = local_vars[self.func.__name__]
 
     taichi_kernel = taichi_lang_core.create_kernel(kernel_name, self.is_grad)
@@ -216,76 +240,274 @@ class Kernel:
       self.runtime.inside_kernel = False
 
     taichi_kernel = taichi_kernel.define(taichi_ast_generator)
+    taichi_kernel.is_accessor = self.is_accessor
 
     assert key not in self.compiled_functions
-    self.compiled_functions[key] = self.get_function_body(taichi_kernel)
-
+    self.compiled_functions[key] = self.get_function_body(taichi_kernel,
+                                                          arg_features)
+    return taichi_kernel
+
+
+  def get_arg_setter(self, t_kernel, i, slot, feature):
+    needed = self.arguments[i]
+    if isinstance(needed, taichi_lang_core.DataType) and needed in [f32, f64]:
+      set_arg_float = t_kernel.set_arg_float
+
+      def set_float(v):
+        if type(v) is not float and type(v) is not int:
+          raise KernelArgError(i, needed, type(v))
+        set_arg_float(slot, float(v))
+
+      return set_float
+    elif isinstance(needed, taichi_lang_core.DataType) and needed in [i32, i64]:
+      set_arg_int = t_kernel.set_arg_int
+
+      def set_int(v):
+        if type(v) is not int:
+          raise KernelArgError(i, needed, type(v))
+        set_arg_int(slot, v)
+
+      return set_int
+    elif isinstance(needed, ext_arr):
+      set_arg_nparray = t_kernel.set_arg_nparray
+      set_extra_arg_int = t_kernel.set_extra_arg_int
+      # The array type, dtype and dimensionality are part of the instance key
+      dtype, dim = feature
+      ext_arr_dtype_name(dtype)  # Asserts that the dtype is supported
+      max_num_indices = taichi_lang_core.get_max_num_indices()
+      assert dim <= max_num_indices, "External array cannot have > {} indices".format(max_num_indices)
+      on_gpu = self.runtime.prog.config.arch == taichi_lang_core.Arch.gpu
+      # The legacy backends ignore strides and index arrays as if they were
+      # compact
+      use_llvm = self.runtime.prog.config.use_llvm
+      if isinstance(dtype, np.dtype):
+        def set_dlpack_array(v):
+          # Arrays of other libraries (e.g. CuPy and JAX) are imported
+          # through DLPack and accessed in place
+          v = dlpack.DLPackArray(v)
+          assert v.dtype == dtype, 'Expected a {} array'.format(dtype.name)
+          if on_gpu:
+            assert v.device_type == dlpack.kDLGPU, 'DLPack array on CPU yet taichi is on GPU'
+          else:
+            assert v.device_type in [dlpack.kDLCPU, dlpack.kDLCPUPinned], \
+              'DLPack array on GPU yet taichi is on CPU'
+          assert all(s >= 0 for s in v.strides), \
+            'DLPack arrays with negative strides are not supported'
+          assert use_llvm or v.strides == dlpack.compact_strides(v.shape), \
+            'Non-contiguous DLPack arrays require the LLVM backend'
+          span = 0
+          if all(n > 0 for n in v.shape):
+            span = v.itemsize * (
+                1 + sum((n - 1) * s for n, s in zip(v.shape, v.strides)))
+          set_arg_nparray(slot, v.data, span)
+          for j, s in enumerate(v.strides):
+            set_extra_arg_int(slot, j, s)
+          # Releases the producer's memory when dropped after the launch
+          return v
+
+        def set_nparray(v):
+          if not isinstance(v, np.ndarray):
+            return set_dlpack_array(v)
+          itemsize = v.itemsize
+          # Views are accessed in place through their strides. Only views
+          # with negative or unaligned strides (or any non-contiguous view on
+          # the legacy backends) are copied, and written back after the launch
+          # if writeable.
+          if not use_llvm or any(s < 0 or s % itemsize != 0 for s in v.strides):
+            v = np.ascontiguousarray(v)
+          # The bytes spanned by the elements, which are copied to the device
+          # on GPUs
+          span = 0
+          if v.size > 0:
+            span = itemsize + sum((n - 1) * s for n, s in zip(v.shape, v.strides))
+          set_arg_nparray(slot, v.ctypes.data, span)
+          for j, s in enumerate(v.strides):
+            set_extra_arg_int(slot, j, s // itemsize)
+          # The caller keeps the (possibly copied) array alive during the launch
+          return v
+
+        return set_nparray
+      else:
+        def set_torch_tensor(v):
+          if v.is_cuda:
+            assert on_gpu, 'Torch tensor on GPU yet taichi is on CPU'
+          else:
+            assert not on_gpu, 'Torch tensor on CPU yet taichi is on GPU'
+          assert use_llvm or v.is_contiguous(), \
+            'Non-contiguous torch tensors require the LLVM backend'
+          # Tensors are accessed in place through their strides
+          span = 0
+          if v.nelement() > 0:
+            span = v.element_size() * (
+                1 + sum((n - 1) * s for n, s in zip(v.shape, v.stride())))
+          set_arg_nparray(slot, v.data_ptr(), span)
+          for j, s in enumerate(v.stride()):
+            set_extra_arg_int(slot, j, s)
+          return v
+
+        return set_torch_tensor
+    else:
+      def set_unsupported(v):
+        assert False, 'Argument to kernels must have type float/int. If you are passing a PyTorch tensor, make sure it is on the same device (CPU/GPU) as taichi.'
+
+      return set_unsupported
+
+  def get_function_body(self, t_kernel, arg_features):
+    # The launch plan: argument setters are resolved once per instance
+    setters = []
+    actual_argument_slot = 0
+    for i, needed in enumerate(self.arguments):
+      if isinstance(needed, template):
+        continue
+      setters.append((i, self.get_arg_setter(t_kernel, i, actual_argument_slot,
+                                             arg_features[i])))
+      actual_argument_slot += 1
+    ext_arr_setters = [k for k, (i, _) in enumerate(setters)
+                       if isinstance(self.arguments[i], ext_arr)]
+    # Return values are stored in the argument slots after the arguments
+    ret_getters = []
+    ret_type = self.return_type
+    if ret_type is not None:
+      for dt in ret_type if isinstance(ret_type, (tuple, list)) else [ret_type]:
+        if dt in [f32, f64]:
+          ret_getters.append(t_kernel.get_ret_float)
+        else:
+          ret_getters.append(t_kernel.get_ret_int)
+    ret_slot = actual_argument_slot
+    return_tuple = isinstance(ret_type, (tuple, list))
+    num_args = len(self.arguments)
+    runtime = self.runtime
+    record_tape = not self.classkernel
 
-  def get_function_body(self, t_kernel):
     # The actual function body
     def func__(*args):
-      assert len(args) == len(
-        self.arguments), '{} arguments needed but {} provided'.format(
-        len(self.arguments), len(args))
-
-      actual_argument_slot = 0
-      for i, v in enumerate(args):
-        needed = self.arguments[i]
-        if isinstance(needed, template):
-          continue
-        provided = type(v)
-        if isinstance(needed, taichi_lang_core.DataType) and needed in [f32, f64]:
-          if type(v) not in [float, int]:
-            raise KernelArgError(i, needed, provided)
-          t_kernel.set_arg_float(actual_argument_slot, float(v))
-        elif isinstance(needed, taichi_lang_core.DataType) and needed in [i32, i64]:
-          if type(v) not in [int]:
-            raise KernelArgError(i, needed, provided)
-          t_kernel.set_arg_int(actual_argument_slot, int(v))
-        elif isinstance(needed, np.ndarray) or needed == np.ndarray or (isinstance(v, np.ndarray) and isinstance(needed, ext_arr)):
-          float32_types = [np.float32, np.int32, np.float64, np.int64]
-          assert v.dtype in float32_types, 'Kernel arg supports float/int 32/64 np arrays only'
-          tmp = np.ascontiguousarray(v)
-          t_kernel.set_arg_nparray(actual_argument_slot, int(tmp.ctypes.data), tmp.nbytes)
-          max_num_indices = taichi_lang_core.get_max_num_indices()
-          assert len(tmp.shape) <= max_num_indices, "External array cannot have > {} indices".format(max_num_indices)
-          for i, s in enumerate(tmp.shape):
-            t_kernel.set_extra_arg_int(actual_argument_slot, i, s)
-          # v[:] = tmp[:]
-        else:
-          has_torch = False
-          try:
-            import torch
-            has_torch = True
-          except:
-            pass
-
-          if has_torch and isinstance(v, torch.Tensor):
-            tmp = v
-            if str(v.device).startswith('cuda'):
-              assert self.runtime.prog.config.arch == taichi_lang_core.Arch.gpu, 'Torch tensor on GPU yet taichi is on CPU'
-            else:
-              assert self.runtime.prog.config.arch == taichi_lang_core.Arch.x86_64, 'Torch tensor on CPU yet taichi is on GPU'
-            t_kernel.set_arg_nparray(actual_argument_slot, int(tmp.data_ptr()),
-                                     tmp.element_size() * tmp.nelement())
-          else:
-            assert False, 'Argument to kernels must have type float/int. If you are passing a PyTorch tensor, make sure it is on the same device (CPU/GPU) as taichi.'
-        actual_argument_slot += 1
-      if not self.classkernel and self.runtime.target_tape and not self.runtime.inside_complex_kernel:
-        self.runtime.target_tape.insert(self, args)
+      assert len(args) == num_args, '{} arguments needed but {} provided'.format(
+        num_args, len(args))
+
+      arrays = [setter(args[i]) for i, setter in setters]
+      if record_tape and runtime.target_tape and not runtime.inside_complex_kernel:
+        runtime.target_tape.insert(self, args)
+      if runtime.target_launch_graph is not None:
+        for k in ext_arr_setters:
+          # Replays cannot write back copies
+          assert not (isinstance(arrays[k], np.ndarray) and
+                      arrays[k] is not args[setters[k][0]]), \
+            'Arrays with negative or unaligned strides cannot be captured'
+        runtime.target_launch_graph.arrays.append(arrays)
       t_kernel()
+      for k in ext_arr_setters:
+        i = setters[k][0]
+        if isinstance(arrays[k], np.ndarray) and arrays[k] is not args[i] \
+            and args[i].flags.writeable:
+          # Write back the copy of a view
+          args[i][...] = arrays[k]
+      del arrays
+      if ret_getters:
+        ret = tuple(get(ret_slot + j) for j, get in enumerate(ret_getters))
+        return ret if return_tuple else ret[0]
 
     return func__
 
 
   def __call__(self, *args, **kwargs):
     assert len(kwargs) == 0, 'kwargs not supported for Taichi kernels'
-    instance_id = self.mapper.lookup(args)
+    instance_id, arg_features = self.mapper.lookup_instance(args)
     key = (self.func, instance_id)
-    self.materialize(key=key, args=args, arg_features=self.mapper.extract(args))
+    if key not in self.compiled_functions:
+      self.materialize(key=key, args=args, arg_features=arg_features)
     return self.compiled_functions[key](*args)
 
 
+def precompile(kernels=(), templates=None, num_workers=None):
+  """Compiles kernel instances ahead of their first launch.
+
+  `kernels` lists kernels (or their `.grad`) without template or external
+  array arguments. `templates` maps a kernel to a list of argument tuples,
+  one per instance to compile; only the template and external array
+  arguments in them are used.
+
+  With `ti.cfg.offline_cache` on x86_64, the instances are compiled by
+  `num_workers` forked processes (default: one per CPU core) that fill the
+  offline cache, and this process then loads them from the cache. Forking
+  happens before the program (and its worker threads) is created, so
+  `precompile` must be called before the first kernel launch or tensor
+  access. Otherwise the instances are compiled here, one after another,
+  since the IR builder and the LLVM context are shared by the whole
+  program, and a warning says why.
+  """
+  from .impl import get_runtime
+  import os
+  runtime = get_runtime()
+
+  instances = []
+  for k in kernels:
+    assert not any(hasattr(a, 'extract') for a in k.arguments), \
+      'Kernel {} has template or external array arguments. Specify its instances in "templates".'.format(
+        k.func.__name__)
+    instances.append((k, (None,) * len(k.arguments)))
+  if templates is not None:
+    for k, arg_list in templates.items():
+      for args in arg_list:
+        instances.append((k, tuple(args)))
+
+  # Instance ids (and therefore kernel names, which are part of the cache key)
+  # are assigned before forking, so that all processes agree on them
+  pending = []
+  for k, args in instances:
+    instance_id, arg_features = k.mapper.lookup_instance(args)
+    key = (k.func, instance_id)
+    if key not in k.compiled_functions:
+      pending.append((k, args, key, arg_features))
+
+  def compile_instances(instances):
+    for k, args, key, arg_features in instances:
+      t_kernel = k.materialize(key=key, args=args, arg_features=arg_features)
+      if t_kernel is not None:
+        t_kernel.compile()
+
+  # The config of the program once it is materialized
+  config = taichi_lang_core.default_compile_config()
+  if num_workers is None:
+    num_workers = os.cpu_count() or 1
+  num_workers = min(num_workers, len(pending))
+  # Forking a process with live threads (e.g. the CPU thread pool of the
+  # program) is unsafe, so each worker materializes a program of its own
+  reason = None
+  if not config.offline_cache:
+    reason = 'ti.cfg.offline_cache is off'
+  elif config.arch != taichi_lang_core.Arch.x86_64:
+    reason = 'the arch is not x86_64'
+  elif not hasattr(os, 'fork'):
+    reason = 'os.fork() is unavailable'
+  elif runtime.materialized:
+    reason = 'it was called after the first kernel launch or tensor access'
+  if num_workers > 1 and reason is not None:
+    warnings.warn('ti.precompile() compiles {} instances serially, since '
+                  '{}'.format(len(pending), reason))
+  elif num_workers > 1:
+    pids = []
+    for w in range(num_workers):
+      pid = os.fork()
+      if pid == 0:
+        status = 0
+        try:
+          runtime.materialize()
+          compile_instances(pending[w::num_workers])
+        except BaseException:
+          import traceback
+          traceback.print_exc()
+          status = 1
+        # Skip interpreter and program teardown in the worker
+        os._exit(status)
+      pids.append(pid)
+    for pid in pids:
+      os.waitpid(pid, 0)
+
+  # Instances compiled by the workers are now hits in the offline cache
+  runtime.materialize()
+  compile_instances(pending)
+
+
 def kernel(foo):
   ret = Kernel(foo, False)
   ret.grad = Kernel(foo, True)
@@ -298,13 +520,14 @@ def classkernel(foo):
 
   def decorated(*args, __gradient=False, **kwargs):
     if __gradient:
-      adjoint(*args, **kwargs)
+      ret = adjoint(*args, **kwargs)
     else:
-      primal(*args, **kwargs)
+      ret = primal(*args, **kwargs)
 
     import taichi as ti
     runtime = ti.get_runtime()
     if runtime.target_tape and not runtime.inside_complex_kernel:
       runtime.target_tape.insert(decorated, args)
+    return ret
 
   return decorated
@@ -3,11 +3,41 @@ from .expr import Expr
 import numpy as np
 from .util import *
 
+# Narrow types are converted to and from 32-bit types on loads and stores,
+# by the LLVM backends only
+ext_arr_dtypes = [
+    np.float32, np.float64, np.int32, np.int64, np.float16, np.int8, np.int16,
+    np.uint8, np.uint16
+]
+ext_arr_dtype_names = [np.dtype(t).name for t in ext_arr_dtypes]
+ext_arr_narrow_dtype_names = ext_arr_dtype_names[4:]
+
+
+def ext_arr_dtype_name(dtype):
+  # Taichi data types are named after NumPy dtypes, and PyTorch dtypes print
+  # as e.g. 'torch.float32'
+  if isinstance(dtype, (np.dtype, type)):
+    name = np.dtype(dtype).name
+  else:
+    name = str(dtype).split('.')[-1]
+  assert name in ext_arr_dtype_names, \
+    'Kernel arg supports {} arrays only'.format(', '.join(ext_arr_dtype_names))
+  assert name not in ext_arr_narrow_dtype_names or \
+         taichi_lang_core.current_compile_config().use_llvm, \
+    '{} arrays require the LLVM backend'.format(name)
+  return name
+
+
 class ArgExtArray:
   def __init__(self, dim=1):
     assert dim == 1
 
   def extract(self, x):
+    if hasattr(x, 'dtype') and hasattr(x, 'shape'):
+      return x.dtype, len(x.shape)
+    # Arrays that only implement the DLPack protocol
+    from .dlpack import DLPackArray
+    x = DLPackArray(x)
     return x.dtype, len(x.shape)
 
 
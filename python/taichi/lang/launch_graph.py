@@ -0,0 +1,37 @@
+from .core import taichi_lang_core
+
+
+class LaunchGraph:
+  def __init__(self):
+    self.graph = taichi_lang_core.LaunchGraph()
+    # External arrays whose addresses are recorded in the graph
+    self.arrays = []
+
+  def __enter__(self):
+    from .impl import get_runtime
+    runtime = get_runtime()
+    runtime.materialize()
+    assert runtime.target_launch_graph is None, 'Captures cannot be nested'
+    taichi_lang_core.begin_capture(self.graph)
+    runtime.target_launch_graph = self
+    return self
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    from .impl import get_runtime
+    taichi_lang_core.end_capture()
+    get_runtime().target_launch_graph = None
+
+  def replay(self, n=1):
+    self.graph.replay(n)
+
+  def __len__(self):
+    return self.graph.size()
+
+
+# Kernels launched inside the with block run as usual and are also recorded,
+# together with their arguments. Host-side tensor access (x[i], to_numpy(),
+# ...) is not recorded. g.replay(n) launches the recorded sequence n
+# more times from C++. NumPy views with negative or unaligned strides, which
+# are copied for each launch, cannot be captured.
+def capture():
+  return LaunchGraph()
@@ -1,5 +1,6 @@
 from . import expr
 from . import impl
+from .util import to_numpy_type
 import copy
 import numbers
 
@@ -386,6 +387,30 @@ class Matrix:
     assert self.m == 1 and other.m == 1
     return (self.transposed(self) @ other).subscript(0, 0)
 
+  def shape(self):
+    return self.entries[0].shape()
+
+  def to_numpy(self):
+    from .meta import matrix_to_numpy
+    import numpy as np
+    shape = self.shape()
+    arr = np.empty(shape=shape + (self.n * self.m, ),
+                   dtype=to_numpy_type(self.entries[0].snode().data_type()))
+    matrix_to_numpy(self, arr)
+    return arr.reshape(shape + (self.n, self.m))
+
+  def from_numpy(self, arr):
+    from .meta import numpy_to_matrix
+    import numpy as np
+    shape = self.shape()
+    if self.m == 1 and arr.shape == shape + (self.n, ):
+      arr = arr.reshape(shape + (self.n, 1))
+    assert arr.shape == shape + (self.n, self.m), \
+      'Expected an array of shape {}'.format(shape + (self.n, self.m))
+    arr = np.ascontiguousarray(
+        arr, dtype=to_numpy_type(self.entries[0].snode().data_type()))
+    numpy_to_matrix(arr.reshape(shape + (self.n * self.m, )), self)
+
   def fill(self, val):
     if isinstance(val, numbers.Number):
       for e in self.entries:
@@ -2,17 +2,59 @@ import taichi as ti
 
 # A set of helper (meta)functions
 
+# Marks a helper as host-side tensor access, which launch graphs do not record
+def accessor(kernel):
+  kernel.is_accessor = True
+  kernel.grad.is_accessor = True
+  return kernel
+
+@accessor
 @ti.kernel
 def fill_tensor(tensor: ti.template(), val: ti.template()):
   for I in ti.grouped(tensor):
     tensor[I] = val
 
+@accessor
 @ti.kernel
 def tensor_to_numpy(tensor: ti.template(), arr: ti.ext_arr()):
   for I in ti.grouped(tensor):
     arr[I] = tensor[I]
 
+@accessor
 @ti.kernel
 def numpy_to_tensor(arr: ti.ext_arr(), tensor: ti.template()):
   for I in ti.grouped(tensor):
     tensor[I] = arr[I]
+
+# The matrix components are flattened into the last index of the array
+@accessor
+@ti.kernel
+def matrix_to_numpy(mat: ti.template(), arr: ti.ext_arr()):
+  for I in ti.grouped(mat):
+    for p in ti.static(range(mat.n)):
+      for q in ti.static(range(mat.m)):
+        arr[I, p * mat.m + q] = mat(p, q)[I]
+
+@accessor
+@ti.kernel
+def numpy_to_matrix(arr: ti.ext_arr(), mat: ti.template()):
+  for I in ti.grouped(mat):
+    for p in ti.static(range(mat.n)):
+      for q in ti.static(range(mat.m)):
+        mat(p, q)[I] = arr[I, p * mat.m + q]
+
+@accessor
+@ti.kernel
+def tensor_gather(tensor: ti.template(), indices: ti.ext_arr(),
+                  values: ti.ext_arr(), n: ti.i32):
+  for k in range(n):
+    I = ti.Vector([indices[k, d] for d in ti.static(range(tensor.dim()))])
+    values[k] = tensor[I]
+
+@accessor
+@ti.kernel
+def tensor_scatter(tensor: ti.template(), indices: ti.ext_arr(),
+                   values: ti.ext_arr(), n: ti.i32):
+  for k in range(n):
+    I = ti.Vector([indices[k, d] for d in ti.static(range(tensor.dim()))])
+    tensor[I] = values[k]
@@ -152,9 +152,24 @@ def ti_min(*args):
   else:
     return ti_min(args[0], ti_min(args[1:]))
 
+def _dynamic_snode(l):
+  from .snode import SNode
+  if isinstance(l, SNode):
+    return l.ptr
+  # A tensor placed in the dynamic node
+  return l.ptr.snode().parent
+
+
 def append(l, indices, val):
-  taichi_lang_core.insert_append(l.ptr, make_expr_group(indices), Expr(val).ptr)
+  taichi_lang_core.insert_append(
+      _dynamic_snode(l), make_expr_group(indices), Expr(val).ptr)
+
+
+def deactivate(snode, indices):
+  # Deactivates the cell of a pointer or hash snode that contains indices
+  taichi_lang_core.insert_deactivate(snode.ptr, make_expr_group(indices))
 
 
 def length(l, indices):
-  return taichi_lang_core.insert_len(l.ptr, make_expr_group(indices))
+  return taichi_lang_core.insert_len(
+      _dynamic_snode(l), make_expr_group(indices))
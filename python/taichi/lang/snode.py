@@ -2,10 +2,10 @@ class SNode:
   def __init__(self, ptr):
     self.ptr = ptr
 
-  def dense(self, indices, dimensions):
+  def dense(self, indices, dimensions, packed=False):
     if isinstance(dimensions, int):
       dimensions = [dimensions] * len(indices)
-    return SNode(self.ptr.dense(indices, dimensions))
+    return SNode(self.ptr.dense(indices, dimensions, packed))
 
   def dynamic(self, index, dimension, chunk_size=None):
     assert len(index) == 1
@@ -13,6 +13,13 @@ class SNode:
       chunk_size = dimension
     return SNode(self.ptr.dynamic(index[0], dimension, chunk_size))
 
+  def hash(self, indices, dimensions, table_size=0):
+    # table_size (0 means automatic) bounds the number of active cells of
+    # each hash table
+    if isinstance(dimensions, int):
+      dimensions = [dimensions] * len(indices)
+    return SNode(self.ptr.hash(indices, dimensions, table_size))
+
   def pointer(self):
     return SNode(self.ptr.pointer())
 
@@ -32,6 +39,13 @@ class SNode:
         arg.place(self)
     return self
 
+  def deactivate_all(self):
+    # Memory of deactivated pointer and dynamic nodes is reused by later
+    # activations
+    from .impl import get_runtime
+    get_runtime().materialize()
+    self.ptr.clear_data_and_deactivate()
+
   def lazy_grad(self):
     self.ptr.lazy_grad()
 
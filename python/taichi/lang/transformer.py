@@ -362,6 +362,21 @@ if 1:
     return node
 
   def visit_FunctionDef(self, node):
+    if self.transform_args:
+      # Return values are stored when the return statement is reached, which
+      # only matches Python semantics at the end of the kernel
+      for stmt in ast.walk(node):
+        if isinstance(stmt, ast.Return) and stmt is not node.body[-1]:
+          raise TaichiSyntaxError(
+              'Kernels can only return at the end of their body')
+      returns = node.body[-1] if isinstance(node.body[-1], ast.Return) else None
+      if node.returns is not None:
+        if returns is None or returns.value is None:
+          raise TaichiSyntaxError(
+              'Kernels with a return type must end with a return statement')
+      elif returns is not None and returns.value is not None:
+        raise TaichiSyntaxError(
+            'Kernels returning values must be annotated with the return type, e.g. "-> ti.f32"')
     with self.variable_scope():
       self.generic_visit(node)
     args = node.args
@@ -381,17 +396,9 @@ if 1:
           arg_init.targets[0].id = arg.arg
           array_dt = self.arg_features[i][0]
           array_dim = self.arg_features[i][1]
-          import numpy as np
-          if array_dt == np.float32:
-            dt = self.parse_expr('ti.f32')
-          elif array_dt == np.float64:
-            dt = self.parse_expr('ti.f64')
-          elif array_dt == np.int32:
-            dt = self.parse_expr('ti.i32')
-          elif array_dt == np.int64:
-            dt = self.parse_expr('ti.i64')
-          else:
-            assert False
+          from .kernel_arguments import ext_arr_dtype_name
+          dt = self.parse_expr('ti.core.DataType.{}'.format(
+              ext_arr_dtype_name(array_dt)))
           arg_init.value.args[0] = dt
           arg_init.value.args[1] = self.parse_expr("{}".format(array_dim))
           arg_decls.append(arg_init)
@@ -404,6 +411,11 @@ if 1:
       node.body = arg_decls + node.body
       # remove original args
       node.args.args = []
+      if node.returns is not None:
+        ret = self.parse_stmt('ti.kernel_return(0, 0)')
+        ret.value.args = [node.body[-1].value, node.returns]
+        node.body[-1] = ret
+        node.returns = None
     return node
 
   def visit_UnaryOp(self, node):
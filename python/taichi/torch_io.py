@@ -1,23 +1,47 @@
-import taichi as ti
+# Torch tensors are accessed in place through their strides. The copy kernels
+# are shared with to_numpy/from_numpy, and one instance is compiled per tensor,
+# torch tensor rank and dtype.
 
-@ti.kernel
-def from_torch_template(expr: ti.template(), torch_tensor: ti.ext_arr()):
-  for i in expr:
-    expr[i] = torch_tensor[i]
 
-@ti.kernel
-def to_torch_template(expr: ti.template(), torch_tensor: ti.ext_arr()):
-  for i in expr:
-    torch_tensor[i] = expr[i]
+def _check_shape(torch_tensor, shape):
+  assert tuple(torch_tensor.shape) == shape, \
+    'Expected a torch tensor of shape {}'.format(shape)
+
+
+def _flatten_matrix(mat, torch_tensor):
+  # Matrix components are flattened into the last index of the torch tensor.
+  # Returns the flattened tensor and whether it is a copy.
+  shape = mat.shape()
+  if mat.m == 1 and tuple(torch_tensor.shape) == shape + (mat.n, ):
+    return torch_tensor, False
+  _check_shape(torch_tensor, shape + (mat.n, mat.m))
+  flat_shape = shape + (mat.n * mat.m, )
+  try:
+    return torch_tensor.view(flat_shape), False
+  except RuntimeError:
+    # The matrix dimensions cannot be merged without a copy
+    return torch_tensor.reshape(flat_shape), True
 
 
 def from_torch(expr, torch_tensor):
-  if not expr.from_torch_:
-    expr.from_torch_ = lambda x: from_torch_template(expr, x.contiguous())
-  expr.from_torch_(torch_tensor)
+  from taichi.lang.matrix import Matrix
+  from taichi.lang.meta import numpy_to_tensor, numpy_to_matrix
+  if isinstance(expr, Matrix):
+    flat, _ = _flatten_matrix(expr, torch_tensor)
+    numpy_to_matrix(flat, expr)
+  else:
+    _check_shape(torch_tensor, expr.shape())
+    numpy_to_tensor(torch_tensor, expr)
 
-def to_torch(expr, torch_tensor):
-  if not expr.to_torch_:
-    expr.to_torch_ = lambda x: to_torch_template(expr, x.contiguous())
-  expr.to_torch_(torch_tensor)
 
+def to_torch(expr, torch_tensor):
+  from taichi.lang.matrix import Matrix
+  from taichi.lang.meta import tensor_to_numpy, matrix_to_numpy
+  if isinstance(expr, Matrix):
+    flat, copied = _flatten_matrix(expr, torch_tensor)
+    matrix_to_numpy(expr, flat)
+    if copied:
+      torch_tensor.copy_(flat.view(torch_tensor.shape))
+  else:
+    _check_shape(torch_tensor, expr.shape())
+    tensor_to_numpy(expr, torch_tensor)
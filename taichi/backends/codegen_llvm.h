@@ -137,6 +137,9 @@ public:
     } else if (snode->type == SNodeType::pointer) {
       auto element_ty = snode->ch[0]->llvm_type;
       element_size = tlctx->get_type_size(element_ty);
+    } else if (snode->type == SNodeType::dynamic ||
+               snode->type == SNodeType::hash) {
+      element_size = tlctx->get_type_size(snode->llvm_element_type);
     } else {
       auto element_ty = snode->llvm_type;
       element_size = tlctx->get_type_size(element_ty);
@@ -144,7 +147,7 @@ public:
     common.set("snode_id", tlctx->get_constant(snode->id));
     common.set("element_size", tlctx->get_constant((uint64)element_size));
     common.set("max_num_elements",
-               tlctx->get_constant(1 << snode->total_num_bits));
+               tlctx->get_constant(snode->max_num_elements()));
     common.set("context", get_context());
 
     /*
@@ -152,17 +155,37 @@ public:
     uint8 *(*from_parent_element)(uint8 *);
     bool (*is_active)(uint8 *, int i);
     int (*get_num_elements)(uint8 *);
+    void (*deactivate)(uint8 *, int i);
     void (*refine_coordinates)(PhysicalCoordinates *inp_coord,
                                PhysicalCoordinates *refined_coord,
                                int index);
                                */
 
     std::vector<std::string> functions = {"lookup_element", "is_active",
-                                          "get_num_elements"};
+                                          "get_num_elements", "deactivate"};
 
     for (auto const f : functions)
       common.set(f, get_runtime_function(fmt::format("{}_{}", name, f)));
 
+    auto slot_to_coordinates =
+        get_runtime_function("Hash_slot_to_coordinates");
+    if (snode->type == SNodeType::hash) {
+      common.set("slot_to_coordinates", slot_to_coordinates);
+    } else {
+      common.set("slot_to_coordinates",
+                 llvm::ConstantPointerNull::get(llvm::cast<llvm::PointerType>(
+                     slot_to_coordinates->getType())));
+    }
+
+    auto next_active_slot = get_runtime_function("Dense_next_active_slot");
+    if (snode->type == SNodeType::dense && snode->_bitmasked) {
+      common.set("next_active_slot", next_active_slot);
+    } else {
+      common.set("next_active_slot",
+                 llvm::ConstantPointerNull::get(llvm::cast<llvm::PointerType>(
+                     next_active_slot->getType())));
+    }
+
     // "from_parent_element", "refine_coordinates" are different for different
     // snodes, even if they have the same type.
     if (snode->parent)
@@ -184,14 +207,20 @@ public:
     } else if (snode->type == SNodeType::pointer) {
       meta = std::make_unique<RuntimeObject>("PointerMeta", this, builder);
       emit_struct_meta_base("Pointer", meta->ptr, snode);
+    } else if (snode->type == SNodeType::hash) {
+      meta = std::make_unique<RuntimeObject>("HashMeta", this, builder);
+      emit_struct_meta_base("Hash", meta->ptr, snode);
+      meta->call("set_table_size", tlctx->get_constant(snode->hash_table_size));
     } else if (snode->type == SNodeType::root) {
       meta = std::make_unique<RuntimeObject>("RootMeta", this, builder);
       emit_struct_meta_base("Root", meta->ptr, snode);
     } else if (snode->type == SNodeType::dynamic) {
       meta = std::make_unique<RuntimeObject>("DynamicMeta", this, builder);
       emit_struct_meta_base("Root", meta->ptr, snode);
-      meta->call("set_chunk_size",
-                 tlctx->get_constant((int)snode->max_num_elements()));
+      // The whole list is a single cell, and deactivating it empties the list
+      RuntimeObject common("StructMeta", this, builder, meta->ptr);
+      common.set("deactivate", get_runtime_function("Dynamic_deactivate"));
+      meta->call("set_chunk_size", tlctx->get_constant(snode->chunk_size));
     } else {
       TC_P(snode_type_name(snode->type));
       TC_NOT_IMPLEMENTED;
@@ -209,7 +238,11 @@ public:
 
   virtual FunctionType compile_module_to_executable() {
     jit->addModule(std::move(module));
+    return compile_offloaded_tasks();
+  }
 
+  // Looks up the task functions in the JIT, which must already contain them
+  FunctionType compile_offloaded_tasks() {
     for (auto &task : offloaded_tasks) {
       task.compile();
     }
@@ -610,7 +643,54 @@ public:
     auto meta_child = cast_pointer(emit_struct_meta(snode_child), "StructMeta");
     auto meta_parent =
         cast_pointer(emit_struct_meta(snode_parent), "StructMeta");
-    call("element_listgen", get_runtime(), meta_parent, meta_child);
+    call("element_listgen", get_runtime(), meta_parent, meta_child,
+         tlctx->get_constant(listgen->num_cpu_threads));
+  }
+
+  void visit(ClearAllStmt *stmt) override {
+    if (!stmt->deactivate) {
+      TC_ERROR(
+          "Clearing data without deactivation is not supported on LLVM "
+          "backends");
+    }
+    auto num_threads =
+        tlctx->get_constant(get_current_program().config.cpu_max_num_threads);
+    auto listgen = [&](SNode *child) {
+      call("element_listgen", get_runtime(),
+           cast_pointer(emit_struct_meta(child->parent), "StructMeta"),
+           cast_pointer(emit_struct_meta(child), "StructMeta"), num_threads);
+    };
+    // Generate the element lists from the root down to the snode, and then
+    // those of its descendants, parents before children
+    std::vector<SNode *> path;
+    for (auto p = stmt->snode; p->parent; p = p->parent) {
+      path.push_back(p);
+    }
+    std::reverse(path.begin(), path.end());
+    std::vector<SNode *> subtree;
+    subtree.push_back(stmt->snode);
+    for (int i = 0; i < (int)subtree.size(); i++) {
+      for (auto &ch : subtree[i]->ch) {
+        if (ch->type != SNodeType::place)
+          subtree.push_back(ch.get());
+      }
+    }
+    for (auto p : path) {
+      listgen(p);
+    }
+    for (int i = 1; i < (int)subtree.size(); i++) {
+      listgen(subtree[i]);
+    }
+    // Deactivate the deepest nodes first, as deactivating a cell makes the
+    // nodes below it unreachable
+    for (int i = (int)subtree.size() - 1; i >= 0; i--) {
+      auto p = subtree[i];
+      if (p->type == SNodeType::root)
+        continue;
+      call("element_deactivate", get_runtime(),
+           cast_pointer(emit_struct_meta(p->parent), "StructMeta"),
+           cast_pointer(emit_struct_meta(p), "StructMeta"));
+    }
   }
 
   llvm::Value *create_call(llvm::Value *func, std::vector<Value *> args) {
@@ -719,47 +799,66 @@ public:
   }
 
   void visit(SNodeOpStmt *stmt) override {
-    stmt->ret_type.data_type = DataType::i32;
-    if (stmt->op_type == SNodeOpType::probe) {
-      emit("{} {};", stmt->ret_data_type_name(), stmt->raw_name());
-    }
-
-    for (auto l = 0; l < stmt->width(); l++) {
-      auto snode = stmt->snodes[l];
-      auto indices = indices_str(snode, l, stmt->indices);
-
-      emit("{{");
-      if (stmt->op_type != SNodeOpType::activate &&
-          stmt->op_type != SNodeOpType::probe) {
-        emit("{} *{}_tmp = access_{}(root, {});", snode->node_type_name,
-             snode->node_type_name, snode->node_type_name,
-             make_list(indices, ""));
-      }
-      if (stmt->op_type == SNodeOpType::append) {
-        TC_ASSERT(stmt->val->width() == 1);
-        emit("{}_tmp->append({}({}[{}]));", snode->node_type_name,
-             snode->ch[0]->node_type_name, stmt->val->raw_name(), l);
-      } else if (stmt->op_type == SNodeOpType::clear) {
-        emit("{}_tmp->clear();", snode->node_type_name);
-      } else if (stmt->op_type == SNodeOpType::probe) {
-        emit("{}[{}] = query_{}(root, {});", stmt->raw_name(), l,
-             snode->node_type_name, make_list(indices, ""));
-        if (snode->type == SNodeType::dynamic) {
-          emit("if ({}[{}]) {{", stmt->raw_name(), l);
-          emit("{} *{}_tmp = access_{}(root, {});", snode->node_type_name,
-               snode->node_type_name, snode->node_type_name,
-               make_list(indices, ""));
-          emit("{}[{}] = {}_tmp->get_n();", stmt->raw_name(), l,
-               snode->node_type_name);
-          emit("}}");
-        }
-      } else if (stmt->op_type == SNodeOpType::activate) {
-        emit("activate_{}(root, {});", snode->node_type_name,
-             make_list(indices, ""));
-      } else {
-        TC_NOT_IMPLEMENTED
+    TC_ASSERT(stmt->width() == 1);
+    auto snode = stmt->snodes[0];
+    if (stmt->op_type == SNodeOpType::deactivate) {
+      TC_ASSERT(snode->type == SNodeType::dense ||
+                snode->type == SNodeType::pointer ||
+                snode->type == SNodeType::hash);
+      TC_ASSERT(stmt->ptr && stmt->cell_index);
+      auto meta =
+          builder->CreateBitCast(emit_struct_meta(snode),
+                                 llvm::Type::getInt8PtrTy(*llvm_context));
+      auto node = builder->CreateBitCast(
+          stmt->ptr->value, llvm::Type::getInt8PtrTy(*llvm_context));
+      if (snode->type == SNodeType::hash) {
+        // Tombstones are only safe without concurrent activation
+        TC_ERROR_IF(current_offloaded_stmt->task_type != OffloadedStmt::serial,
+                    "Cells of hash nodes can only be deactivated outside "
+                    "parallel loops");
+        auto args = hash_coordinates(snode, stmt->indices);
+        args.insert(args.begin(), {meta, node});
+        create_call("Hash_deactivate_cell", args);
+        return;
       }
-      emit("}}");
+      create_call(get_runtime_snode_name(snode) + "_deactivate",
+                  {meta, node, stmt->cell_index->value});
+      return;
+    }
+    if (stmt->op_type != SNodeOpType::append &&
+        stmt->op_type != SNodeOpType::probe) {
+      TC_NOT_IMPLEMENTED
+    }
+    TC_ASSERT(snode->type == SNodeType::dynamic);
+    TC_ASSERT(stmt->ptr);
+    auto meta =
+        builder->CreateBitCast(emit_struct_meta(snode),
+                               llvm::Type::getInt8PtrTy(*llvm_context));
+    auto node = builder->CreateBitCast(stmt->ptr->value,
+                                       llvm::Type::getInt8PtrTy(*llvm_context));
+    if (stmt->op_type == SNodeOpType::append) {
+      TC_ASSERT(stmt->val->width() == 1);
+      stmt->value = create_call("Dynamic_append", {meta, node});
+      // Appending to a full node has no effect
+      auto append_block = BasicBlock::Create(*llvm_context, "append", func);
+      auto after_append =
+          BasicBlock::Create(*llvm_context, "after_append", func);
+      builder->CreateCondBr(
+          builder->CreateICmpSGE(stmt->value, tlctx->get_constant(0)),
+          append_block, after_append);
+      builder->SetInsertPoint(append_block);
+      auto elem =
+          create_call("Dynamic_lookup_element", {meta, node, stmt->value});
+      auto ch = create_call(snode->ch[0]->get_ch_from_parent_func_name(),
+                            {elem});
+      builder->CreateStore(
+          stmt->val->value,
+          builder->CreateBitCast(
+              ch, PointerType::get(tlctx->get_data_type(snode->ch[0]->dt), 0)));
+      builder->CreateBr(after_append);
+      builder->SetInsertPoint(after_append);
+    } else {
+      stmt->value = create_call("Dynamic_get_num_elements", {meta, node});
     }
   }
 
@@ -791,11 +890,28 @@ public:
     TC_ERROR("Global Ptrs should have been lowered.");
   }
 
+  // Returns the element type of narrow external arrays, or none
+  DataType narrow_external_type(Stmt *ptr) {
+    if (!ptr->is<ExternalPtrStmt>())
+      return DataType::none;
+    auto dt = ptr->as<ExternalPtrStmt>()->base_ptrs[0]->ret_type.data_type;
+    if (dt == ptr->ret_type.data_type)
+      return DataType::none;
+    return dt;
+  }
+
   void visit(GlobalStoreStmt *stmt) override {
     TC_ASSERT(!stmt->parent->mask() || stmt->width() == 1);
     TC_ASSERT(stmt->data->value);
     TC_ASSERT(stmt->ptr->value);
-    builder->CreateStore(stmt->data->value, stmt->ptr->value);
+    auto data = stmt->data->value;
+    auto narrow_dt = narrow_external_type(stmt->ptr);
+    if (narrow_dt == DataType::f16) {
+      data = builder->CreateFPTrunc(data, tlctx->get_data_type(narrow_dt));
+    } else if (narrow_dt != DataType::none) {
+      data = builder->CreateTrunc(data, tlctx->get_data_type(narrow_dt));
+    }
+    builder->CreateStore(data, stmt->ptr->value);
   }
 
   void visit(GlobalLoadStmt *stmt) override {
@@ -869,8 +985,22 @@ public:
       */
     }
     TC_ASSERT(stmt->width() == 1);
-    stmt->value = builder->CreateLoad(
-        tlctx->get_data_type(stmt->ret_type.data_type), stmt->ptr->value);
+    auto narrow_dt = narrow_external_type(stmt->ptr);
+    if (narrow_dt == DataType::none) {
+      stmt->value = builder->CreateLoad(
+          tlctx->get_data_type(stmt->ret_type.data_type), stmt->ptr->value);
+      return;
+    }
+    auto ret_type = tlctx->get_data_type(stmt->ret_type.data_type);
+    auto loaded =
+        builder->CreateLoad(tlctx->get_data_type(narrow_dt), stmt->ptr->value);
+    if (narrow_dt == DataType::f16) {
+      stmt->value = builder->CreateFPExt(loaded, ret_type);
+    } else if (narrow_dt == DataType::u8 || narrow_dt == DataType::u16) {
+      stmt->value = builder->CreateZExt(loaded, ret_type);
+    } else {
+      stmt->value = builder->CreateSExt(loaded, ret_type);
+    }
   }
 
   void visit(ElementShuffleStmt *stmt) override {
@@ -944,6 +1074,24 @@ public:
     }
   }
 
+  // The coordinates of the cell of a hash node containing the global indices,
+  // i.e. the indices with the bits of the descendants cleared
+  std::vector<llvm::Value *> hash_coordinates(
+      SNode *snode,
+      const std::vector<Stmt *> &indices) {
+    std::vector<llvm::Value *> coords(max_num_indices,
+                                      tlctx->get_constant(0));
+    for (int i = 0; i < (int)indices.size(); i++) {
+      int k = snode->physical_index_position[i];
+      if (k != -1) {
+        coords[k] = builder->CreateAnd(
+            indices[i]->value,
+            tlctx->get_constant(-(1 << snode->extractors[k].start)));
+      }
+    }
+    return coords;
+  }
+
   void visit(SNodeLookupStmt *stmt) override {
     llvm::Value *parent = nullptr;
     if (stmt->input_snode) {
@@ -961,7 +1109,8 @@ public:
       stmt->value = builder->CreateGEP(parent, stmt->input_index->value);
     } else if (snode->type == SNodeType::dense ||
                snode->type == SNodeType::pointer ||
-               snode->type == SNodeType::dynamic) {
+               snode->type == SNodeType::dynamic ||
+               snode->type == SNodeType::hash) {
       auto prefix = get_runtime_snode_name(snode);
       auto s = emit_struct_meta(stmt->snode);
       auto s_ptr =
@@ -970,13 +1119,20 @@ public:
       // call look up
       auto node_ptr = builder->CreateBitCast(
           stmt->input_snode->value, llvm::Type::getInt8PtrTy(*llvm_context));
-      if (stmt->activate) {
+      auto cell_index = stmt->input_index->value;
+      if (snode->type == SNodeType::hash) {
+        // Hash tables are indexed by coordinates. The cell index is the slot.
+        auto args = hash_coordinates(snode, stmt->global_indices);
+        args.insert(args.begin(), {s_ptr, node_ptr});
+        args.push_back(tlctx->get_constant(stmt->activate));
+        cell_index = create_call("Hash_lookup", args);
+      } else if (stmt->activate) {
         builder->CreateCall(get_runtime_function(prefix + "_activate"),
-                            {s_ptr, node_ptr, stmt->input_index->value});
+                            {s_ptr, node_ptr, cell_index});
       }
       auto elem =
           builder->CreateCall(get_runtime_function(prefix + "_lookup_element"),
-                              {s_ptr, node_ptr, stmt->input_index->value});
+                              {s_ptr, node_ptr, cell_index});
       auto element_ty = snode->get_body_type();
       stmt->value =
           builder->CreateBitCast(elem, PointerType::get(element_ty, 0));
@@ -1001,26 +1157,27 @@ public:
     auto argload = stmt->base_ptrs[0]->as<ArgLoadStmt>();
     auto arg_id = argload->arg_id;
     int num_indices = stmt->indices.size();
-    std::vector<llvm::Value *> sizes(num_indices);
+    // The extra arguments are the strides of the array, in elements
+    std::vector<llvm::Value *> strides(num_indices);
 
     for (int i = 0; i < num_indices; i++) {
       auto raw_arg =
           builder->CreateCall(get_runtime_function("Context_get_extra_args"),
                               {get_context(), tlctx->get_constant(arg_id),
                                tlctx->get_constant(i)});
-      sizes[i] = raw_arg;
+      strides[i] = raw_arg;
     }
 
-    auto dt = stmt->ret_type.data_type;
+    // The element type of the array, which may be narrower than ret_type
+    auto dt = stmt->base_ptrs[0]->ret_type.data_type;
     auto base = builder->CreateBitCast(
         stmt->base_ptrs[0]->value,
         llvm::PointerType::get(tlctx->get_data_type(dt), 0));
 
     auto linear_index = tlctx->get_constant(0);
     for (int i = 0; i < num_indices; i++) {
-      linear_index = builder->CreateMul(linear_index, sizes[i]);
-      linear_index = builder->CreateAdd(linear_index,
-          stmt->indices[i]->value);
+      linear_index = builder->CreateAdd(
+          linear_index, builder->CreateMul(stmt->indices[i]->value, strides[i]));
     }
 
     stmt->value = builder->CreateGEP(base, linear_index);
@@ -1074,46 +1231,70 @@ public:
   }
 
   void create_offload_range_for(OffloadedStmt *stmt) {
-    auto loop_var = create_entry_block_alloca(DataType::i32);
-    stmt->loop_vars_llvm.push_back(loop_var);
-    BasicBlock *body = BasicBlock::Create(*llvm_context, "loop_body", func);
-    BasicBlock *after_loop = BasicBlock::Create(*llvm_context, "block", func);
-    if (!stmt->reversed) {
-      builder->CreateStore(tlctx->get_constant(stmt->begin), loop_var);
-    } else {
-      builder->CreateStore(builder->CreateSub(tlctx->get_constant(stmt->end),
-                                              tlctx->get_constant(1)),
-                           loop_var);
-    }
-    builder->CreateBr(body);
+    llvm::Function *body;
+    {
+      // Create the loop body function, which is executed by the CPU thread
+      // pool for each loop index
+      auto body_function_type = llvm::FunctionType::get(
+          llvm::Type::getVoidTy(*llvm_context),
+          {
+              llvm::PointerType::get(context_ty, 0),
+              tlctx->get_data_type<int>(),
+          },
+          false);
 
-    // body cfg
-    builder->SetInsertPoint(body);
+      body = llvm::Function::Create(body_function_type,
+                                    llvm::Function::InternalLinkage,
+                                    "range_for_body", module.get());
+      auto old_func = func;
+      // emit into loop body function
+      func = body;
 
-    stmt->body->accept(this);
+      auto allocas = BasicBlock::Create(*llvm_context, "allocs", body);
+      auto old_entry = entry_block;
+      entry_block = allocas;
 
-    llvm::Value *cond = nullptr;
-    if (!stmt->reversed) {
-      create_increment(loop_var, tlctx->get_constant(1));
-      cond = builder->CreateICmp(llvm::CmpInst::Predicate::ICMP_SLT,
-                                 builder->CreateLoad(loop_var),
-                                 tlctx->get_constant(stmt->end));
-    } else {
-      create_increment(loop_var, tlctx->get_constant(-1));
-      cond = builder->CreateICmp(llvm::CmpInst::Predicate::ICMP_SGE,
-                                 builder->CreateLoad(loop_var),
-                                 tlctx->get_constant(stmt->begin));
-    }
+      auto entry = BasicBlock::Create(*llvm_context, "entry", func);
 
-    builder->CreateCondBr(cond, body, after_loop);
+      auto ip = builder->saveIP();
+      builder->SetInsertPoint(entry);
 
-    // next cfg
-    builder->SetInsertPoint(after_loop);
+      auto loop_var = create_entry_block_alloca(DataType::i32);
+      stmt->loop_vars_llvm.push_back(loop_var);
+      builder->CreateStore(get_arg(1), loop_var);
+
+      stmt->body->accept(this);
+
+      builder->CreateRetVoid();
+      func = old_func;
+      builder->restoreIP(ip);
+
+      {
+        llvm::IRBuilderBase::InsertPointGuard gurad(*builder);
+        builder->SetInsertPoint(allocas);
+        builder->CreateBr(entry);
+        entry_block = old_entry;
+      }
+    }
+
+    auto begin = get_range_for_bound(stmt->const_begin, stmt->begin,
+                                     stmt->begin_offset);
+    auto end =
+        get_range_for_bound(stmt->const_end, stmt->end, stmt->end_offset);
+    create_call("cpu_parallel_range_for",
+                {get_context(), tlctx->get_constant(stmt->num_cpu_threads),
+                 begin, end, tlctx->get_constant(stmt->block_dim),
+                 tlctx->get_constant(stmt->reversed), body});
   }
 
   void create_offload_struct_for(OffloadedStmt *stmt, bool spmd = false) {
     llvm::Function *body;
     auto leaf_block = stmt->snode->parent;
+    // Leaf blocks are traversed slot by slot, which hash tables do not
+    // support
+    TC_ERROR_IF(leaf_block->type == SNodeType::hash,
+                "Struct-for loops need a dense block under hash nodes, e.g. "
+                "hash(...).dense(...).place(x)");
     {
       // Create the loop body function
       auto body_function_type = llvm::FunctionType::get(
@@ -1150,6 +1331,20 @@ public:
 
       auto lower_bound = get_arg(2);
       auto upper_bound = get_arg(3);
+      RuntimeObject element("Element", this, builder, get_arg(1));
+      if (leaf_block->type == SNodeType::dynamic) {
+        // Only the cells before n are active
+        auto node = create_call(leaf_block->get_ch_from_parent_func_name(),
+                                {element.get("element")});
+        auto meta = builder->CreateBitCast(
+            emit_struct_meta(leaf_block),
+            llvm::Type::getInt8PtrTy(*llvm_context));
+        auto num_elements =
+            create_call("Dynamic_get_num_elements", {meta, node});
+        upper_bound = create_call("min_i32", {upper_bound, num_elements});
+      }
+
+      BasicBlock *after_loop = BasicBlock::Create(*llvm_context, "block", func);
 
       if (spmd) {
         threadIdx = builder->CreateIntrinsic(
@@ -1163,14 +1358,17 @@ public:
       }
 
       auto body_bb = BasicBlock::Create(*llvm_context, "loop_body", func);
-      builder->CreateBr(body_bb);
+      // The range may be empty, e.g. for a partially filled dynamic node
+      builder->CreateCondBr(
+          builder->CreateICmp(llvm::CmpInst::Predicate::ICMP_SLT,
+                              builder->CreateLoad(loop_index), upper_bound),
+          body_bb, after_loop);
       builder->SetInsertPoint(body_bb);
       // initialize the coordinates
 
       auto refine =
           get_runtime_function(leaf_block->refine_coordinates_func_name());
       auto new_coordinates = create_entry_block_alloca(physical_coordinate_ty);
-      RuntimeObject element("Element", this, builder, get_arg(1));
       create_call(refine, {element.get_ptr("pcoord"), new_coordinates,
                            builder->CreateLoad(loop_index)});
 
@@ -1214,7 +1412,6 @@ public:
           builder->CreateICmp(llvm::CmpInst::Predicate::ICMP_SLT,
                               builder->CreateLoad(loop_index), upper_bound);
 
-      BasicBlock *after_loop = BasicBlock::Create(*llvm_context, "block", func);
       builder->CreateCondBr(cond, body_bb, after_loop);
 
       builder->SetInsertPoint(after_loop);
@@ -1230,12 +1427,21 @@ public:
       }
     }
 
-    int num_splits = leaf_block->max_num_elements() / stmt->block_dim;
     // traverse leaf node
-    create_call("for_each_block",
-                {get_context(), tlctx->get_constant(leaf_block->parent->id),
-                 tlctx->get_constant(leaf_block->max_num_elements()),
-                 tlctx->get_constant(num_splits), body});
+    if (kernel->arch == Arch::x86_64) {
+      create_call("cpu_parallel_for_each_block",
+                  {get_context(), tlctx->get_constant(leaf_block->parent->id),
+                   tlctx->get_constant(leaf_block->max_num_elements()),
+                   tlctx->get_constant(stmt->block_dim), body,
+                   tlctx->get_constant(stmt->num_cpu_threads)});
+    } else {
+      int num_splits = (leaf_block->max_num_elements() + stmt->block_dim - 1) /
+                       stmt->block_dim;
+      create_call("for_each_block",
+                  {get_context(), tlctx->get_constant(leaf_block->parent->id),
+                   tlctx->get_constant(leaf_block->max_num_elements()),
+                   tlctx->get_constant(num_splits), body});
+    }
   }
 
   void visit(LoopIndexStmt *stmt) override {
@@ -1249,12 +1455,27 @@ public:
     }
   }
 
+  llvm::Value *get_global_temporary_ptr(std::size_t offset, DataType dt) {
+    auto buffer = builder->CreateCall(
+        get_runtime_function("Runtime_get_temporaries"), get_runtime());
+    auto addr = builder->CreateGEP(buffer, tlctx->get_constant((int64)offset));
+    auto ptr_type = llvm::PointerType::get(tlctx->get_data_type(dt), 0);
+    return builder->CreatePointerCast(addr, ptr_type);
+  }
+
+  // Loads a range-for bound, which is either a constant or stored to a
+  // global temporary by an earlier serial task
+  llvm::Value *get_range_for_bound(bool is_const, int value,
+                                   std::size_t offset) {
+    if (is_const)
+      return tlctx->get_constant(value);
+    return builder->CreateLoad(get_global_temporary_ptr(offset, DataType::i32));
+  }
+
   void visit(GlobalTemporaryStmt *stmt) {
-    auto runtime = get_runtime();
-    auto addr = builder->CreateGEP(runtime, tlctx->get_constant((int64)stmt->offset));
     TC_ASSERT(stmt->width() == 1);
-    auto ptr_type = llvm::PointerType::get(tlctx->get_data_type(stmt->ret_type.data_type), 0);
-    stmt->value = builder->CreatePointerCast(addr, ptr_type);
+    stmt->value =
+        get_global_temporary_ptr(stmt->offset, stmt->ret_type.data_type);
   }
 
   void visit(OffloadedStmt *stmt) override {
@@ -1265,8 +1486,9 @@ public:
     } else if (stmt->task_type == Type::range_for) {
       create_offload_range_for(stmt);
     } else if (stmt->task_type == Type::struct_for) {
-      stmt->block_dim =
-          std::min(stmt->snode->parent->max_num_elements(), stmt->block_dim);
+      // On CPUs block_dim is the grain size (0 means automatic)
+      if (stmt->block_dim == 0)
+        stmt->block_dim = get_current_program().config.default_cpu_block_dim;
       create_offload_struct_for(stmt);
     } else if (stmt->task_type == Type::listgen) {
       emit_list_gen(stmt);
@@ -74,7 +74,10 @@ public:
       task.cuda_func =
           (void *)cuda_context.get_function(cuda_module, task.name);
     }
-    return [offloaded_local](Context context) {
+    bool has_return_value = false;
+    for (auto &arg : kernel->args)
+      has_return_value = has_return_value || arg.is_return_value;
+    return [offloaded_local, has_return_value](Context &context) {
       for (auto task : offloaded_local) {
         if (get_current_program().config.verbose_kernel_launches)
           TC_INFO("Launching kernel {}<<<{}, {}>>>", task.name, task.grid_dim,
@@ -85,6 +88,10 @@ public:
         }
         cuda_context.launch((CUfunction)task.cuda_func, &context, task.grid_dim,
                             task.block_dim);
+        // The next launch uploads the context again, which must not discard
+        // the return values stored by this one
+        if (has_return_value)
+          cuda_context.fetch_args(&context);
         if (get_current_program().config.enable_profiler) {
           get_current_program().profiler_llvm->stop();
         }
@@ -221,15 +228,29 @@ public:
   void create_offload_range_for(OffloadedStmt *stmt) {
     auto loop_var = create_entry_block_alloca(DataType::i32);
     stmt->loop_vars_llvm.push_back(loop_var);
-    auto loop_begin = stmt->begin;
-    auto loop_end = stmt->end;
     auto loop_block_dim = stmt->block_dim;
     if (loop_block_dim == 0) {
       loop_block_dim = get_current_program().config.default_gpu_block_dim;
     }
-    kernel_grid_dim =
-        (loop_end - loop_begin + loop_block_dim - 1) / loop_block_dim;
     kernel_block_dim = loop_block_dim;
+    bool const_range = stmt->const_begin && stmt->const_end;
+    if (const_range) {
+      kernel_grid_dim =
+          (stmt->end - stmt->begin + loop_block_dim - 1) / loop_block_dim;
+    } else {
+      // The number of iterations is only known at launch time. Use a fixed
+      // grid and let each thread stride over the range.
+      int num_SMs = 1;
+#if defined(TLANG_WITH_CUDA)
+      cudaDeviceGetAttribute(&num_SMs, cudaDevAttrMultiProcessorCount, 0);
+#endif
+      kernel_grid_dim = num_SMs * 32;
+    }
+    auto loop_begin = get_range_for_bound(stmt->const_begin, stmt->begin,
+                                          stmt->begin_offset);
+    auto loop_end =
+        get_range_for_bound(stmt->const_end, stmt->end, stmt->end_offset);
+    BasicBlock *test = BasicBlock::Create(*llvm_context, "loop_test", func);
     BasicBlock *body = BasicBlock::Create(*llvm_context, "loop_body", func);
     BasicBlock *after_loop = BasicBlock::Create(*llvm_context, "block", func);
 
@@ -239,23 +260,35 @@ public:
         builder->CreateIntrinsic(Intrinsic::nvvm_read_ptx_sreg_ctaid_x, {}, {});
     auto blockDim =
         builder->CreateIntrinsic(Intrinsic::nvvm_read_ptx_sreg_ntid_x, {}, {});
+    auto gridDim =
+        builder->CreateIntrinsic(Intrinsic::nvvm_read_ptx_sreg_nctaid_x, {}, {});
 
     auto loop_id = builder->CreateAdd(
-        tlctx->get_constant(stmt->begin),
+        loop_begin,
         builder->CreateAdd(threadIdx, builder->CreateMul(blockIdx, blockDim)));
 
     builder->CreateStore(loop_id, loop_var);
+    builder->CreateBr(test);
 
+    builder->SetInsertPoint(test);
     auto cond = builder->CreateICmp(llvm::CmpInst::Predicate::ICMP_SLT,
-                                    builder->CreateLoad(loop_var),
-                                    tlctx->get_constant(stmt->end));
+                                    builder->CreateLoad(loop_var), loop_end);
 
     builder->CreateCondBr(cond, body, after_loop);
     {
       // body cfg
       builder->SetInsertPoint(body);
       stmt->body->accept(this);
-      builder->CreateBr(after_loop);
+      if (const_range) {
+        builder->CreateBr(after_loop);
+      } else {
+        // grid-stride
+        builder->CreateStore(
+            builder->CreateAdd(builder->CreateLoad(loop_var),
+                               builder->CreateMul(gridDim, blockDim)),
+            loop_var);
+        builder->CreateBr(test);
+      }
     }
 
     builder->SetInsertPoint(after_loop);
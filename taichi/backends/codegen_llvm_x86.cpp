@@ -2,6 +2,9 @@
 #include <llvm/Target/TargetMachine.h>
 #include <llvm/Analysis/TargetTransformInfo.h>
 #include "llvm/Transforms/IPO/PassManagerBuilder.h"
+#include <llvm/Config/llvm-config.h>
+#include <llvm/Support/Host.h>
+#include <xxhash.h>
 #include <taichi/common/util.h>
 #include <taichi/io/io.h>
 #include <set>
@@ -12,6 +15,7 @@
 #include "../ir.h"
 
 #include "codegen_llvm.h"
+#include "offline_cache.h"
 
 TLANG_NAMESPACE_BEGIN
 
@@ -21,6 +25,73 @@ class CodeGenLLVMCPU : public CodeGenLLVM {
   CodeGenLLVMCPU(CodeGenBase *codegen_base, Kernel *kernel)
       : CodeGenLLVM(codegen_base, kernel) {
   }
+
+  static std::string get_host_identity() {
+    static std::string identity;
+    if (identity.empty()) {
+      llvm::StringMap<bool> features;
+      std::set<std::string> enabled_features;
+      if (llvm::sys::getHostCPUFeatures(features)) {
+        for (auto &f : features) {
+          if (f.second)
+            enabled_features.insert(f.first().str());
+        }
+      }
+      identity = fmt::format("llvm {} {} {}", LLVM_VERSION_STRING,
+                             llvm::sys::getHostCPUName().str(),
+                             make_list(std::vector<std::string>(
+                                 enabled_features.begin(),
+                                 enabled_features.end())));
+    }
+    return identity;
+  }
+
+  // Everything that determines the generated object: the lowered IR, the
+  // layout (and runtime) it is linked with, the relevant compile options and
+  // the LLVM version/host CPU it is compiled for.
+  std::string get_offline_cache_key() {
+    auto &config = get_current_program().config;
+    std::string ir;
+    irpass::print(kernel->ir, &ir);
+    auto key_input = fmt::format(
+        "{}\n{}\nlayout {}\n{}\ndebug={} block_dim={} vectorized_load={}\n",
+        kernel_name, ir, tlctx->struct_module_hash, get_host_identity(),
+        config.debug, config.default_cpu_block_dim,
+        config.attempt_vectorized_load_cpu);
+    return fmt::format("{:016x}",
+                       XXH64(key_input.data(), key_input.size(), 0));
+  }
+
+  FunctionType gen() override {
+    auto &config = get_current_program().config;
+    if (!config.offline_cache) {
+      return CodeGenLLVM::gen();
+    }
+    OfflineCache cache(config.offline_cache_path,
+                       config.offline_cache_max_size);
+    auto key = get_offline_cache_key();
+    std::string object;
+    std::vector<std::string> task_names;
+    if (cache.load(key, object, task_names)) {
+      TC_TRACE("Loaded kernel {} from offline cache ({})", kernel_name, key);
+      get_current_program().offline_cache_hits += 1;
+      for (auto &name : task_names) {
+        OffloadedTask task(this);
+        task.begin(name);
+        task.end();
+      }
+    } else {
+      emit_to_module();
+      auto buffer = jit->compile_module_to_object(std::move(module));
+      object = buffer->getBuffer().str();
+      for (auto &task : offloaded_tasks) {
+        task_names.push_back(task.name);
+      }
+      cache.store(key, object, task_names);
+    }
+    jit->add_object(llvm::MemoryBuffer::getMemBufferCopy(object));
+    return compile_offloaded_tasks();
+  }
 };
 
 FunctionType CPUCodeGen::codegen_llvm() {
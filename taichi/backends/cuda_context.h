@@ -24,6 +24,10 @@ public:
   void launch(CUfunction func, void *context_ptr, unsigned gridDim,
               unsigned blockDim);
 
+  // Copies the arguments of the last launch, which include return values,
+  // back to the host
+  void fetch_args(void *context_ptr);
+
   std::string get_mcpu() const { return mcpu; }
 
   ~CUDAContext();
@@ -124,25 +124,30 @@ class TaichiLLVMJIT {
     VModuleKey K = ES.allocateVModule();
 
     // Build a resolver and associate it with the new key.
-    Resolvers[K] = createLegacyLookupResolver(
-        ES,
-        [this](const std::string &Name) -> JITSymbol {
-          if (auto Sym = CompileLayer.findSymbol(Name, false))
-            return Sym;
-          else if (auto Err = Sym.takeError())
-            return std::move(Err);
-          if (auto SymAddr =
-                  RTDyldMemoryManager::getSymbolAddressInProcess(Name))
-            return JITSymbol(SymAddr, JITSymbolFlags::Exported);
-          return nullptr;
-        },
-        [](Error Err) { cantFail(std::move(Err), "lookupFlags failed"); });
+    Resolvers[K] = create_resolver();
 
     // Add the module to the JIT with the new key.
     cantFail(CODLayer.addModule(K, std::move(M)));
     return K;
   }
 
+  // Optimizes and compiles the module eagerly into a relocatable object,
+  // which can be stored and later loaded with add_object
+  std::unique_ptr<MemoryBuffer> compile_module_to_object(
+      std::unique_ptr<Module> M) {
+    global_optimize_module_x86_64(M);
+    return SimpleCompiler(*TM)(*M);
+  }
+
+  VModuleKey add_object(std::unique_ptr<MemoryBuffer> object) {
+    VModuleKey K = ES.allocateVModule();
+    Resolvers[K] = create_resolver();
+    // Symbols of the object are visible to lookup, since the layers above
+    // fall back to their base layers in findSymbol
+    cantFail(ObjectLayer.addObject(K, std::move(object)));
+    return K;
+  }
+
   JITSymbol lookup(const std::string Name) {
     std::string MangledName;
     raw_string_ostream MangledNameStream(MangledName);
@@ -155,6 +160,22 @@ class TaichiLLVMJIT {
   }
 
  private:
+  std::shared_ptr<SymbolResolver> create_resolver() {
+    return createLegacyLookupResolver(
+        ES,
+        [this](const std::string &Name) -> JITSymbol {
+          if (auto Sym = CompileLayer.findSymbol(Name, false))
+            return Sym;
+          else if (auto Err = Sym.takeError())
+            return std::move(Err);
+          if (auto SymAddr =
+                  RTDyldMemoryManager::getSymbolAddressInProcess(Name))
+            return JITSymbol(SymAddr, JITSymbolFlags::Exported);
+          return nullptr;
+        },
+        [](Error Err) { cantFail(std::move(Err), "lookupFlags failed"); });
+  }
+
   std::unique_ptr<Module> optimizeModule(std::unique_ptr<Module> M) {
     // Create a function pass manager.
     auto FPM = llvm::make_unique<legacy::FunctionPassManager>(M.get());
@@ -315,6 +315,13 @@ void CUDAContext::launch(CUfunction func, void *context_ptr, unsigned gridDim,
                                  nullptr, KernelParams, nullptr));
 }
 
+void CUDAContext::fetch_args(void *context_ptr) {
+  auto offset = offsetof(Context, args);
+  checkCudaErrors(cuMemcpyDtoH((char *)context_ptr + offset,
+                               context_buffer + offset,
+                               sizeof(Context::args)));
+}
+
 CUDAContext::~CUDAContext() {
   /*
   checkCudaErrors(cuMemFree(context_buffer));
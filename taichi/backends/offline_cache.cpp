@@ -0,0 +1,138 @@
+// On-disk cache of compiled kernel objects, shared across processes
+
+#include "offline_cache.h"
+#include <fstream>
+#include <taichi/io/io.h>
+#include <taichi/system/threading.h>
+
+// Like taichi/io/io.h, filesystem support is only used outside OSX
+#if !defined(TC_PLATFORM_OSX)
+namespace fs = std::experimental::filesystem;
+#endif
+
+TLANG_NAMESPACE_BEGIN
+
+namespace {
+bool read_file(const std::string &fn, std::string &content) {
+  std::ifstream ifs(fn, std::ios::binary);
+  if (!ifs)
+    return false;
+  content.assign(std::istreambuf_iterator<char>(ifs),
+                 std::istreambuf_iterator<char>());
+  return (bool)ifs || ifs.eof();
+}
+
+bool write_file_atomic(const std::string &fn, const std::string &content) {
+  auto tmp_fn = fmt::format("{}.{}.tmp", fn, PID::get_pid());
+  {
+    std::ofstream ofs(tmp_fn, std::ios::binary);
+    if (!ofs)
+      return false;
+    ofs.write(content.data(), content.size());
+    if (!ofs)
+      return false;
+  }
+#if defined(TC_PLATFORM_WINDOWS)
+  // std::rename does not replace existing files on Windows
+  return MoveFileExA(tmp_fn.c_str(), fn.c_str(), MOVEFILE_REPLACE_EXISTING) !=
+         0;
+#else
+  return std::rename(tmp_fn.c_str(), fn.c_str()) == 0;
+#endif
+}
+}  // namespace
+
+OfflineCache::OfflineCache(const std::string &path, uint64 max_size)
+    : path(path.empty() ? default_path() : path), max_size(max_size) {
+  create_directories(this->path);
+}
+
+std::string OfflineCache::default_path() {
+  return get_repo_dir() + "/.tlang_cache/llvm";
+}
+
+bool OfflineCache::load(const std::string &key,
+                        std::string &object,
+                        std::vector<std::string> &task_names) {
+  std::string tasks;
+  // The task list is written after the object, so its presence implies a
+  // complete entry.
+  if (!read_file(tasks_fn(key), tasks) || !read_file(object_fn(key), object))
+    return false;
+  task_names.clear();
+  std::size_t begin = 0;
+  while (begin < tasks.size()) {
+    auto end = tasks.find('\n', begin);
+    if (end == std::string::npos)
+      end = tasks.size();
+    if (end > begin)
+      task_names.push_back(tasks.substr(begin, end - begin));
+    begin = end + 1;
+  }
+  if (task_names.empty())
+    return false;
+#if !defined(TC_PLATFORM_OSX)
+  // Refresh the timestamp so that eviction is least-recently-used
+  std::error_code ec;
+  fs::last_write_time(object_fn(key), fs::file_time_type::clock::now(), ec);
+#endif
+  return true;
+}
+
+void OfflineCache::store(const std::string &key,
+                         const std::string &object,
+                         const std::vector<std::string> &task_names) {
+  std::string tasks;
+  for (auto &name : task_names) {
+    tasks += name + "\n";
+  }
+  if (!write_file_atomic(object_fn(key), object) ||
+      !write_file_atomic(tasks_fn(key), tasks)) {
+    TC_WARN("Failed to write kernel cache entry {} to {}", key, path);
+    return;
+  }
+  evict();
+}
+
+void OfflineCache::evict() {
+#if !defined(TC_PLATFORM_OSX)
+  struct Entry {
+    fs::path object;
+    fs::file_time_type time;
+    uint64 size;
+  };
+  std::vector<Entry> entries;
+  uint64 total_size = 0;
+  std::error_code ec;
+  for (auto &f : fs::directory_iterator(path, ec)) {
+    if (f.path().extension() != ".o")
+      continue;
+    auto tasks = f.path();
+    tasks.replace_extension(".tasks");
+    auto size = fs::file_size(f.path(), ec) + fs::file_size(tasks, ec);
+    if (ec) {
+      ec.clear();
+      continue;
+    }
+    entries.push_back({f.path(), fs::last_write_time(f.path(), ec), size});
+    total_size += size;
+  }
+  if (total_size <= max_size)
+    return;
+  std::sort(entries.begin(), entries.end(),
+            [](const Entry &a, const Entry &b) { return a.time < b.time; });
+  for (auto &entry : entries) {
+    if (total_size <= max_size)
+      break;
+    auto tasks = entry.object;
+    tasks.replace_extension(".tasks");
+    // Remove the task list first so that readers never see an entry
+    // without its object
+    fs::remove(tasks, ec);
+    fs::remove(entry.object, ec);
+    total_size -= entry.size;
+  }
+#endif
+}
+
+TLANG_NAMESPACE_END
@@ -0,0 +1,44 @@
+// On-disk cache of compiled kernel objects, shared across processes
+#pragma once
+
+#include "../tlang_util.h"
+
+TLANG_NAMESPACE_BEGIN
+
+// Each entry is a relocatable object file "<key>.o" plus "<key>.tasks", the
+// names of the offloaded task functions it defines, in launch order.
+// Entries are written to a temporary file first and renamed, so that
+// concurrent processes never observe partially written entries.
+class OfflineCache {
+ public:
+  OfflineCache(const std::string &path, uint64 max_size);
+
+  bool load(const std::string &key,
+            std::string &object,
+            std::vector<std::string> &task_names);
+
+  void store(const std::string &key,
+             const std::string &object,
+             const std::vector<std::string> &task_names);
+
+  // Removes the least recently used entries until the total size of the
+  // cache is within max_size. Entries are never evicted on OSX, where
+  // filesystem support is unavailable (see taichi/io/io.h).
+  void evict();
+
+  static std::string default_path();
+
+ private:
+  std::string path;
+  uint64 max_size;
+
+  std::string object_fn(const std::string &key) const {
+    return fmt::format("{}/{}.o", path, key);
+  }
+
+  std::string tasks_fn(const std::string &key) const {
+    return fmt::format("{}/{}.tasks", path, key);
+  }
+};
+
+TLANG_NAMESPACE_END
@@ -42,6 +42,22 @@ void StructCompiler::collect_snodes(SNode &snode) {
 
 void StructCompiler::infer_snode_properties(SNode &snode) {
   // TC_P(snode.type_name());
+  if (snode._packed) {
+    // Indices are still split into bit fields among the levels, so a
+    // non-power-of-two packed node can only be the outermost node along the
+    // index, otherwise different indices would map to the same cell.
+    for (int i = 0; i < max_num_indices; i++) {
+      if (!snode.extractors[i].active ||
+          bit::is_power_of_two(snode.extractors[i].shape))
+        continue;
+      for (auto p = snode.parent; p != nullptr; p = p->parent) {
+        TC_ERROR_IF(p->extractors[i].num_bits > 0,
+                    "Packed node {} of non-power-of-two size {} must be the "
+                    "outermost node along index {}.",
+                    snode.node_type_name, snode.extractors[i].shape, i);
+      }
+    }
+  }
   for (int ch_id = 0; ch_id < (int)snode.ch.size(); ch_id++) {
     auto &ch = snode.ch[ch_id];
     ch->parent = &snode;
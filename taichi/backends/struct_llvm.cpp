@@ -7,6 +7,7 @@
 #include "struct.h"
 #include "llvm/IR/Verifier.h"
 #include <llvm/IR/IRBuilder.h>
+#include <deque>
 
 extern "C" void *taichi_allocate_aligned(std::size_t size, int alignment);
 
@@ -50,9 +51,14 @@ void StructCompilerLLVM::generate_types(SNode &snode) {
     TC_ASSERT(snode._morton == false);
     body_type = llvm::ArrayType::get(ch_type, snode.max_num_elements());
     if (snode._bitmasked) {
-      aux_type = llvm::ArrayType::get(Type::getInt32Ty(*llvm_ctx),
-                                      (snode.max_num_elements() + 31) / 32);
+      // 64-bit words, scanned by Dense_next_active_slot
+      aux_type = llvm::ArrayType::get(Type::getInt64Ty(*llvm_ctx),
+                                      (snode.max_num_elements() + 63) / 64);
     }
+  } else if (type == SNodeType::hash) {
+    // The table (allocated on demand), and the number of active cells
+    body_type = llvm::PointerType::getInt8PtrTy(*ctx);
+    aux_type = llvm::Type::getInt32Ty(*ctx);
   } else if (type == SNodeType::root) {
     body_type = ch_type;
   } else if (type == SNodeType::place) {
@@ -64,13 +70,12 @@ void StructCompilerLLVM::generate_types(SNode &snode) {
       body_type = llvm::Type::getDoubleTy(*ctx);
     }
   } else if (type == SNodeType::pointer) {
+    // Activation is lock-free, so there is no mutex
     body_type = llvm::PointerType::getInt8PtrTy(*ctx);
-    // mutex
-    aux_type = llvm::PointerType::getInt32Ty(*ctx);
   } else if (type == SNodeType::dynamic) {
     body_type = llvm::PointerType::getInt8PtrTy(*ctx);
     // TODO: maybe load a struct from runtime?
-    // n (number of elements), and the mutex
+    // padding, and n (number of elements)
     aux_type =
         llvm::StructType::get(*ctx, {llvm::PointerType::getInt32Ty(*ctx),
                                      llvm::PointerType::getInt32Ty(*ctx)});
@@ -117,9 +122,25 @@ void StructCompilerLLVM::generate_refine_coordinates(SNode *snode) {
   auto outp_coords = args[1];
   auto l = args[2];
 
+  // Packed nodes linearize indices with the last index varying fastest, so
+  // the digits are peeled off from the last index
+  auto remainder = l;
+  std::vector<Value *> additions(max_num_indices, tlctx->get_constant(0));
+  for (int i = max_num_indices - 1; i >= 0; i--) {
+    if (snode->_packed && snode->extractors[i].active) {
+      auto shape = tlctx->get_constant(snode->extractors[i].shape);
+      auto addition = builder.CreateSRem(remainder, shape);
+      remainder = builder.CreateSDiv(remainder, shape);
+      additions[i] = builder.CreateShl(
+          addition, tlctx->get_constant(snode->extractors[i].start));
+    }
+  }
+
   for (int i = 0; i < max_num_indices; i++) {
-    auto addition = tlctx->get_constant(0);
-    if (snode->extractors[i].num_bits) {
+    auto addition = additions[i];
+    // The coordinates of hash cells are stored in their slots instead
+    if (!snode->_packed && snode->extractors[i].num_bits &&
+        snode->type != SNodeType::hash) {
       auto mask = ((1 << snode->extractors[i].num_bits) - 1);
       addition = builder.CreateAnd(
           builder.CreateAShr(l, snode->extractors[i].acc_offset), mask);
@@ -241,8 +262,8 @@ void StructCompilerLLVM::run(SNode &root, bool host) {
       load_accessors(*n);
     }
 
-    auto initialize_data_structure = tlctx->lookup_function<
-        std::function<void *(void *, int, std::size_t, int, void *)>>(
+    auto initialize_data_structure = tlctx->lookup_function<std::function<
+        void *(void *, int, std::size_t, int, void *, void *, void *)>>(
         "Runtime_initialize");
 
     auto get_allocator =
@@ -253,36 +274,78 @@ void StructCompilerLLVM::run(SNode &root, bool host) {
         tlctx->lookup_function<std::function<void(void *, int)>>(
             "Runtime_allocate_ambient");
 
+    auto initialize_element_list =
+        tlctx->lookup_function<std::function<void(void *, int, uint64)>>(
+            "Runtime_initialize_element_list");
+
     auto initialize_allocator = tlctx->lookup_function<
         std::function<void *(void *, void *, std::size_t)>>(
         "NodeAllocator_initialize");
 
+    auto get_directory_allocator =
+        tlctx->lookup_function<std::function<void *(void *, int)>>(
+            "Runtime_get_directory_allocators");
+
     auto snodes = this->snodes;
     auto tlctx = this->tlctx;
     auto root_id = root.id;
     creator = [=]() {
       TC_INFO("Allocating data structure of size {}", root_size);
+      auto &prog = get_current_program();
       auto root_ptr = initialize_data_structure(
-          &get_current_program().llvm_runtime, (int)snodes.size(), root_size,
-          root_id, (void *)&::taichi_allocate_aligned);
+          &prog.llvm_runtime, (int)snodes.size(), root_size, root_id,
+          (void *)&::taichi_allocate_aligned, (void *)prog.thread_pool.get(),
+          (void *)&ThreadPool::static_run);
       for (int i = 0; i < (int)snodes.size(); i++) {
+        // Element lists are only generated for the non-leaf snodes, and hold
+        // at most all the cells of the snode
+        if (snodes[i]->type != SNodeType::place &&
+            snodes[i]->type != SNodeType::root) {
+          uint64 max_num_elements = 1;
+          for (auto p = snodes[i]; p; p = p->parent) {
+            if (p->type == SNodeType::hash)
+              max_num_elements *= p->hash_table_size;
+            else
+              max_num_elements *= p->max_num_elements();
+            // Saturate, as the runtime caps the list size anyway
+            max_num_elements = std::min(max_num_elements, uint64(1) << 40);
+          }
+          initialize_element_list(prog.llvm_runtime, i, max_num_elements);
+        }
         if (snodes[i]->type == SNodeType::pointer ||
-            snodes[i]->type == SNodeType::dynamic) {
+            snodes[i]->type == SNodeType::dynamic ||
+            snodes[i]->type == SNodeType::hash) {
           std::size_t chunk_size;
           if (snodes[i]->type == SNodeType::pointer)
             chunk_size = tlctx->get_type_size(snodes[i]->ch[0]->llvm_body_type);
+          else if (snodes[i]->type == SNodeType::hash)
+            chunk_size = tlctx->get_type_size(snodes[i]->llvm_element_type);
           else {
             // dynamic. Allocators are for the chunks
             chunk_size =
-                sizeof(void *) +
-                tlctx->get_type_size(snodes[i]->ch[0]->llvm_body_type) *
-                    snodes[i]->chunk_size;
+                tlctx->get_type_size(snodes[i]->llvm_element_type) *
+                snodes[i]->chunk_size;
           }
           TC_INFO("Initializing allocator for snode {} (chunk size {})",
                   snodes[i]->id, chunk_size);
           auto rt = get_current_program().llvm_runtime;
           auto allocator = get_allocator(rt, i);
           initialize_allocator(rt, allocator, chunk_size);
+          if (snodes[i]->type == SNodeType::dynamic) {
+            // One directory entry per chunk
+            auto num_chunks =
+                (snodes[i]->max_num_elements() + snodes[i]->chunk_size - 1) /
+                snodes[i]->chunk_size;
+            initialize_allocator(rt, get_directory_allocator(rt, i),
+                                 sizeof(void *) * num_chunks);
+          } else if (snodes[i]->type == SNodeType::hash) {
+            // One table per node, of HashSlot {key, value, coords} in the
+            // runtime
+            auto slot_size = sizeof(uint64) + sizeof(void *) +
+                             sizeof(int32) * max_num_indices;
+            initialize_allocator(rt, get_directory_allocator(rt, i),
+                                 slot_size * snodes[i]->hash_table_size);
+          }
           TC_INFO("Allocating ambient element for snode {} (chunk size {})",
                   snodes[i]->id, chunk_size);
           allocate_ambient(rt, i);
@@ -304,6 +367,56 @@ std::unique_ptr<StructCompiler> StructCompiler::make(bool use_llvm, Arch arch) {
 llvm::Type *SNode::get_body_type() { return llvm_body_type; }
 llvm::Type *SNode::get_aux_type() { return llvm_aux_type; }
 
+std::pair<uint64, std::vector<int64>> SNode::get_dense_layout() {
+  TC_ERROR_IF(type != SNodeType::place, "Only place nodes have a layout.");
+  auto tlctx = get_current_program().llvm_context_host.get();
+  auto &data_layout = tlctx->jit->getDataLayout();
+
+  struct Level {
+    int64 count, stride;
+  };
+  // Levels along each index, from the outermost
+  std::vector<Level> levels[max_num_indices];
+  uint64 offset = 0;
+  std::deque<SNode *> path;
+  for (auto p = this; p != nullptr; p = p->parent)
+    path.push_front(p);
+  for (int i = 0; i + 1 < (int)path.size(); i++) {
+    auto p = path[i];
+    TC_ERROR_IF(
+        p->type != SNodeType::root &&
+            (p->type != SNodeType::dense || p->_bitmasked),
+        "{} is under a {} node, but only dense nodes have a fixed layout.",
+        name, p->type_name());
+    auto element_type = llvm::cast<llvm::StructType>(p->llvm_element_type);
+    offset += data_layout.getStructLayout(element_type)
+                  ->getElementOffset(p->child_id(path[i + 1]));
+    // The same linearization as in lower_access
+    int64 stride = tlctx->get_type_size(element_type);
+    for (int q = num_active_indices - 1; q >= 0; q--) {
+      if (p->physical_index_position[q] == -1)
+        continue;
+      auto &e = p->extractors[p->physical_index_position[q]];
+      int64 count = p->_packed ? e.shape : (1 << e.num_bits);
+      if (count > 1)
+        levels[q].push_back(Level{count, stride});
+      stride *= count;
+    }
+  }
+
+  std::vector<int64> strides;
+  for (int q = 0; q < num_active_indices; q++) {
+    for (int l = 0; l + 1 < (int)levels[q].size(); l++) {
+      auto &inner = levels[q][l + 1];
+      TC_ERROR_IF(levels[q][l].stride != inner.count * inner.stride,
+                  "The cells of {} are not evenly spaced along index {}.",
+                  name, physical_index_position[q]);
+    }
+    strides.push_back(levels[q].empty() ? 0 : levels[q].back().stride);
+  }
+  return std::make_pair(offset, strides);
+}
+
 bool SNode::need_activation() const {
   return type == SNodeType::pointer || type == SNodeType::hash ||
          (type == SNodeType::dense && _bitmasked) ||
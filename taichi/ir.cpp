@@ -189,8 +189,6 @@ FrontendForStmt::FrontendForStmt(const Expr &loop_var,
   if (get_current_program().config.arch == Arch::gpu) {
     vectorize = 1;
     parallelize = 1;
-  } else {
-    block_dim = 1;
   }
   scratch_opt = dec.scratch_opt;
   dec.reset();
@@ -209,8 +207,6 @@ FrontendForStmt::FrontendForStmt(const ExprGroup &loop_var,
   if (get_current_program().config.arch == Arch::gpu) {
     vectorize = 1;
     parallelize = 1;
-  } else {
-    block_dim = 1;
   }
   scratch_opt = dec.scratch_opt;
   dec.reset();
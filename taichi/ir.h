@@ -81,7 +81,7 @@ void flag_access(IRNode *root);
 void die(IRNode *root);
 void simplify(IRNode *root);
 void full_simplify(IRNode *root);
-void print(IRNode *root);
+void print(IRNode *root, std::string *output = nullptr);
 void lower(IRNode *root);
 void typecheck(IRNode *root);
 void loop_vectorize(IRNode *root);
@@ -1494,12 +1494,22 @@ class SNodeOpStmt : public Stmt {
   LaneAttribute<SNode *> snodes;
   std::vector<Stmt *> indices;
   Stmt *val;
+  // The node (e.g. dynamic) to operate on, set by lower_access on LLVM
+  // backends
+  Stmt *ptr;
+  // The index of the cell in ptr, set by lower_access for deactivation
+  Stmt *cell_index;
 
   SNodeOpStmt(SNodeOpType op_type,
               const LaneAttribute<SNode *> &snodes,
               const std::vector<Stmt *> &indices,
               Stmt *val = nullptr)
-      : op_type(op_type), snodes(snodes), indices(indices), val(val) {
+      : op_type(op_type),
+        snodes(snodes),
+        indices(indices),
+        val(val),
+        ptr(nullptr),
+        cell_index(nullptr) {
     TC_ASSERT_INFO(snodes.size() == 1, "SNodeOpStmt cannot be vectorized");
     TC_ASSERT((val == nullptr) != (op_type == SNodeOpType::append));
     for (int i = 0; i < (int)snodes.size(); i++) {
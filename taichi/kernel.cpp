@@ -1,3 +1,4 @@
+#include <cstring>
 #include <taichi/common/task.h>
 #include "kernel.h"
 #include "program.h"
@@ -14,6 +15,7 @@ Kernel::Kernel(Program &program,
     : program(program), name(name), grad(grad) {
   program.initialize_device_llvm_context();
   is_reduction = false;
+  is_accessor = false;
   compiled = nullptr;
   benchmarking = false;
   taichi::Tlang::context = std::make_unique<FrontendContext>();
@@ -41,6 +43,10 @@ void Kernel::compile() {
 void Kernel::operator()() {
   if (!compiled)
     compile();
+  // Record before launching, since GPU launches replace array arguments with
+  // device buffers
+  if (program.launch_graph && !is_accessor)
+    program.launch_graph->record(*this);
   std::vector<void *> host_buffers(args.size());
   std::vector<void *> device_buffers(args.size());
   if (arch == Arch::gpu) {
@@ -60,7 +66,8 @@ void Kernel::operator()() {
     }
     if (has_buffer)
       cudaDeviceSynchronize();
-    auto c = program.get_context();
+    // Return values are copied back to the program context
+    auto &c = program.get_context();
     compiled(c);
     if (has_buffer)
       cudaDeviceSynchronize();
@@ -77,6 +84,7 @@ void Kernel::operator()() {
   } else {
     auto &c = program.get_context();
     compiled(c);
+    program.check_runtime_error();
   }
   program.sync = false;
 }
@@ -140,6 +148,42 @@ void Kernel::mark_arg_return_value(int i, bool is_return) {
   args[i].is_return_value = is_return;
 }
 
+float64 Kernel::get_ret_float(int i) {
+  TC_ASSERT_INFO(args[i].is_return_value,
+                 "Reading an argument that is not a return value");
+  auto dt = args[i].dt;
+  if (dt == DataType::f32) {
+    return (float64)program.context.get_arg<float32>(i);
+  } else if (dt == DataType::f64) {
+    return (float64)program.context.get_arg<float64>(i);
+  } else if (dt == DataType::i32) {
+    return (float64)program.context.get_arg<int32>(i);
+  } else if (dt == DataType::i64) {
+    return (float64)program.context.get_arg<int64>(i);
+  } else {
+    TC_NOT_IMPLEMENTED
+  }
+  return 0;
+}
+
+int64 Kernel::get_ret_int(int i) {
+  TC_ASSERT_INFO(args[i].is_return_value,
+                 "Reading an argument that is not a return value");
+  auto dt = args[i].dt;
+  if (dt == DataType::i32) {
+    return (int64)program.context.get_arg<int32>(i);
+  } else if (dt == DataType::i64) {
+    return (int64)program.context.get_arg<int64>(i);
+  } else if (dt == DataType::f32) {
+    return (int64)program.context.get_arg<float32>(i);
+  } else if (dt == DataType::f64) {
+    return (int64)program.context.get_arg<float64>(i);
+  } else {
+    TC_NOT_IMPLEMENTED
+  }
+  return 0;
+}
+
 void Kernel::set_arg_nparray(int i, uint64 d, uint64 size) {
   TC_ASSERT_INFO(args[i].is_nparray,
                  "Setting numpy array to scalar argument is not allowed");
@@ -157,4 +201,40 @@ int Kernel::insert_arg(DataType dt, bool is_nparray) {
   return args.size() - 1;
 }
 
+void LaunchGraph::record(Kernel &kernel) {
+  auto program = &kernel.program;
+  if (program_generation == 0)
+    program_generation = program->generation;
+  TC_ASSERT_INFO(program_generation == program->generation,
+                 "Launches of a graph must belong to the same program");
+  Launch launch;
+  launch.kernel = &kernel;
+  for (auto &arg : kernel.args)
+    launch.arg_sizes.push_back(arg.size);
+  std::memcpy(launch.args, program->context.args, sizeof(launch.args));
+  std::memcpy(launch.extra_args, program->context.extra_args,
+              sizeof(launch.extra_args));
+  launches.push_back(std::move(launch));
+}
+
+void LaunchGraph::replay(int n) {
+  if (launches.empty())
+    return;
+  TC_ASSERT_INFO(current_program != nullptr &&
+                     current_program->generation == program_generation,
+                 "The program of the launch graph has been reset");
+  auto &context = current_program->context;
+  for (int i = 0; i < n; i++) {
+    for (auto &launch : launches) {
+      auto &kernel = *launch.kernel;
+      for (int j = 0; j < (int)launch.arg_sizes.size(); j++)
+        kernel.args[j].size = launch.arg_sizes[j];
+      std::memcpy(context.args, launch.args, sizeof(launch.args));
+      std::memcpy(context.extra_args, launch.extra_args,
+                  sizeof(launch.extra_args));
+      kernel();
+    }
+  }
+}
+
 TLANG_NAMESPACE_END
@@ -36,6 +36,9 @@ class Kernel {
   bool benchmarking;
   bool is_reduction;  // TODO: systematically treat all types of reduction
   bool grad;
+  // Host-side tensor access (e.g. x[i] in Python), which launch graphs do not
+  // record
+  bool is_accessor;
 
   Kernel(Program &program,
          std::function<void()> func,
@@ -60,9 +63,41 @@ class Kernel {
 
   void mark_arg_return_value(int i, bool is_return = true);
 
+  float64 get_ret_float(int i);
+
+  int64 get_ret_int(int i);
+
   void set_arg_nparray(int i, uint64 ptr, uint64 size);
 
   void set_arch(Arch arch);
 };
 
+// A recorded sequence of kernel launches and their arguments, which can be
+// launched again from C++ without going through Python
+class LaunchGraph {
+ public:
+  struct Launch {
+    Kernel *kernel;
+    std::vector<std::size_t> arg_sizes;
+    uint64 args[max_num_args];
+    int32 extra_args[max_num_args][max_num_indices];
+  };
+
+  // The generation of the program the launches belong to, since the
+  // program may be reset (and another allocated at the same address)
+  int program_generation;
+  std::vector<Launch> launches;
+
+  LaunchGraph() : program_generation(0) {
+  }
+
+  void record(Kernel &kernel);
+
+  void replay(int n = 1);
+
+  int size() const {
+    return (int)launches.size();
+  }
+};
+
 TLANG_NAMESPACE_END
@@ -17,6 +17,7 @@ TLANG_NAMESPACE_BEGIN
 
 Program *current_program = nullptr;
 std::atomic<int> Program::num_instances;
+std::atomic<int> Program::num_generations;
 SNode root;
 
 FunctionType Program::compile(Kernel &kernel) {
@@ -66,9 +67,37 @@ void Program::synchronize() {
 #endif
     }
     sync = true;
+    check_runtime_error();
   }
 }
 
+void Program::check_runtime_error() {
+  if (!config.use_llvm || llvm_runtime == nullptr)
+    return;
+  // Looked up once, since this runs after every launch
+  if (!get_runtime_error_code) {
+    get_runtime_error_code =
+        llvm_context_host->lookup_function<std::function<int32(void *)>>(
+            "Runtime_get_error_code");
+  }
+  auto error_code = get_runtime_error_code(llvm_runtime);
+  if (error_code == 0)
+    return;
+  auto get_error_snode_id =
+      llvm_context_host->lookup_function<std::function<int32(void *)>>(
+          "Runtime_get_error_snode_id");
+  auto set_error_code =
+      llvm_context_host->lookup_function<std::function<void(void *, int32)>>(
+          "Runtime_set_error_code");
+  auto snode_id = get_error_snode_id(llvm_runtime);
+  set_error_code(llvm_runtime, 0);
+  // Matches runtime_error_hash_table_full in runtime.cpp
+  TC_ERROR_IF(error_code == 1,
+              "The hash table of snode {} is full. Increase its table_size.",
+              snode_id);
+  TC_ERROR("Unknown runtime error {}", error_code);
+}
+
 std::string capitalize_first(std::string s) {
   s[0] = std::toupper(s[0]);
   return s;
@@ -161,7 +190,10 @@ Program::Program(Arch arch) {
 #endif
   TC_ASSERT_INFO(num_instances == 0, "Only one instance at a time");
   total_compilation_time = 0;
+  offline_cache_hits = 0;
+  launch_graph = nullptr;
   num_instances += 1;
+  generation = ++num_generations;
   SNode::counter = 0;
   // llvm_context_device is initialized before kernel compilation
   UnifiedAllocator::create();
@@ -169,6 +201,9 @@ Program::Program(Arch arch) {
   current_program = this;
   config = default_compile_config;
   config.arch = arch;
+  // Only CPU kernels run on the pool, so GPU programs do not spawn workers
+  if (config.arch == Arch::x86_64)
+    thread_pool = std::make_unique<ThreadPool>(config.cpu_max_num_threads);
   if (config.use_llvm) {
     llvm_context_host = std::make_unique<TaichiLLVMContext>(Arch::x86_64);
     if (config.arch == Arch::x86_64) {
@@ -192,6 +227,86 @@ void Program::initialize_device_llvm_context() {
   }
 }
 
+std::vector<SNodeMemoryStat> Program::get_memory_stats() {
+  TC_ERROR_IF(!config.use_llvm || llvm_runtime == nullptr,
+              "Memory statistics are only available after the layout is "
+              "materialized with the LLVM backends.");
+  synchronize();
+  auto tlctx = llvm_context_host.get();
+  auto get_element_list =
+      tlctx->lookup_function<std::function<void *(void *, int)>>(
+          "Runtime_get_element_lists");
+  auto get_node_allocator =
+      tlctx->lookup_function<std::function<void *(void *, int)>>(
+          "Runtime_get_node_allocators");
+  auto get_directory_allocator =
+      tlctx->lookup_function<std::function<void *(void *, int)>>(
+          "Runtime_get_directory_allocators");
+  auto get_list_field = [&](const std::string &field) {
+    return tlctx->lookup_function<std::function<int(void *)>>(
+        "ElementList_get_" + field);
+  };
+  auto list_tail = get_list_field("tail");
+  auto list_max_tail = get_list_field("max_tail");
+  auto list_capacity = get_list_field("capacity");
+  auto allocator_node_size =
+      tlctx->lookup_function<std::function<std::size_t(void *)>>(
+          "NodeAllocator_get_node_size");
+  auto allocator_tail = tlctx->lookup_function<std::function<int(void *)>>(
+      "NodeAllocator_get_tail");
+  auto allocator_num_active =
+      tlctx->lookup_function<std::function<int(void *)>>(
+          "NodeAllocator_get_num_active");
+
+  std::vector<SNodeMemoryStat> stats;
+  std::function<void(SNode *)> visit = [&](SNode *snode) {
+    if (snode->type == SNodeType::place)
+      return;
+    SNodeMemoryStat stat;
+    stat.snode_id = snode->id;
+    stat.type = snode->type_name();
+    stat.num_bytes = 0;
+    stat.node_size = 0;
+    stat.num_active_nodes = 0;
+    stat.max_num_nodes = 0;
+    if (snode->type == SNodeType::root) {
+      stat.num_bytes = tlctx->get_type_size(snode->llvm_type);
+    } else if (snode->type == SNodeType::pointer ||
+               snode->type == SNodeType::dynamic ||
+               snode->type == SNodeType::hash) {
+      auto allocator = get_node_allocator(llvm_runtime, snode->id);
+      stat.node_size = allocator_node_size(allocator);
+      stat.num_active_nodes = allocator_num_active(allocator);
+      stat.max_num_nodes = allocator_tail(allocator);
+      stat.num_bytes = (uint64)stat.max_num_nodes * stat.node_size;
+      if (snode->type == SNodeType::dynamic ||
+          snode->type == SNodeType::hash) {
+        auto directory = get_directory_allocator(llvm_runtime, snode->id);
+        stat.num_bytes +=
+            (uint64)allocator_tail(directory) * allocator_node_size(directory);
+      }
+    }
+    auto list = get_element_list(llvm_runtime, snode->id);
+    stat.element_list_size = list_tail(list);
+    stat.element_list_max_size = list_max_tail(list);
+    stat.element_list_capacity = list_capacity(list);
+    stats.push_back(stat);
+    for (auto &ch : snode->ch)
+      visit(ch.get());
+  };
+  visit(snode_root);
+  return stats;
+}
+
+uint64 Program::get_total_requested_memory() {
+  TC_ERROR_IF(!config.use_llvm || llvm_runtime == nullptr,
+              "Memory statistics are only available after the layout is "
+              "materialized with the LLVM backends.");
+  auto get_total = llvm_context_host->lookup_function<
+      std::function<uint64(void *)>>("Runtime_get_total_requested_memory");
+  return get_total(llvm_runtime);
+}
+
 void Program::clear_all_gradients() {
   if (!clear_all_gradients_initialized) {
     initialize_gradient_clearers();
@@ -217,6 +332,7 @@ Kernel &Program::get_snode_reader(SNode *snode) {
   });
   ker.set_arch(get_host_arch());
   ker.name = kernel_name;
+  ker.is_accessor = true;
   for (int i = 0; i < snode->num_active_indices; i++)
     ker.insert_arg(DataType::i32, false);
   auto ret_val = ker.insert_arg(snode->dt, false);
@@ -238,6 +354,7 @@ Kernel &Program::get_snode_writer(SNode *snode) {
   });
   ker.set_arch(get_host_arch());
   ker.name = kernel_name;
+  ker.is_accessor = true;
   for (int i = 0; i < snode->num_active_indices; i++)
     ker.insert_arg(DataType::i32, false);
   ker.insert_arg(snode->dt, false);
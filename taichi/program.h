@@ -10,6 +10,7 @@
 #include <atomic>
 #include <taichi/context.h>
 #include <taichi/profiler.h>
+#include <taichi/system/threading.h>
 #include <taichi/unified_allocator.h>
 #if defined(TC_PLATFORM_UNIX)
 #include <dlfcn.h>
@@ -20,6 +21,22 @@ TLANG_NAMESPACE_BEGIN
 extern Program *current_program;
 extern SNode root;
 
+// Memory usage of an SNode, read from the counters of the LLVM runtime
+struct SNodeMemoryStat {
+  int snode_id;
+  std::string type;
+  // Bytes taken from the node allocators of the snode, or the size of the
+  // root buffer. Dense nodes live in the memory of their ancestors.
+  uint64 num_bytes;
+  std::size_t node_size;
+  int num_active_nodes;
+  // High-water mark of the number of nodes in use
+  int max_num_nodes;
+  int element_list_size;
+  int element_list_max_size;
+  int element_list_capacity;
+};
+
 TC_FORCE_INLINE Program &get_current_program() { return *current_program; }
 
 class Program {
@@ -37,14 +54,24 @@ public:
   CPUProfiler cpu_profiler;
   Context context;
   std::unique_ptr<TaichiLLVMContext> llvm_context_host, llvm_context_device;
+  std::unique_ptr<ThreadPool> thread_pool;
+  // Launches are recorded into this graph when it is not null
+  LaunchGraph *launch_graph;
   bool sync; // device/host synchronized?
   bool clear_all_gradients_initialized;
   bool finalized;
   float64 total_compilation_time;
+  // Number of kernels loaded from the offline cache instead of compiled
+  int offline_cache_hits;
   static std::atomic<int> num_instances;
+  // Distinguishes this program from earlier ones that may have been
+  // allocated at the same address
+  int generation;
+  static std::atomic<int> num_generations;
 
   std::vector<std::unique_ptr<Kernel>> functions;
 
+  std::function<int32(void *)> get_runtime_error_code;
   std::function<void()> profiler_print_gpu;
   std::function<void()> profiler_clear_gpu;
   std::unique_ptr<ProfilerBase> profiler_llvm;
@@ -75,6 +102,10 @@ public:
     }
   }
 
+  std::vector<SNodeMemoryStat> get_memory_stats();
+
+  uint64 get_total_requested_memory();
+
   Context &get_context() {
     context.buffers[0] = data_structure;
     context.cpu_profiler = &cpu_profiler;
@@ -94,6 +125,9 @@ public:
 
   void synchronize();
 
+  // Raises the errors recorded by the runtime during kernel launches
+  void check_runtime_error();
+
   void finalize() {
     current_program = nullptr;
     for (auto &dll : loaded_dlls) {
@@ -104,6 +138,7 @@ public:
 #endif
     }
     UnifiedAllocator::free();
+    thread_pool.reset();
     finalized = true;
     num_instances -= 1;
   }
@@ -183,6 +218,8 @@ public:
   Arch get_host_arch() { return Arch::x86_64; }
 
   float64 get_total_compilation_time() { return total_compilation_time; }
+
+  int get_offline_cache_hits() { return offline_cache_hits; }
 };
 
 TLANG_NAMESPACE_END
@@ -52,6 +52,14 @@ void export_lang(py::module &m) {
       .def_readwrite("lower_access", &CompileConfig::lower_access)
       .def_readwrite("default_gpu_block_dim",
                      &CompileConfig::default_gpu_block_dim)
+      .def_readwrite("default_cpu_block_dim",
+                     &CompileConfig::default_cpu_block_dim)
+      .def_readwrite("cpu_max_num_threads",
+                     &CompileConfig::cpu_max_num_threads)
+      .def_readwrite("offline_cache", &CompileConfig::offline_cache)
+      .def_readwrite("offline_cache_path", &CompileConfig::offline_cache_path)
+      .def_readwrite("offline_cache_max_size",
+                     &CompileConfig::offline_cache_max_size)
       .def_readwrite("verbose_kernel_launches",
                      &CompileConfig::verbose_kernel_launches)
       .def_readwrite("enable_profiler", &CompileConfig::enable_profiler)
@@ -64,16 +72,35 @@ void export_lang(py::module &m) {
         [&]() -> CompileConfig & { return default_compile_config; },
         py::return_value_policy::reference);
 
+  py::class_<SNodeMemoryStat>(m, "SNodeMemoryStat")
+      .def_readonly("snode_id", &SNodeMemoryStat::snode_id)
+      .def_readonly("type", &SNodeMemoryStat::type)
+      .def_readonly("num_bytes", &SNodeMemoryStat::num_bytes)
+      .def_readonly("node_size", &SNodeMemoryStat::node_size)
+      .def_readonly("num_active_nodes", &SNodeMemoryStat::num_active_nodes)
+      .def_readonly("max_num_nodes", &SNodeMemoryStat::max_num_nodes)
+      .def_readonly("element_list_size", &SNodeMemoryStat::element_list_size)
+      .def_readonly("element_list_max_size",
+                    &SNodeMemoryStat::element_list_max_size)
+      .def_readonly("element_list_capacity",
+                    &SNodeMemoryStat::element_list_capacity);
+
   py::class_<Program>(m, "Program")
       .def(py::init<>())
       .def_readonly("config", &Program::config)
       .def("clear_all_gradients", &Program::clear_all_gradients)
       .def("profiler_print", &Program::profiler_print)
-      .def("profiler_print", &Program::profiler_clear)
+      .def("profiler_clear", &Program::profiler_clear)
+      .def("get_memory_stats", &Program::get_memory_stats)
+      .def("get_total_requested_memory",
+           &Program::get_total_requested_memory)
       .def("finalize", &Program::finalize)
       .def("get_snode_writer", &Program::get_snode_writer)
       .def("get_total_compilation_time", &Program::get_total_compilation_time)
-      .def("synchronize", &Program::synchronize);
+      .def("get_offline_cache_hits", &Program::get_offline_cache_hits)
+      .def("synchronize", &Program::synchronize)
+      .def("get_data_structure_address",
+           [](Program *program) { return (uint64)program->data_structure; });
 
   m.def("get_current_program", get_current_program,
         py::return_value_policy::reference);
@@ -90,11 +117,15 @@ void export_lang(py::module &m) {
       .def_readwrite("parent", &SNode::parent)
       .def("dense",
            (SNode & (SNode::*)(const std::vector<Index> &,
-                               const std::vector<int> &))(&SNode::dense),
+                               const std::vector<int> &, bool))(&SNode::dense),
            py::return_value_policy::reference)
       .def("dynamic", &SNode::dynamic_chunked,
            py::return_value_policy::reference)
       .def("pointer", &SNode::pointer, py::return_value_policy::reference)
+      .def("hash",
+           (SNode & (SNode::*)(const std::vector<Index>, std::vector<int>,
+                               int))(&SNode::hash),
+           py::return_value_policy::reference)
       .def("bitmasked", &SNode::bitmasked)
       .def("place", (SNode & (SNode::*)(Expr &))(&SNode::place),
            py::return_value_policy::reference)
@@ -106,6 +137,7 @@ void export_lang(py::module &m) {
       .def("write_int", &SNode::write_int)
       .def("write_float", &SNode::write_float)
       .def("get_num_elements_along_axis", &SNode::num_elements_along_axis)
+      .def("get_dense_layout", &SNode::get_dense_layout)
       .def("num_active_indices",
            [](SNode *snode) { return snode->num_active_indices; });
 
@@ -115,8 +147,31 @@ void export_lang(py::module &m) {
       .def("set_extra_arg_int", &Kernel::set_extra_arg_int)
       .def("set_arg_float", &Kernel::set_arg_float)
       .def("set_arg_nparray", &Kernel::set_arg_nparray)
+      .def("get_ret_float", &Kernel::get_ret_float)
+      .def("get_ret_int", &Kernel::get_ret_int)
+      .def_readwrite("is_accessor", &Kernel::is_accessor)
+      .def("compile",
+           [](Kernel *kernel) {
+             if (!kernel->compiled)
+               kernel->compile();
+           },
+           py::call_guard<py::gil_scoped_release>())
       .def("__call__", &Kernel::operator());
 
+  py::class_<LaunchGraph>(m, "LaunchGraph")
+      .def(py::init<>())
+      .def("replay", &LaunchGraph::replay,
+           py::call_guard<py::gil_scoped_release>())
+      .def("size", &LaunchGraph::size);
+
+  m.def("begin_capture", [](LaunchGraph *graph) {
+    auto &prog = get_current_program();
+    TC_ASSERT_INFO(prog.launch_graph == nullptr, "Already capturing");
+    prog.launch_graph = graph;
+  });
+
+  m.def("end_capture", [] { get_current_program().launch_graph = nullptr; });
+
   py::class_<Expr> expr(m, "Expr");
   expr.def("serialize", &Expr::serialize)
       .def("snode", &Expr::snode, py::return_value_policy::reference)
@@ -151,6 +206,10 @@ void export_lang(py::module &m) {
   m.def("insert_append", [](SNode *snode, const ExprGroup &indices,
                             const Expr &val) { Append(snode, indices, val); });
 
+  m.def("insert_deactivate", [](SNode *snode, const ExprGroup &indices) {
+    Deactivate(snode, indices);
+  });
+
   m.def("insert_len", [](SNode *snode, const ExprGroup &indices) {
     return Probe(snode, indices);
   });
@@ -327,6 +386,18 @@ void export_lang(py::module &m) {
                                                                  is_nparray);
   });
 
+  m.def("decl_ret", [&](DataType dt) {
+    auto &kernel = get_current_program().get_current_kernel();
+    auto ret = kernel.insert_arg(dt, false);
+    kernel.mark_arg_return_value(ret);
+    return ret;
+  });
+
+  m.def("insert_arg_store", [&](int arg_id, const Expr &val) {
+    current_ast_builder().insert(
+        Stmt::make<FrontendArgStoreStmt>(arg_id, load_if_ptr(val)));
+  });
+
   m.def("test_throw", [] {
     try {
       throw IRModified();
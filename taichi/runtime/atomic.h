@@ -4,6 +4,10 @@ int32 atomic_add_i32(volatile int32 *dest, int32 val) {
   return __atomic_fetch_add(dest, val, std::memory_order::memory_order_seq_cst);
 }
 
+int32 atomic_exchange_i32(volatile int32 *dest, int32 val) {
+  return __atomic_exchange_n(dest, val, std::memory_order::memory_order_seq_cst);
+}
+
 int64 atomic_add_i64(volatile int64 *dest, int64 val) {
   return __atomic_fetch_add(dest, val, std::memory_order::memory_order_seq_cst);
 }
@@ -20,6 +24,15 @@ uint64 atomic_and_u64(volatile uint64 *dest, uint64 val) {
   return __atomic_fetch_and(dest, val, std::memory_order::memory_order_seq_cst);
 }
 
+// Returns true if *dest was equal to expected and has been set to desired
+bool atomic_compare_exchange_u64(volatile uint64 *dest,
+                                 uint64 expected,
+                                 uint64 desired) {
+  return __atomic_compare_exchange_n(dest, &expected, desired, false,
+                                     std::memory_order::memory_order_seq_cst,
+                                     std::memory_order::memory_order_seq_cst);
+}
+
 float32 atomic_add_cpu_f32(volatile float32 *dest, float32 inc) {
   float32 old_val;
   float32 new_val;
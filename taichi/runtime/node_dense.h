@@ -9,32 +9,55 @@ struct DenseMeta : public StructMeta {
 STRUCT_FIELD(DenseMeta, bitmasked)
 STRUCT_FIELD(DenseMeta, morton_dim)
 
-void Dense_activate(Ptr meta, Ptr node, int i) {
+// The bitmask of a bitmasked node is an array of 64-bit words after the cells
+uint64 *Dense_get_mask(Ptr meta, Ptr node) {
   auto smeta = (StructMeta *)meta;
+  auto data_section_size = smeta->element_size * smeta->max_num_elements;
+  // Aligned as the LLVM struct member
+  return (uint64 *)(node + ((data_section_size + 7) & ~(std::size_t)7));
+}
+
+void Dense_activate(Ptr meta, Ptr node, int i) {
+  auto dmeta = (DenseMeta *)meta;
+  if (DenseMeta_get_bitmasked(dmeta)) {
+    auto mask = Dense_get_mask(meta, node);
+    atomic_or_u64(&mask[i / 64], 1UL << (i % 64));
+  }
+}
+
+void Dense_deactivate(Ptr meta, Ptr node, int i) {
   auto dmeta = (DenseMeta *)meta;
   if (DenseMeta_get_bitmasked(dmeta)) {
-    auto element_size = StructMeta_get_element_size(smeta);
-    auto num_elements = StructMeta_get_element_size(smeta);
-    auto data_section_size = element_size * num_elements;
-    auto mask_begin = (uint64 *)(node + data_section_size);
-    atomic_or_u64(&mask_begin[i / 64], 1UL << (i % 64));
+    auto mask = Dense_get_mask(meta, node);
+    atomic_and_u64(&mask[i / 64], ~(1UL << (i % 64)));
   }
 }
 
 bool Dense_is_active(Ptr meta, Ptr node, int i) {
-  auto smeta = (StructMeta *)meta;
   auto dmeta = (DenseMeta *)meta;
   if (DenseMeta_get_bitmasked(dmeta)) {
-    auto element_size = StructMeta_get_element_size(smeta);
-    auto num_elements = StructMeta_get_element_size(smeta);
-    auto data_section_size = element_size * num_elements;
-    auto mask_begin = node + data_section_size;
-    return bool((mask_begin[i / 8] >> (i % 8)) & 1);
+    auto mask = Dense_get_mask(meta, node);
+    return bool((mask[i / 64] >> (i % 64)) & 1);
   } else {
     return true;
   }
 }
 
+// Only used for bitmasked nodes. Scans whole mask words, so that inactive
+// cells are skipped 64 at a time.
+int Dense_next_active_slot(Ptr meta, Ptr node, int slot, int end) {
+  auto mask = Dense_get_mask(meta, node);
+  while (slot < end) {
+    auto word = mask[slot / 64] >> (slot % 64);
+    if (word != 0) {
+      slot += __builtin_ctzll(word);
+      return slot < end ? slot : end;
+    }
+    slot = (slot / 64 + 1) * 64;
+  }
+  return end;
+}
+
 void *Dense_lookup_element(Ptr meta, Ptr node, int i) {
   return node + ((StructMeta *)meta)->element_size * i;
 }
@@ -42,4 +65,3 @@ void *Dense_lookup_element(Ptr meta, Ptr node, int i) {
 int Dense_get_num_elements(Ptr meta, Ptr node) {
   return ((StructMeta *)meta)->max_num_elements;
 }
-
@@ -1,7 +1,10 @@
 #pragma once
 
+// Elements are stored in chunks of chunk_size elements. "ptr" points to a
+// directory of the chunks, so that any element can be reached in constant
+// time. Both the directory and the chunks are allocated on demand.
 struct DynamicNode {
-  i32 lock;
+  i32 _;
   i32 n;
   Ptr ptr;
 };
@@ -13,28 +16,96 @@ struct DynamicMeta : public StructMeta {
 
 STRUCT_FIELD(DynamicMeta, chunk_size);
 
+// The directory, the chunks and n are all updated with atomic operations, so
+// that threads can activate and append to the same node concurrently. A thread
+// that loses the race to allocate a chunk recycles its allocation.
+Ptr *Dynamic_get_directory(DynamicMeta *meta, DynamicNode *node) {
+  auto directory = __atomic_load_n(&node->ptr, __ATOMIC_ACQUIRE);
+  if (directory == nullptr) {
+    auto rt = (Runtime *)meta->context->runtime;
+    auto alloc = rt->directory_allocators[meta->snode_id];
+    auto new_directory = NodeAllocator_allocate(alloc);
+    if (__atomic_compare_exchange_n(&node->ptr, &directory, new_directory,
+                                    false, __ATOMIC_ACQ_REL,
+                                    __ATOMIC_ACQUIRE)) {
+      directory = new_directory;
+    } else {
+      NodeAllocator_recycle(alloc, new_directory);
+    }
+  }
+  return (Ptr *)directory;
+}
+
+void Dynamic_allocate_chunk(DynamicMeta *meta, Ptr *directory, int c) {
+  if (__atomic_load_n(&directory[c], __ATOMIC_ACQUIRE) == nullptr) {
+    auto rt = (Runtime *)meta->context->runtime;
+    auto alloc = rt->node_allocators[meta->snode_id];
+    auto chunk = NodeAllocator_allocate(alloc);
+    Ptr expected = nullptr;
+    if (!__atomic_compare_exchange_n(&directory[c], &expected, chunk, false,
+                                     __ATOMIC_ACQ_REL, __ATOMIC_ACQUIRE)) {
+      NodeAllocator_recycle(alloc, chunk);
+    }
+  }
+}
+
 void Dynamic_activate(Ptr meta_, Ptr node_, int i) {
-  // TODO: lock
   auto meta = (DynamicMeta *)(meta_);
   auto node = (DynamicNode *)(node_);
-  if (i < node->n)
+  auto chunk_size = meta->chunk_size;
+  int n = __atomic_load_n(&node->n, __ATOMIC_ACQUIRE);
+  auto directory = Dynamic_get_directory(meta, node);
+  // The chunks before the first inactive cell are allocated, except that an
+  // appending thread may not have allocated the chunk of its cell yet
+  for (int c = min_i32(n, i) / chunk_size; c <= i / chunk_size; c++) {
+    Dynamic_allocate_chunk(meta, directory, c);
+  }
+  // Raise n to i + 1, unless another thread has raised it further
+  while (n <= i && !__atomic_compare_exchange_n(&node->n, &n, i + 1, true,
+                                                __ATOMIC_ACQ_REL,
+                                                __ATOMIC_ACQUIRE))
+    ;
+}
+
+// Returns the index of the new cell, or -1 if the node is full
+int Dynamic_append(Ptr meta_, Ptr node_) {
+  auto meta = (DynamicMeta *)(meta_);
+  auto node = (DynamicNode *)(node_);
+  int n = __atomic_load_n(&node->n, __ATOMIC_ACQUIRE);
+  do {
+    if (n >= meta->max_num_elements)
+      return -1;
+  } while (!__atomic_compare_exchange_n(&node->n, &n, n + 1, true,
+                                        __ATOMIC_ACQ_REL, __ATOMIC_ACQUIRE));
+  auto directory = Dynamic_get_directory(meta, node);
+  Dynamic_allocate_chunk(meta, directory, n / meta->chunk_size);
+  return n;
+}
+
+// Dynamic nodes only shrink from the end, so deactivating cell i also
+// deactivates all the cells after it. Chunks no longer in use are recycled.
+void Dynamic_deactivate(Ptr meta_, Ptr node_, int i) {
+  auto meta = (DynamicMeta *)(meta_);
+  auto node = (DynamicNode *)(node_);
+  if (i >= node->n)
     return;
-  node->n = i + 1;
-  int chunk_start = 0;
-  auto p_chunk_ptr = &node->ptr;
   auto chunk_size = meta->chunk_size;
   auto rt = (Runtime *)meta->context->runtime;
   auto alloc = rt->node_allocators[meta->snode_id];
-  while (true) {
-    if (*p_chunk_ptr == nullptr) {
-      *p_chunk_ptr = NodeAllocator_allocate(alloc);
-    }
-    if (i < chunk_start + chunk_size) {
-      return;
+  auto directory = (Ptr *)node->ptr;
+  // Keep the chunks that still hold active cells
+  for (int c = (i + chunk_size - 1) / chunk_size;
+       c <= (node->n - 1) / chunk_size; c++) {
+    if (directory[c] != nullptr) {
+      NodeAllocator_recycle(alloc, directory[c]);
+      directory[c] = nullptr;
     }
-    p_chunk_ptr = (Ptr *)*p_chunk_ptr;
-    chunk_start += chunk_size;
   }
+  if (i == 0) {
+    NodeAllocator_recycle(rt->directory_allocators[meta->snode_id], node->ptr);
+    node->ptr = nullptr;
+  }
+  node->n = i;
 }
 
 bool Dynamic_is_active(Ptr meta_, Ptr node_, int i) {
@@ -45,17 +116,9 @@ bool Dynamic_is_active(Ptr meta_, Ptr node_, int i) {
 void *Dynamic_lookup_element(Ptr meta_, Ptr node_, int i) {
   auto meta = (DynamicMeta *)(meta_);
   auto node = (DynamicNode *)(node_);
-  int chunk_start = 0;
-  auto chunk_ptr = node->ptr;
   auto chunk_size = meta->chunk_size;
-  while (true) {
-    if (i < chunk_start + chunk_size) {
-      return chunk_ptr + sizeof(Ptr) + (i - chunk_start) * meta->element_size;
-    }
-    chunk_ptr = *(Ptr *)chunk_ptr;
-    chunk_start += chunk_size;
-  }
-  return nullptr;
+  auto chunk = ((Ptr *)node->ptr)[i / chunk_size];
+  return chunk + (i % chunk_size) * meta->element_size;
 }
 
 int Dynamic_get_num_elements(Ptr meta_, Ptr node_) {
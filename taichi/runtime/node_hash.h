@@ -0,0 +1,225 @@
+#pragma once
+
+// An open addressing hash table from cell coordinates to cells. The
+// coordinates are the global indices with the bits below the node cleared, so
+// any index, negative or beyond the dimensions of the node, maps to a cell.
+// Each slot holds a 64-bit hash of the coordinates (the key), the coordinates
+// and a pointer to the cell, which is allocated from the node allocator of the
+// snode. The table itself is allocated from the directory allocator of the
+// snode on first activation and recycled when its last cell is deactivated, so
+// memory is proportional to the number of active cells and touched nodes.
+//
+// Activation and lookups are lock-free. Deactivation is only allowed outside
+// parallel loops (the code generator checks this), so a deactivated slot
+// simply becomes a tombstone that keeps probe sequences intact and is reused
+// by later insertions.
+struct HashNode {
+  Ptr table;
+  i32 num_active;
+};
+
+struct HashSlot {
+  uint64 key;
+  Ptr value;
+  i32 coords[taichi_max_num_indices];
+};
+
+// Specialized Attributes and functions
+struct HashMeta : public StructMeta {
+  int table_size;
+};
+
+STRUCT_FIELD(HashMeta, table_size);
+
+// Keys below hash_min_key are slot states
+constexpr uint64 hash_empty = 0;
+constexpr uint64 hash_tombstone = 1;
+// Claimed by an insertion that has not published its cell yet
+constexpr uint64 hash_busy = 2;
+constexpr uint64 hash_min_key = 3;
+
+uint64 Hash_mix(uint64 h) {
+  // The finalizer of MurmurHash3, so that nearby cells spread over the table
+  h ^= h >> 33;
+  h *= 0xff51afd7ed558ccdULL;
+  h ^= h >> 33;
+  h *= 0xc4ceb9fe1a85ec53ULL;
+  h ^= h >> 33;
+  return h;
+}
+
+uint64 Hash_key(i32 *coords) {
+  uint64 h = 0;
+  for (int k = 0; k < taichi_max_num_indices; k++) {
+    h = Hash_mix(h ^ (uint32)coords[k]) + k + 1;
+  }
+  return h < hash_min_key ? h + hash_min_key : h;
+}
+
+bool Hash_same_coords(HashSlot *slot, i32 *coords) {
+  for (int k = 0; k < taichi_max_num_indices; k++) {
+    if (slot->coords[k] != coords[k])
+      return false;
+  }
+  return true;
+}
+
+HashSlot *Hash_get_table(HashMeta *meta, HashNode *node, bool allocate) {
+  auto table = __atomic_load_n(&node->table, __ATOMIC_ACQUIRE);
+  if (table == nullptr && allocate) {
+    // Same as Dynamic_get_directory
+    auto rt = (Runtime *)meta->context->runtime;
+    auto alloc = rt->directory_allocators[meta->snode_id];
+    auto new_table = NodeAllocator_allocate(alloc);
+    if (__atomic_compare_exchange_n(&node->table, &table, new_table, false,
+                                    __ATOMIC_ACQ_REL, __ATOMIC_ACQUIRE)) {
+      table = new_table;
+    } else {
+      NodeAllocator_recycle(alloc, new_table);
+    }
+  }
+  return (HashSlot *)table;
+}
+
+// Returns the slot holding the cell at coords, or -1 if the cell is inactive.
+// With activate, inactive cells are inserted unless the table is full.
+int Hash_find_slot(HashMeta *meta,
+                   HashNode *node,
+                   i32 *coords,
+                   bool activate) {
+  auto slots = Hash_get_table(meta, node, activate);
+  if (slots == nullptr)
+    return -1;
+  auto table_size = meta->table_size;
+  auto key = Hash_key(coords);
+  while (true) {
+    // The first free (empty or tombstone) slot of the probe sequence
+    int free_slot = -1;
+    uint64 free_key = hash_empty;
+    bool retry = false;
+    for (int k = 0; k < table_size; k++) {
+      int s = (key + k) & (table_size - 1);
+      auto slot = &slots[s];
+      auto slot_key = __atomic_load_n(&slot->key, __ATOMIC_ACQUIRE);
+      if (slot_key == hash_busy) {
+        // The slot may be receiving the same cell. Readers treat it as not
+        // yet inserted, while inserters wait for it to be published.
+        if (!activate)
+          continue;
+        while ((slot_key = __atomic_load_n(&slot->key, __ATOMIC_ACQUIRE)) ==
+               hash_busy)
+          ;
+      }
+      if (slot_key == key && Hash_same_coords(slot, coords))
+        return s;
+      if (slot_key == hash_empty || slot_key == hash_tombstone) {
+        if (free_slot == -1) {
+          free_slot = s;
+          free_key = slot_key;
+        }
+        if (slot_key == hash_empty)
+          break;
+      }
+    }
+    if (!activate || free_slot == -1)
+      return -1;
+    // Free slots only become occupied while no deactivation is running, so a
+    // thread that inserts the same cell either loses this exchange or finds
+    // the cell before its own first free slot. On failure, rescan.
+    auto slot = &slots[free_slot];
+    if (__atomic_compare_exchange_n(&slot->key, &free_key, hash_busy, false,
+                                    __ATOMIC_ACQ_REL, __ATOMIC_ACQUIRE)) {
+      for (int k = 0; k < taichi_max_num_indices; k++) {
+        slot->coords[k] = coords[k];
+      }
+      auto rt = (Runtime *)meta->context->runtime;
+      slot->value = NodeAllocator_allocate(rt->node_allocators[meta->snode_id]);
+      atomic_add_i32(&node->num_active, 1);
+      __atomic_store_n(&slot->key, key, __ATOMIC_RELEASE);
+      return free_slot;
+    }
+  }
+}
+
+// Looks up (and optionally activates) the cell at the given coordinates.
+// Returns its slot, or -1 if the cell is inactive.
+int Hash_lookup(Ptr meta_,
+                Ptr node_,
+                i32 c0,
+                i32 c1,
+                i32 c2,
+                i32 c3,
+                bool activate) {
+  auto meta = (HashMeta *)meta_;
+  i32 coords[taichi_max_num_indices] = {c0, c1, c2, c3};
+  int slot = Hash_find_slot(meta, (HashNode *)node_, coords, activate);
+  if (slot == -1 && activate) {
+    // Reported as an error by the host after the launch
+    auto rt = (Runtime *)meta->context->runtime;
+    atomic_exchange_i32(&rt->error_snode_id, meta->snode_id);
+    atomic_exchange_i32(&rt->error_code, runtime_error_hash_table_full);
+  }
+  return slot;
+}
+
+bool Hash_is_active(Ptr meta_, Ptr node_, int i) {
+  auto slots = (HashSlot *)((HashNode *)node_)->table;
+  return slots != nullptr &&
+         __atomic_load_n(&slots[i].key, __ATOMIC_ACQUIRE) >= hash_min_key;
+}
+
+// Serial only. Recycles the table once its last cell is deactivated.
+void Hash_deactivate(Ptr meta_, Ptr node_, int i) {
+  if (!Hash_is_active(meta_, node_, i))
+    return;
+  auto meta = (HashMeta *)meta_;
+  auto node = (HashNode *)node_;
+  auto rt = (Runtime *)meta->context->runtime;
+  auto slot = &((HashSlot *)node->table)[i];
+  NodeAllocator_recycle(rt->node_allocators[meta->snode_id], slot->value);
+  slot->value = nullptr;
+  __atomic_store_n(&slot->key, hash_tombstone, __ATOMIC_RELEASE);
+  if (atomic_add_i32(&node->num_active, -1) == 1) {
+    NodeAllocator_recycle(rt->directory_allocators[meta->snode_id],
+                          node->table);
+    __atomic_store_n(&node->table, nullptr, __ATOMIC_RELEASE);
+  }
+}
+
+void Hash_deactivate_cell(Ptr meta_,
+                          Ptr node_,
+                          i32 c0,
+                          i32 c1,
+                          i32 c2,
+                          i32 c3) {
+  int slot = Hash_lookup(meta_, node_, c0, c1, c2, c3, false);
+  if (slot != -1)
+    Hash_deactivate(meta_, node_, slot);
+}
+
+void *Hash_lookup_element(Ptr meta_, Ptr node_, int i) {
+  auto slots = (HashSlot *)((HashNode *)node_)->table;
+  if (i == -1 || slots == nullptr) {
+    auto smeta = (StructMeta *)meta_;
+    auto context = smeta->context;
+    return ((Runtime *)context->runtime)->ambient_elements[smeta->snode_id];
+  }
+  return slots[i].value;
+}
+
+// Listgen iterates over the slots instead of the cells
+int Hash_get_num_elements(Ptr meta_, Ptr node_) {
+  if (((HashNode *)node_)->table == nullptr)
+    return 0;
+  return ((HashMeta *)meta_)->table_size;
+}
+
+void Hash_slot_to_coordinates(Ptr meta_,
+                              Ptr node_,
+                              int i,
+                              PhysicalCoordinates *coord) {
+  auto slot = &((HashSlot *)((HashNode *)node_)->table)[i];
+  for (int k = 0; k < taichi_max_num_indices; k++) {
+    coord->val[k] |= slot->coords[k];
+  }
+}
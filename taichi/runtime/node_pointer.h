@@ -8,14 +8,32 @@ struct PointerMeta : public StructMeta {
 STRUCT_FIELD(PointerMeta, _);
 
 void Pointer_activate(Ptr meta, Ptr node, int i) {
-  // TODO: lock
-  // int &lock = *(int32 *)(node + 8);
-  Ptr &data_ptr = *(Ptr *)(node + 0);
-  if (data_ptr == nullptr) {
+  auto data_ptr = (Ptr *)(node + 0);
+  if (__atomic_load_n(data_ptr, __ATOMIC_ACQUIRE) == nullptr) {
+    // Other threads may be activating the same node. Only one of them
+    // publishes its allocation, and the others recycle theirs.
+    auto smeta = (StructMeta *)meta;
+    auto rt = (Runtime *)smeta->context->runtime;
+    auto alloc = rt->node_allocators[smeta->snode_id];
+    auto data = NodeAllocator_allocate(alloc);
+    Ptr expected = nullptr;
+    if (!__atomic_compare_exchange_n(data_ptr, &expected, data, false,
+                                     __ATOMIC_ACQ_REL, __ATOMIC_ACQUIRE)) {
+      NodeAllocator_recycle(alloc, data);
+    }
+  }
+}
+
+// Not thread-safe with respect to concurrent activation of the same cell
+void Pointer_deactivate(Ptr meta, Ptr node, int i) {
+  auto data_ptr = (Ptr *)(node + 0);
+  auto data = *data_ptr;
+  if (data != nullptr) {
     auto smeta = (StructMeta *)meta;
     auto rt = (Runtime *)smeta->context->runtime;
     auto alloc = rt->node_allocators[smeta->snode_id];
-    data_ptr = NodeAllocator_allocate(alloc);
+    *data_ptr = nullptr;
+    NodeAllocator_recycle(alloc, data);
   }
 }
 
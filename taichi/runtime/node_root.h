@@ -8,6 +8,8 @@ STRUCT_FIELD(RootMeta, tag);
 
 void Root_activate(Ptr meta, Ptr node, int i) {}
 
+void Root_deactivate(Ptr meta, Ptr node, int i) {}
+
 bool Root_is_active(Ptr meta, Ptr node, int i) { return true; }
 
 void *Root_lookup_element(Ptr meta, Ptr node, int i) {
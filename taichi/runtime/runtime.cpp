@@ -131,6 +131,13 @@ int32 Context_get_extra_args(Context *ctx, int32 i, int32 j) {
 
 #include "atomic.h"
 
+void mutex_lock_i32(Ptr mutex) {
+  while (atomic_exchange_i32((i32 *)mutex, 1) == 1)
+    ;
+}
+
+void mutex_unlock_i32(Ptr mutex) { atomic_exchange_i32((i32 *)mutex, 0); }
+
 // These structures are accessible by both the LLVM backend and this C++ runtime
 // file here (for building complex runtime functions in C++)
 
@@ -145,6 +152,14 @@ struct StructMeta {
   Ptr (*from_parent_element)(Ptr);
   bool (*is_active)(Ptr, Ptr, int i);
   int (*get_num_elements)(Ptr, Ptr);
+  void (*deactivate)(Ptr, Ptr, int i);
+  // Adds the coordinates of the cell in an active slot to coord. Only set for
+  // nodes whose cell coordinates do not follow from the slot (e.g. hash
+  // tables).
+  void (*slot_to_coordinates)(Ptr, Ptr, int slot, PhysicalCoordinates *coord);
+  // Returns the first slot in [slot, end) holding an active cell, or end.
+  // Only set for nodes that can skip inactive slots in bulk (e.g. bitmasks).
+  int (*next_active_slot)(Ptr, Ptr, int slot, int end);
   void (*refine_coordinates)(PhysicalCoordinates *inp_coord,
                              PhysicalCoordinates *refined_coord, int index);
   Context *context;
@@ -158,8 +173,25 @@ STRUCT_FIELD(StructMeta, lookup_element);
 STRUCT_FIELD(StructMeta, from_parent_element);
 STRUCT_FIELD(StructMeta, refine_coordinates);
 STRUCT_FIELD(StructMeta, is_active);
+STRUCT_FIELD(StructMeta, deactivate);
+STRUCT_FIELD(StructMeta, slot_to_coordinates);
+STRUCT_FIELD(StructMeta, next_active_slot);
 STRUCT_FIELD(StructMeta, context);
 
+// Advances slot to the first slot in [slot, end) holding an active cell, and
+// returns it. Returns -1 if there is no such slot.
+int next_active_cell(StructMeta *meta, Ptr node, int &slot, int end) {
+  if (meta->next_active_slot != nullptr) {
+    slot = meta->next_active_slot((Ptr)meta, node, slot, end);
+    return slot < end ? slot : -1;
+  }
+  for (; slot < end; slot++) {
+    if (meta->is_active((Ptr)meta, node, slot))
+      return slot;
+  }
+  return -1;
+}
+
 struct Runtime;
 void *allocate_aligned(Runtime *, std::size_t size, int alignment);
 
@@ -188,16 +220,32 @@ struct ElementList {
   Element *elements;
   int head;
   int tail;
+  // For memory reports
+  int capacity;
+  int max_tail;
 };
 
-void ElementList_initialize(Runtime *runtime, ElementList *element_list) {
+STRUCT_FIELD(ElementList, tail);
+STRUCT_FIELD(ElementList, capacity);
+STRUCT_FIELD(ElementList, max_tail);
+
+// Lists are sized for the maximum number of elements of their snode, up to
+// the size of the address space reservation
+void ElementList_initialize(Runtime *runtime, ElementList *element_list,
+                            uint64 max_num_elements) {
 #if defined(_WIN32)
-  auto list_size = 32 * 1024 * 1024;
+  uint64 max_list_size = 32 * 1024 * 1024;
 #else
-  auto list_size = 1024 * 1024 * 1024;
+  uint64 max_list_size = 1024 * 1024 * 1024;
 #endif
+  uint64 list_size = max_num_elements * sizeof(Element);
+  if (max_num_elements > max_list_size / sizeof(Element))
+    list_size = max_list_size;
   element_list->elements = (Element *)allocate(runtime, list_size);
+  element_list->head = 0;
   element_list->tail = 0;
+  element_list->capacity = list_size / sizeof(Element);
+  element_list->max_tail = 0;
 }
 
 void ElementList_insert(ElementList *element_list, Element *element) {
@@ -207,26 +255,76 @@ void ElementList_insert(ElementList *element_list, Element *element) {
 
 void ElementList_clear(ElementList *element_list) { element_list->tail = 0; }
 
+// Recycled nodes form a lock-free stack. The head stores (tag << 32) |
+// (index + 1), with 0 meaning empty, and the tag is bumped on every update so
+// that a node popped and pushed again in between cannot corrupt the stack
+// (the ABA problem). Each free node stores the index + 1 of the next free node
+// in its first four bytes.
+// The tail is the high-water mark of the number of nodes in use.
 struct NodeAllocator {
   Ptr pool;
   std::size_t node_size;
   int tail;
+  uint64 free_list;
+  int num_active;
 };
 
+STRUCT_FIELD(NodeAllocator, node_size);
+STRUCT_FIELD(NodeAllocator, tail);
+STRUCT_FIELD(NodeAllocator, num_active);
+
 void NodeAllocator_initialize(Runtime *runtime, NodeAllocator *node_allocator,
                               std::size_t node_size) {
   node_allocator->pool =
       (Ptr)allocate_aligned(runtime, 1024 * 1024 * 1024, 4096);
-  node_allocator->node_size = node_size;
+  // Free nodes must be able to hold the link to the next free node
+  node_allocator->node_size = node_size < 4 ? 4 : node_size;
   node_allocator->tail = 0;
+  node_allocator->free_list = 0;
+  node_allocator->num_active = 0;
 }
 
 Ptr NodeAllocator_allocate(NodeAllocator *node_allocator) {
+  atomic_add_i32(&node_allocator->num_active, 1);
+  auto node_size = node_allocator->node_size;
+  auto head = __atomic_load_n(&node_allocator->free_list, __ATOMIC_ACQUIRE);
+  while ((uint32)head != 0) {
+    auto node = node_allocator->pool + node_size * ((uint32)head - 1);
+    // The link may be stale if another thread has popped this node in the
+    // meantime, but then the tag has changed and the exchange below fails
+    uint64 next = *(volatile uint32 *)node;
+    uint64 new_head = (((head >> 32) + 1) << 32) | next;
+    if (atomic_compare_exchange_u64(&node_allocator->free_list, head,
+                                    new_head)) {
+      // Recycled nodes are handed out zero-initialized, just like new ones
+      __builtin_memset(node, 0, node_size);
+      return node;
+    }
+    head = __atomic_load_n(&node_allocator->free_list, __ATOMIC_ACQUIRE);
+  }
   int p = atomic_add_i32(&node_allocator->tail, 1);
-  return node_allocator->pool + node_allocator->node_size * p;
+  return node_allocator->pool + node_size * p;
+}
+
+void NodeAllocator_recycle(NodeAllocator *node_allocator, Ptr node) {
+  atomic_add_i32(&node_allocator->num_active, -1);
+  uint64 index = (node - node_allocator->pool) / node_allocator->node_size;
+  uint64 head, new_head;
+  do {
+    head = __atomic_load_n(&node_allocator->free_list, __ATOMIC_ACQUIRE);
+    *(volatile uint32 *)node = (uint32)head;
+    new_head = (((head >> 32) + 1) << 32) | (index + 1);
+  } while (
+      !atomic_compare_exchange_u64(&node_allocator->free_list, head, new_head));
 }
 
 using vm_allocator_type = void *(*)(std::size_t, int);
+using CPUTaskFunc = void(void *, int);
+using parallel_for_type = void (*)(void *thread_pool,
+                                   int splits,
+                                   int num_desired_threads,
+                                   void *context,
+                                   CPUTaskFunc *func);
 
 // Is "runtime" a correct name, even if it is created after the data layout is
 // materialized?
@@ -234,32 +332,57 @@ struct Runtime {
   vm_allocator_type vm_allocator;
   ElementList *element_lists[taichi_max_num_snodes];
   NodeAllocator *node_allocators[taichi_max_num_snodes];
+  // Allocators of the chunk directories of dynamic nodes
+  NodeAllocator *directory_allocators[taichi_max_num_snodes];
   Ptr ambient_elements[taichi_max_num_snodes];
   Ptr temporaries;
+  void *thread_pool;
+  parallel_for_type parallel_for;
+  // Bytes of address space reserved through vm_allocator
+  uint64 total_requested_memory;
+  // Errors found in kernels, which the host reports and clears after launches
+  i32 error_code;
+  i32 error_snode_id;
 };
 
+constexpr i32 runtime_error_hash_table_full = 1;
+
 STRUCT_FIELD_ARRAY(Runtime, element_lists);
 STRUCT_FIELD_ARRAY(Runtime, node_allocators);
+STRUCT_FIELD_ARRAY(Runtime, directory_allocators);
 STRUCT_FIELD(Runtime, temporaries);
+STRUCT_FIELD(Runtime, total_requested_memory);
+STRUCT_FIELD(Runtime, error_code);
+STRUCT_FIELD(Runtime, error_snode_id);
 
 void *allocate_aligned(Runtime *runtime, std::size_t size, int alignment) {
+  runtime->total_requested_memory += size;
   return runtime->vm_allocator(size, alignment);
 }
 
 Ptr Runtime_initialize(Runtime **runtime_ptr, int num_snodes,
-                       uint64_t root_size, int root_id, void *_vm_allocator) {
+                       uint64_t root_size, int root_id, void *_vm_allocator,
+                       void *thread_pool, void *_parallel_for) {
   auto vm_allocator = (vm_allocator_type)_vm_allocator;
   *runtime_ptr = (Runtime *)vm_allocator(sizeof(Runtime), 128);
   Runtime *runtime = *runtime_ptr;
   runtime->vm_allocator = vm_allocator;
+  runtime->total_requested_memory = sizeof(Runtime);
+  runtime->error_code = 0;
+  runtime->error_snode_id = -1;
+  runtime->thread_pool = thread_pool;
+  runtime->parallel_for = (parallel_for_type)_parallel_for;
   printf("Initializing runtime with %d elements\n", num_snodes);
   for (int i = 0; i < num_snodes; i++) {
+    // The elements are allocated by Runtime_initialize_element_list, only
+    // for the snodes that need a list
     runtime->element_lists[i] =
         (ElementList *)allocate(runtime, sizeof(ElementList));
-    ElementList_initialize(runtime, runtime->element_lists[i]);
 
     runtime->node_allocators[i] =
         (NodeAllocator *)allocate(runtime, sizeof(NodeAllocator));
+    runtime->directory_allocators[i] =
+        (NodeAllocator *)allocate(runtime, sizeof(NodeAllocator));
   }
   // Assuming num_snodes - 1 is the root
   auto root_ptr = allocate_aligned(runtime, root_size, 4096);
@@ -268,6 +391,7 @@ Ptr Runtime_initialize(Runtime **runtime_ptr, int num_snodes,
   // TODO: DRY
   runtime->temporaries = (Ptr)allocate_aligned(runtime, 1048576, 1024);
 
+  ElementList_initialize(runtime, runtime->element_lists[root_id], 1);
   Element elem;
   elem.loop_bounds[0] = 0;
   elem.loop_bounds[1] = 1;
@@ -280,6 +404,12 @@ Ptr Runtime_initialize(Runtime **runtime_ptr, int num_snodes,
   return (Ptr)root_ptr;
 }
 
+void Runtime_initialize_element_list(Runtime *runtime, int snode_id,
+                                     uint64 max_num_elements) {
+  ElementList_initialize(runtime, runtime->element_lists[snode_id],
+                         max_num_elements);
+}
+
 void Runtime_allocate_ambient(Runtime *runtime, int snode_id) {
   runtime->ambient_elements[snode_id] =
       NodeAllocator_allocate(runtime->node_allocators[snode_id]);
@@ -287,31 +417,144 @@ void Runtime_allocate_ambient(Runtime *runtime, int snode_id) {
 
 // "Element", "component" are different concepts
 
-// ultimately all function calls here will be inlined
-void element_listgen(Runtime *runtime, StructMeta *parent, StructMeta *child) {
-  auto parent_list = runtime->element_lists[parent->snode_id];
-  int num_parent_elements = parent_list->tail;
-  auto child_list = runtime->element_lists[child->snode_id];
-  child_list->head = 0;
-  child_list->tail = 0;
-  for (int i = 0; i < num_parent_elements; i++) {
+// The iteration space of listgen is (parent element, child slot). It is
+// divided into "units": each parent element contributes slot_split units,
+// each covering a contiguous range of child slots. Units are processed in
+// contiguous chunks, so that the child list keeps the serial order.
+struct ListgenContext {
+  StructMeta *parent;
+  StructMeta *child;
+  ElementList *parent_list;
+  ElementList *child_list;
+  int num_units;
+  int slot_split;
+  int num_chunks;
+  int *chunk_offsets;
+  bool write;
+};
+
+int element_listgen_units(ListgenContext *ctx, int unit_begin, int unit_end,
+                          int offset, bool write) {
+  auto parent_list = ctx->parent_list;
+  auto child = ctx->child;
+  int count = 0;
+  for (int u = unit_begin; u < unit_end; u++) {
+    int i = u / ctx->slot_split;
+    int part = u % ctx->slot_split;
     auto element = parent_list->elements[i];
     auto ch_component = child->from_parent_element(element.element);
     int ch_num_elements = child->get_num_elements((Ptr)child, ch_component);
-    for (int j = 0; j < ch_num_elements; j++) {
-      if (child->is_active((Ptr)child, ch_component, j)) {
-        auto ch_element = child->lookup_element((Ptr)child, element.element, j);
+    int lower = (int64)ch_num_elements * part / ctx->slot_split;
+    int upper = (int64)ch_num_elements * (part + 1) / ctx->slot_split;
+    for (int slot = lower;; slot++) {
+      int j = next_active_cell(child, ch_component, slot, upper);
+      if (j == -1)
+        break;
+      if (write) {
+        auto ch_element = child->lookup_element((Ptr)child, ch_component, j);
         Element elem;
         elem.element = ch_element;
         elem.loop_bounds[0] = 0;
         elem.loop_bounds[1] = child->get_num_elements((Ptr)child, ch_element);
         PhysicalCoordinates refined_coord;
         child->refine_coordinates(&element.pcoord, &refined_coord, j);
+        if (child->slot_to_coordinates != nullptr)
+          child->slot_to_coordinates((Ptr)child, ch_component, j,
+                                     &refined_coord);
         elem.pcoord = refined_coord;
-        ElementList_insert(child_list, &elem);
+        ctx->child_list->elements[offset + count] = elem;
       }
+      count++;
     }
   }
+  return count;
+}
+
+void element_listgen_chunk(void *ctx_, int chunk_id) {
+  auto ctx = (ListgenContext *)ctx_;
+  int unit_begin = (int64)ctx->num_units * chunk_id / ctx->num_chunks;
+  int unit_end = (int64)ctx->num_units * (chunk_id + 1) / ctx->num_chunks;
+  if (ctx->write) {
+    element_listgen_units(ctx, unit_begin, unit_end,
+                          ctx->chunk_offsets[chunk_id], true);
+  } else {
+    ctx->chunk_offsets[chunk_id] =
+        element_listgen_units(ctx, unit_begin, unit_end, 0, false);
+  }
+}
+
+constexpr int taichi_listgen_max_num_chunks = 1024;
+
+// ultimately all function calls here will be inlined
+void element_listgen(Runtime *runtime, StructMeta *parent, StructMeta *child,
+                     int num_threads) {
+  auto parent_list = runtime->element_lists[parent->snode_id];
+  int num_parent_elements = parent_list->tail;
+  auto child_list = runtime->element_lists[child->snode_id];
+  child_list->head = 0;
+  ListgenContext ctx;
+  ctx.parent = parent;
+  ctx.child = child;
+  ctx.parent_list = parent_list;
+  ctx.child_list = child_list;
+#if ARCH_cuda
+  ctx.slot_split = 1;
+  ctx.num_units = num_parent_elements;
+  child_list->tail =
+      element_listgen_units(&ctx, 0, ctx.num_units, 0, true);
+#else
+  int chunk_offsets[taichi_listgen_max_num_chunks];
+  // Split the slots of each parent when there are too few parents to keep
+  // all threads busy
+  int desired_num_chunks = num_threads * 4;
+  ctx.slot_split =
+      max_i32(1, desired_num_chunks / max_i32(num_parent_elements, 1));
+  ctx.num_units = num_parent_elements * ctx.slot_split;
+  ctx.num_chunks = min_i32(min_i32(desired_num_chunks, ctx.num_units),
+                           taichi_listgen_max_num_chunks);
+  ctx.chunk_offsets = chunk_offsets;
+  if (ctx.num_chunks == 0) {
+    child_list->tail = 0;
+    return;
+  }
+  // Pass 1: count the active children of each chunk
+  ctx.write = false;
+  runtime->parallel_for(runtime->thread_pool, ctx.num_chunks, num_threads,
+                        &ctx, element_listgen_chunk);
+  // Exclusive prefix sum for the output offsets
+  int total = 0;
+  for (int i = 0; i < ctx.num_chunks; i++) {
+    int count = chunk_offsets[i];
+    chunk_offsets[i] = total;
+    total += count;
+  }
+  // Pass 2: each chunk writes its own slice of the child list
+  ctx.write = true;
+  runtime->parallel_for(runtime->thread_pool, ctx.num_chunks, num_threads,
+                        &ctx, element_listgen_chunk);
+  child_list->tail = total;
+#endif
+  child_list->max_tail = max_i32(child_list->max_tail, child_list->tail);
+}
+
+// Deactivates the active cells of "child" under all elements of "parent",
+// whose element list must be up to date. The element list of "child" is
+// emptied, since the elements it holds have been recycled.
+void element_deactivate(Runtime *runtime, StructMeta *parent,
+                        StructMeta *child) {
+  auto parent_list = runtime->element_lists[parent->snode_id];
+  for (int i = 0; i < parent_list->tail; i++) {
+    auto element = parent_list->elements[i];
+    auto ch_component = child->from_parent_element(element.element);
+    int ch_num_elements = child->get_num_elements((Ptr)child, ch_component);
+    for (int slot = 0;; slot++) {
+      int j = next_active_cell(child, ch_component, slot, ch_num_elements);
+      if (j == -1)
+        break;
+      child->deactivate((Ptr)child, ch_component, j);
+    }
+  }
+  ElementList_clear(runtime->element_lists[child->snode_id]);
 }
 
 int32 thread_idx() { return 0; }
@@ -330,21 +573,23 @@ int32 warp_active_mask() { return 0; }
 
 void block_memfence() { }
 
+using BlockTask = void(Context *, Element *, int, int);
+
 void for_each_block(Context *context, int snode_id, int element_size,
-                    int element_split,
-                    void (*task)(Context *, Element *, int, int)) {
+                    int element_split, BlockTask *task) {
   auto list = ((Runtime *)context->runtime)->element_lists[snode_id];
   auto list_tail = list->tail;
 #if ARCH_cuda
   int i = block_idx();
-  const auto part_size = element_size / element_split;
+  // element_size is not a multiple of element_split for packed nodes
+  const auto part_size = (element_size + element_split - 1) / element_split;
   while (true) {
     int element_id = i / element_split;
     if (element_id >= list_tail)
       break;
     auto part_id = i % element_split;
     auto lower = part_size * part_id;
-    auto upper = part_size * (part_id + 1);
+    auto upper = min_i32(part_size * (part_id + 1), element_size);
     task(context, &list->elements[element_id], lower, upper);
     i += grid_dim();
   }
@@ -355,8 +600,127 @@ void for_each_block(Context *context, int snode_id, int element_size,
 #endif
 }
 
+using RangeForTaskFunc = void(Context *, int i);
+
+struct range_task_helper_context {
+  Context *context;
+  RangeForTaskFunc *body;
+  int begin;
+  int end;
+  int block_size;
+  bool reversed;
+};
+
+void parallel_range_for_task(void *range_context, int task_id) {
+  auto ctx = *(range_task_helper_context *)range_context;
+  if (!ctx.reversed) {
+    int block_begin = ctx.begin + task_id * ctx.block_size;
+    int block_end = min_i32(block_begin + ctx.block_size, ctx.end);
+    for (int i = block_begin; i < block_end; i++) {
+      ctx.body(ctx.context, i);
+    }
+  } else {
+    int block_end = ctx.end - task_id * ctx.block_size;
+    int block_begin = max_i32(block_end - ctx.block_size, ctx.begin);
+    for (int i = block_end - 1; i >= block_begin; i--) {
+      ctx.body(ctx.context, i);
+    }
+  }
+}
+
+// Splits [begin, end) into blocks of block_dim iterations and distributes
+// them to the CPU thread pool
+void cpu_parallel_range_for(Context *context, int num_threads, int begin,
+                            int end, int block_dim, bool reversed,
+                            RangeForTaskFunc *body) {
+  if (end <= begin)
+    return;
+  if (block_dim == 0) {
+    // Several blocks per thread for load balancing
+    block_dim = max_i32(1, (end - begin) / (num_threads * 8));
+  }
+  range_task_helper_context ctx;
+  ctx.context = context;
+  ctx.body = body;
+  ctx.begin = begin;
+  ctx.end = end;
+  ctx.block_size = block_dim;
+  ctx.reversed = reversed;
+  auto runtime = (Runtime *)context->runtime;
+  int num_blocks = (end - begin + block_dim - 1) / block_dim;
+  runtime->parallel_for(runtime->thread_pool, num_blocks, num_threads, &ctx,
+                        parallel_range_for_task);
+}
+
+struct block_task_helper_context {
+  Context *context;
+  BlockTask *task;
+  Element *elements;
+  int num_elements;
+  int element_size;
+  int element_split;
+  int elements_per_task;
+};
+
+void block_helper(void *ctx_, int task_id) {
+  auto ctx = *(block_task_helper_context *)ctx_;
+  if (ctx.element_split > 1) {
+    // A part of a single element
+    int element_id = task_id / ctx.element_split;
+    int part_id = task_id % ctx.element_split;
+    int lower = (int64)ctx.element_size * part_id / ctx.element_split;
+    int upper = (int64)ctx.element_size * (part_id + 1) / ctx.element_split;
+    ctx.task(ctx.context, &ctx.elements[element_id], lower, upper);
+  } else {
+    // A few consecutive elements
+    int begin = task_id * ctx.elements_per_task;
+    int end = min_i32(begin + ctx.elements_per_task, ctx.num_elements);
+    for (int i = begin; i < end; i++) {
+      ctx.task(ctx.context, &ctx.elements[i], 0, ctx.element_size);
+    }
+  }
+}
+
+// Each task covers grain_size loop iterations, i.e. either a part of an
+// element, or several elements
+void cpu_parallel_for_each_block(Context *context, int snode_id,
+                                 int element_size, int grain_size,
+                                 BlockTask *task, int num_threads) {
+  auto runtime = (Runtime *)context->runtime;
+  auto list = runtime->element_lists[snode_id];
+  int list_tail = list->tail;
+  if (list_tail == 0)
+    return;
+  if (grain_size == 0) {
+    // Several tasks per thread for load balancing
+    int64 num_iterations = (int64)list_tail * element_size;
+    grain_size = (int)(num_iterations / (num_threads * 8));
+    if (grain_size < 1)
+      grain_size = 1;
+  }
+  block_task_helper_context ctx;
+  ctx.context = context;
+  ctx.task = task;
+  ctx.elements = list->elements;
+  ctx.num_elements = list_tail;
+  ctx.element_size = element_size;
+  int num_tasks;
+  if (grain_size < element_size) {
+    ctx.element_split = (element_size + grain_size - 1) / grain_size;
+    ctx.elements_per_task = 1;
+    num_tasks = list_tail * ctx.element_split;
+  } else {
+    ctx.element_split = 1;
+    ctx.elements_per_task = grain_size / element_size;
+    num_tasks = (list_tail + ctx.elements_per_task - 1) / ctx.elements_per_task;
+  }
+  runtime->parallel_for(runtime->thread_pool, num_tasks, num_threads, &ctx,
+                        block_helper);
+}
+
 #include "node_dense.h"
 #include "node_dynamic.h"
+#include "node_hash.h"
 #include "node_pointer.h"
 #include "node_root.h"
 }
@@ -24,20 +24,30 @@ SNode &SNode::place(Expr &expr_) {
 }
 
 SNode &SNode::create_node(std::vector<Index> indices, std::vector<int> sizes,
-                          SNodeType type) {
+                          SNodeType type,
+                          bool packed) {
   TC_ASSERT(indices.size() == sizes.size() || sizes.size() == 1);
   if (sizes.size() == 1) {
     sizes = std::vector<int>(indices.size(), sizes[0]);
   }
 
-  if (type == SNodeType::hash)
+  if (type == SNodeType::hash && !get_current_program().config.use_llvm)
     TC_ASSERT_INFO(depth == 0,
                    "hashed node must be child of root due to initialization "
                    "memset limitation.");
+  TC_ERROR_IF(packed && !get_current_program().config.use_llvm,
+              "Packed nodes are only supported by the LLVM backends.");
   auto &new_node = insert_children(type);
+  new_node._packed = packed;
   new_node.n = 1;
   for (int i = 0; i < sizes.size(); i++) {
     auto s = sizes[i];
+    if (packed) {
+      // Global indices still reserve least_pot_bound(s) values for the node,
+      // but only s cells are allocated and looped over.
+      new_node.n *= s;
+      continue;
+    }
     if (!bit::is_power_of_two(s)) {
       auto promoted_s = bit::least_pot_bound(s);
       TC_WARN("Non-power-of-two node size {} promoted to {}.", s, promoted_s);
@@ -50,6 +60,12 @@ SNode &SNode::create_node(std::vector<Index> indices, std::vector<int> sizes,
     auto &ind = indices[i];
     new_node.extractors[ind.value].activate(bit::log2int(bit::least_pot_bound(sizes[i])));
     new_node.extractors[ind.value].num_elements = sizes[i];
+    new_node.extractors[ind.value].shape = sizes[i];
+  }
+  if (type == SNodeType::hash) {
+    // The table only needs to hold the active cells of a node, and is only
+    // allocated for the nodes that have any
+    new_node.hash_table_size = (int)std::min(new_node.n, (int64)4096);
   }
   return new_node;
 }
@@ -60,6 +76,7 @@ void SNode::clear_data() {
       clear_kernel = &kernel([&]() {
         current_ast_builder().insert(Stmt::make<ClearAllStmt>(this, false));
       });
+      ((Kernel *)clear_kernel)->is_accessor = true;
     }
     (*(Kernel *)clear_kernel)();
   } else {
@@ -73,6 +90,7 @@ void SNode::clear_data_and_deactivate() {
       clear_and_deactivate_kernel = &kernel([&]() {
         current_ast_builder().insert(Stmt::make<ClearAllStmt>(this, true));
       });
+      ((Kernel *)clear_and_deactivate_kernel)->is_accessor = true;
     }
     (*(Kernel *)clear_and_deactivate_kernel)();
   } else {
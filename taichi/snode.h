@@ -13,6 +13,8 @@ struct IndexExtractor {
   int start, num_bits;
   int acc_offset;
   int num_elements;
+  // Number of cells of the node along this index, only used by packed nodes
+  int shape;
 
   TC_IO_DEF(start, num_bits, acc_offset);
 
@@ -26,6 +28,7 @@ struct IndexExtractor {
     active = false;
     acc_offset = 0;
     num_elements = 1;
+    shape = 1;
   }
 
   void activate(int num_bits) {
@@ -69,6 +72,8 @@ class SNode {
   int64 n;
   int total_num_bits, total_bit_start;
   int chunk_size;
+  // Number of slots of each hash table (hash nodes only)
+  int hash_table_size;
   DataType dt;
   bool has_ambient;
   TypedConstant ambient_val;
@@ -95,6 +100,9 @@ class SNode {
   int index_id;
   bool _morton;
   bool _bitmasked;
+  // Packed nodes have exactly the requested number of cells, and linearize
+  // indices with multiplications instead of bit concatenation.
+  bool _packed;
   llvm::Type *llvm_type, *llvm_body_type, *llvm_aux_type;
   llvm::Type *llvm_element_type;
   bool has_aux_structure;
@@ -126,6 +134,8 @@ class SNode {
     dt = DataType::unknown;
     _morton = false;
     _bitmasked = false;
+    _packed = false;
+    hash_table_size = 0;
 
     clear_func = nullptr;
     clear_kernel = nullptr;
@@ -148,7 +158,8 @@ class SNode {
 
   SNode &create_node(std::vector<Index> indices,
                      std::vector<int> sizes,
-                     SNodeType type);
+                     SNodeType type,
+                     bool packed = false);
 
   // SNodes maintains how flattened index bits are taken from indices
   SNode &dense(const std::vector<Index> &indices,
@@ -156,6 +167,12 @@ class SNode {
     return create_node(indices, sizes, SNodeType::dense);
   }
 
+  SNode &dense(const std::vector<Index> &indices,
+               const std::vector<int> &sizes,
+               bool packed) {
+    return create_node(indices, sizes, SNodeType::dense, packed);
+  }
+
   SNode &dense(const std::vector<Index> &indices, int sizes) {
     return create_node(indices, std::vector<int>{sizes}, SNodeType::dense);
   }
@@ -232,6 +249,15 @@ class SNode {
     return create_node(indices, sizes, SNodeType::hash);
   }
 
+  SNode &hash(const std::vector<Index> indices,
+               std::vector<int> sizes,
+               int table_size) {
+    auto &node = hash(indices, sizes);
+    if (table_size > 0)
+      node.hash_table_size = bit::least_pot_bound(table_size);
+    return node;
+  }
+
   SNode &hash(const std::vector<Index> indices, int sizes) {
     return create_node(indices, std::vector<int>{sizes}, SNodeType::hash);
   }
@@ -323,6 +349,8 @@ class SNode {
   }
 
   int max_num_elements() const {
+    if (_packed)
+      return (int)n;
     return 1 << total_num_bits;
   }
 
@@ -332,6 +360,11 @@ class SNode {
 
   llvm::Type *get_body_type();
   llvm::Type *get_aux_type();
+
+  // For place nodes under dense nodes only: the byte offset of cell zero in
+  // the root buffer, and the byte strides of the indices. Fails if the cells
+  // are not evenly spaced along an index.
+  std::pair<uint64, std::vector<int64>> get_dense_layout();
 };
 
 TLANG_NAMESPACE_END
@@ -161,7 +161,11 @@ class OffloadedStmt : public Stmt {
 
   TaskType task_type;
   SNode *snode;
+  // Range-for bounds are either constants, or loaded at launch time from
+  // the global temporaries at begin_offset/end_offset
+  bool const_begin, const_end;
   int begin, end, step;
+  std::size_t begin_offset, end_offset;
   int block_dim;
   bool reversed;
   int num_cpu_threads;
@@ -171,7 +175,9 @@ class OffloadedStmt : public Stmt {
 
   OffloadedStmt(TaskType task_type) : task_type(task_type) {
     num_cpu_threads = 1;
+    const_begin = const_end = true;
     begin = end = step = 0;
+    begin_offset = end_offset = 0;
     block_dim = 0;
     reversed = false;
     if (task_type != TaskType::listgen) {
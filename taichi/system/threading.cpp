@@ -7,4 +7,99 @@
 
 TC_NAMESPACE_BEGIN
 
+ThreadPool::ThreadPool(int max_num_threads)
+    : max_num_threads(std::max(max_num_threads, 1)) {
+  task_head = 0;
+  task_tail = 0;
+  num_active_workers = 0;
+  num_pending_workers = 0;
+  timestamp = 0;
+  exiting = false;
+  func = nullptr;
+  context = nullptr;
+  // The master thread participates in every run, so spawn one worker less
+  for (int i = 0; i < this->max_num_threads - 1; i++) {
+    threads.emplace_back([this, i] { this->target(i); });
+  }
+}
+
+void ThreadPool::run(int splits,
+                     int desired_num_threads,
+                     void *context,
+                     CPUTaskFunc *func) {
+  if (splits <= 0)
+    return;
+  int num_workers =
+      std::min(std::min(desired_num_threads, max_num_threads), splits) - 1;
+  if (num_workers <= 0) {
+    // Not worth waking up anyone
+    for (int i = 0; i < splits; i++) {
+      func(context, i);
+    }
+    return;
+  }
+  {
+    std::lock_guard<std::mutex> _(mutex);
+    this->context = context;
+    this->func = func;
+    task_head = 0;
+    task_tail = splits;
+    num_active_workers = num_workers;
+    num_pending_workers = num_workers;
+    timestamp++;
+  }
+  worker_cv.notify_all();
+  work();
+  {
+    // Workers may still hold references to func/context
+    std::unique_lock<std::mutex> lock(mutex);
+    master_cv.wait(lock, [this] { return num_pending_workers == 0; });
+  }
+}
+
+void ThreadPool::work() {
+  while (true) {
+    int task_id = task_head.fetch_add(1, std::memory_order_relaxed);
+    if (task_id >= task_tail)
+      break;
+    func(context, task_id);
+  }
+}
+
+void ThreadPool::target(int worker_id) {
+  uint64 last_timestamp = 0;
+  while (true) {
+    {
+      std::unique_lock<std::mutex> lock(mutex);
+      worker_cv.wait(lock, [&] {
+        return exiting || (timestamp > last_timestamp &&
+                           worker_id < num_active_workers);
+      });
+      if (exiting)
+        break;
+      last_timestamp = timestamp;
+    }
+    work();
+    bool all_finished;
+    {
+      std::lock_guard<std::mutex> _(mutex);
+      num_pending_workers--;
+      all_finished = num_pending_workers == 0;
+    }
+    if (all_finished)
+      master_cv.notify_one();
+  }
+}
+
+ThreadPool::~ThreadPool() {
+  {
+    std::lock_guard<std::mutex> _(mutex);
+    exiting = true;
+  }
+  worker_cv.notify_all();
+  for (auto &th : threads) {
+    th.join();
+  }
+}
+
 TC_NAMESPACE_END
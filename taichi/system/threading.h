@@ -7,7 +7,9 @@
 
 #include <taichi/common/util.h>
 #include <atomic>
+#include <condition_variable>
 #include <functional>
+#include <mutex>
 #include <thread>
 #include <vector>
 #if defined(TC_PLATFORM_WINDOWS)
@@ -19,54 +21,57 @@
 
 TC_NAMESPACE_BEGIN
 
-#if (0)
-class ThreadedTaskManager {
+using CPUTaskFunc = void(void *context, int task_id);
+
+// A pool of persistent worker threads for data-parallel CPU tasks.
+// The calling thread also works on the tasks, so at most max_num_threads
+// threads (including the caller) execute a single run().
+class ThreadPool {
  public:
-#if !defined(TC_AMALGAMATED)
-  class TbbParallelismControl {
-    std::unique_ptr<tbb::global_control> c;
-   public:
-    TbbParallelismControl(int threads) {
-      c = std::make_unique<tbb::global_control>(
-          tbb::global_control::max_allowed_parallelism, threads);
-    }
-  };
-#endif
-  template <typename T>
-  void static run(const T &target, int begin, int end, int num_threads) {
-#if !defined(TC_AMALGAMATED)
-    if (num_threads > 0) {
-      tbb::task_arena limited_arena(num_threads);
-      limited_arena.execute([&]() { tbb::parallel_for(begin, end, target); });
-    } else {
-      TC_ASSERT_INFO(
-          num_threads == -1,
-          fmt::format(
-              "num_threads must be a positive number or -1, instead of [{}]",
-              num_threads));
-      tbb::parallel_for(begin, end, target);
+  std::vector<std::thread> threads;
+  std::condition_variable worker_cv;
+  std::condition_variable master_cv;
+  std::mutex mutex;
+  std::atomic<int> task_head;
+  int task_tail;
+  int max_num_threads;
+  int num_active_workers;
+  int num_pending_workers;
+  uint64 timestamp;
+  bool exiting;
+  CPUTaskFunc *func;
+  void *context;
+
+  explicit ThreadPool(int max_num_threads);
+
+  // Executes func(context, i) for i in [0, splits) using at most
+  // desired_num_threads threads. Blocks until all tasks are finished.
+  void run(int splits, int desired_num_threads, void *context,
+           CPUTaskFunc *func);
+
+  // Plain function entry, so that LLVM-compiled code can call into the pool
+  // through a function pointer. Without a pool (e.g. in GPU programs), the
+  // tasks run on the calling thread.
+  static void static_run(ThreadPool *pool,
+                         int splits,
+                         int desired_num_threads,
+                         void *context,
+                         CPUTaskFunc *func) {
+    if (pool == nullptr) {
+      for (int i = 0; i < splits; i++)
+        func(context, i);
+      return;
     }
-#else
-    TC_NOT_IMPLEMENTED
-#endif
+    pool->run(splits, desired_num_threads, context, func);
   }
 
-  template <typename T>
-  void static run(const T &target, int end, int num_threads) {
-    return run(target, 0, end, num_threads);
-  }
+  ~ThreadPool();
 
-  template <typename T>
-  void static run(int begin, int end, int num_threads, const T &target) {
-    return run(target, begin, end, num_threads);
-  }
+ private:
+  void work();
 
-  template <typename T>
-  void static run(int end, int num_threads, const T &target) {
-    return run(target, 0, end, num_threads);
-  }
+  void target(int worker_id);
 };
-#endif
 
 class PID {
  public:
@@ -24,6 +24,7 @@
 #include "llvm/Bitcode/BitcodeReader.h"
 #include <llvm/Linker/Linker.h>
 #include <llvm/Demangle/Demangle.h>
+#include <xxhash.h>
 
 #include "tlang_util.h"
 #include "taichi_llvm_context.h"
@@ -33,7 +34,8 @@ TLANG_NAMESPACE_BEGIN
 
 static llvm::ExitOnError exit_on_err;
 
-TaichiLLVMContext::TaichiLLVMContext(Arch arch) : arch(arch) {
+TaichiLLVMContext::TaichiLLVMContext(Arch arch)
+    : struct_module_hash(0), arch(arch) {
   llvm::remove_fatal_error_handler();
   llvm::install_fatal_error_handler(
       [](void *user_data, const std::string &reason, bool gen_crash_diag) {
@@ -70,6 +72,12 @@ llvm::Type *TaichiLLVMContext::get_data_type(DataType dt) {
     return llvm::Type::getInt8Ty(*ctx);
   } else if (dt == DataType::i16) {
     return llvm::Type::getInt16Ty(*ctx);
+  } else if (dt == DataType::u8) {
+    return llvm::Type::getInt8Ty(*ctx);
+  } else if (dt == DataType::u16) {
+    return llvm::Type::getInt16Ty(*ctx);
+  } else if (dt == DataType::f16) {
+    return llvm::Type::getHalfTy(*ctx);
   } else if (dt == DataType::i64) {
     return llvm::Type::getInt64Ty(*ctx);
   } else if (dt == DataType::f32) {
@@ -340,6 +348,11 @@ void TaichiLLVMContext::set_struct_module(
     TC_ERROR("module broken");
   }
   struct_module = llvm::CloneModule(*module);
+  std::string module_str;
+  llvm::raw_string_ostream os(module_str);
+  struct_module->print(os, nullptr);
+  os.flush();
+  struct_module_hash = XXH64(module_str.data(), module_str.size(), 0);
 }
 
 template <typename T>
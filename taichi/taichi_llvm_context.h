@@ -14,6 +14,8 @@ class TaichiLLVMContext {
   std::unique_ptr<llvm::LLVMContext> ctx;
   std::unique_ptr<TaichiLLVMJIT> jit;
   std::unique_ptr<llvm::Module> runtime_module, struct_module;
+  // Identifies the SNode layout (and the runtime linked into it)
+  uint64 struct_module_hash;
   Arch arch;
 
   TaichiLLVMContext(Arch arch);
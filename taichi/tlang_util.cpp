@@ -2,6 +2,7 @@
 
 #include "tlang_util.h"
 #include <taichi/system/timer.h>
+#include <thread>
 
 TC_NAMESPACE_BEGIN
 
@@ -392,6 +393,11 @@ CompileConfig::CompileConfig() {
   verbose_kernel_launches = false;
   enable_profiler = false;
   default_gpu_block_dim = 64;
+  default_cpu_block_dim = 0;
+  cpu_max_num_threads = std::max(1u, std::thread::hardware_concurrency());
+  offline_cache = false;
+  offline_cache_path = "";  // defaults to [repo dir]/.tlang_cache/llvm
+  offline_cache_max_size = 1024ull * 1024 * 1024;
 }
 
 std::string CompileConfig::compiler_name() {
@@ -133,6 +133,16 @@ inline bool constexpr is_integral(DataType dt) {
          dt == DataType::i64;
 }
 
+// Narrow types in external arrays are computed as 32-bit types
+inline DataType widened_type(DataType dt) {
+  if (dt == DataType::i8 || dt == DataType::i16 || dt == DataType::u8 ||
+      dt == DataType::u16)
+    return DataType::i32;
+  if (dt == DataType::f16)
+    return DataType::f32;
+  return dt;
+}
+
 inline bool needs_grad(DataType dt) {
   return is_real(dt);
 }
@@ -341,6 +351,11 @@ struct CompileConfig {
   DataType gradient_dt;
   std::string extra_flags;
   int default_gpu_block_dim;
+  int default_cpu_block_dim;
+  int cpu_max_num_threads;
+  bool offline_cache;
+  std::string offline_cache_path;
+  uint64 offline_cache_max_size;
 
   CompileConfig();
 
@@ -8,8 +8,9 @@ TLANG_NAMESPACE_BEGIN
 class IRPrinter : public IRVisitor {
  public:
   int current_indent;
+  std::string *output;
 
-  IRPrinter() {
+  IRPrinter(std::string *output = nullptr) : output(output) {
     current_indent = 0;
   }
 
@@ -19,14 +20,26 @@ class IRPrinter : public IRVisitor {
   }
 
   void print_raw(std::string f) {
+    if (output) {
+      for (int i = 0; i < current_indent; i++)
+        *output += "  ";
+      *output += f;
+      *output += "\n";
+      return;
+    }
     for (int i = 0; i < current_indent; i++)
       fmt::print("  ");
     std::cout << f;
     fmt::print("\n");
   }
 
-  static void run(IRNode *node) {
-    auto p = IRPrinter();
+  static void run(IRNode *node, std::string *output) {
+    auto p = IRPrinter(output);
+    if (output) {
+      // Without the banner, so that the text can be used as a cache key
+      node->accept(&p);
+      return;
+    }
     fmt::print("==========\n");
     fmt::print("kernel {{\n");
     node->accept(&p);
@@ -85,6 +98,9 @@ class IRPrinter : public IRVisitor {
     if (stmt->val) {
       extras += ", " + stmt->val->name();
     }
+    if (stmt->ptr) {
+      extras += " node=" + stmt->ptr->name();
+    }
     std::string snodes;
     for (int l = 0; l < stmt->width(); l++) {
       snodes += stmt->snodes[l]->node_type_name;
@@ -261,7 +277,8 @@ class IRPrinter : public IRVisitor {
   }
 
   void visit(ArgLoadStmt *stmt) override {
-    print("{}{} = arg[{}]", stmt->type_hint(), stmt->name(), stmt->arg_id);
+    print("{}{} = arg[{}]{}", stmt->type_hint(), stmt->name(), stmt->arg_id,
+          stmt->is_ptr ? " (ptr)" : "");
   }
 
   void visit(FrontendArgStoreStmt *stmt) override {
@@ -375,14 +392,24 @@ class IRPrinter : public IRVisitor {
   void visit(OffloadedStmt *stmt) override {
     std::string details;
     if (stmt->task_type == stmt->range_for) {
-      details = fmt::format(" range_for({}, {})", stmt->begin, stmt->end);
+      auto begin = stmt->const_begin
+                       ? std::to_string(stmt->begin)
+                       : fmt::format("tmp(offset={}B)", stmt->begin_offset);
+      auto end = stmt->const_end
+                     ? std::to_string(stmt->end)
+                     : fmt::format("tmp(offset={}B)", stmt->end_offset);
+      details = fmt::format(" range_for({}, {}){} block_dim={} threads={}",
+                            begin, end,
+                            stmt->reversed ? " reversed" : "",
+                            stmt->block_dim, stmt->num_cpu_threads);
     } else if (stmt->task_type == stmt->struct_for) {
-      details =
-          fmt::format(" struct_for({})", stmt->snode->get_node_type_name());
+      details = fmt::format(" struct_for({}) block_dim={} threads={}",
+                            stmt->snode->get_node_type_name(), stmt->block_dim,
+                            stmt->num_cpu_threads);
     }
     if (stmt->task_type == OffloadedStmt::TaskType::listgen) {
-      print("{} = offloaded listgen {}", stmt->name(),
-            stmt->snode->get_node_type_name());
+      print("{} = offloaded listgen {} threads={}", stmt->name(),
+            stmt->snode->get_node_type_name(), stmt->num_cpu_threads);
     } else {
       print("{} = offloaded {} {{", stmt->name(), details);
       TC_ASSERT(stmt->body);
@@ -402,8 +429,8 @@ class IRPrinter : public IRVisitor {
 
 namespace irpass {
 
-void print(IRNode *root) {
-  return IRPrinter::run(root);
+void print(IRNode *root, std::string *output) {
+  return IRPrinter::run(root, output);
 }
 
 }  // namespace irpass
@@ -1,4 +1,5 @@
 #include "../ir.h"
+#include "../program.h"
 #include <deque>
 #include <set>
 
@@ -47,6 +48,36 @@ class LowerAccess : public IRVisitor {
     current_struct_for = nullptr;
   }
 
+  // Returns the linearized index of the cell of snode that contains indices
+  Stmt *lower_cell_index(VecStatement &lowered,
+                         SNode *snode,
+                         const std::vector<Stmt *> &indices) {
+    std::vector<Stmt *> lowered_indices;
+    std::vector<int> strides;
+    // extract bits
+    for (int k_ = 0; k_ < (int)indices.size(); k_++) {
+      for (int k = 0; k < max_num_indices; k++) {
+        if (snode->physical_index_position[k_] == k) {
+          int begin = snode->extractors[k].start;
+          int end = begin + snode->extractors[k].num_bits;
+          auto extracted = Stmt::make<OffsetAndExtractBitsStmt>(
+              indices[k_], begin, end, 0);
+          lowered_indices.push_back(extracted.get());
+          lowered.push_back(std::move(extracted));
+          if (snode->_packed)
+            strides.push_back(snode->extractors[k].shape);
+          else
+            strides.push_back(1 << snode->extractors[k].num_bits);
+        }
+      }
+    }
+    // linearize
+    auto linearized = Stmt::make<LinearizeStmt>(lowered_indices, strides);
+    auto ret = linearized.get();
+    lowered.push_back(std::move(linearized));
+    return ret;
+  }
+
   void lower_scalar_ptr(VecStatement &lowered,
                         SNode *snode,
                         std::vector<Stmt *> indices,
@@ -66,22 +97,7 @@ class LowerAccess : public IRVisitor {
     Stmt *last = nullptr;
     for (int i = 0; i < (int)snodes.size() - 1; i++) {
       auto snode = snodes[i];
-      std::vector<Stmt *> lowered_indices;
-      std::vector<int> strides;
-      // extract bits
-      for (int k_ = 0; k_ < (int)indices.size(); k_++) {
-        for (int k = 0; k < max_num_indices; k++) {
-          if (snode->physical_index_position[k_] == k) {
-            int begin = snode->extractors[k].start;
-            int end = begin + snode->extractors[k].num_bits;
-            auto extracted = Stmt::make<OffsetAndExtractBitsStmt>(
-                indices[k_], begin, end, 0);
-            lowered_indices.push_back(extracted.get());
-            lowered.push_back(std::move(extracted));
-            strides.push_back(1 << snode->extractors[k].num_bits);
-          }
-        }
-      }
+      auto linearized = lower_cell_index(lowered, snode, indices);
 
       bool on_loop_tree = nodes_on_loop.find(snode) != nodes_on_loop.end();
       if (on_loop_tree &&
@@ -104,18 +120,14 @@ class LowerAccess : public IRVisitor {
         }
       }
 
-      // linearize
-      auto linearized = Stmt::make<LinearizeStmt>(lowered_indices, strides);
-
       int chid = snode->child_id(snodes[i + 1]);
       auto lookup = Stmt::make<SNodeLookupStmt>(
-          snode, last, linearized.get(),
+          snode, last, linearized,
           snode->need_activation() && activate && !on_loop_tree,
           indices);  // if snode has no possibility of null child, set activate
       // = false
       auto get_ch = Stmt::make<GetChStmt>(lookup.get(), chid);
 
-      lowered.push_back(std::move(linearized));
       last = get_ch.get();
       lowered.push_back(std::move(lookup));
       lowered.push_back(std::move(get_ch));
@@ -176,6 +188,33 @@ class LowerAccess : public IRVisitor {
     }
   }
 
+  void visit(SNodeOpStmt *stmt) override {
+    if (!get_current_program().config.use_llvm || stmt->ptr != nullptr)
+      return;
+    if (stmt->op_type == SNodeOpType::append ||
+        stmt->op_type == SNodeOpType::probe) {
+      // Look up the node itself instead of one of its cells
+      VecStatement lowered;
+      lower_scalar_ptr(lowered, stmt->snodes[0], stmt->indices,
+                       stmt->op_type == SNodeOpType::append);
+      stmt->ptr = lowered.back().get();
+      stmt->add_operand(stmt->ptr);
+      stmt->parent->insert_before(stmt, std::move(lowered));
+      throw IRModified();
+    } else if (stmt->op_type == SNodeOpType::deactivate) {
+      // The node and the index of the cell to deactivate in it
+      VecStatement lowered;
+      lower_scalar_ptr(lowered, stmt->snodes[0], stmt->indices, false);
+      stmt->ptr = lowered.back().get();
+      stmt->add_operand(stmt->ptr);
+      stmt->cell_index =
+          lower_cell_index(lowered, stmt->snodes[0], stmt->indices);
+      stmt->add_operand(stmt->cell_index);
+      stmt->parent->insert_before(stmt, std::move(lowered));
+      throw IRModified();
+    }
+  }
+
   static void run(IRNode *node, bool lower_atomic) {
     LowerAccess inst(lower_atomic);
     while (true) {
@@ -1,5 +1,6 @@
 #include <set>
 #include "../ir.h"
+#include "../program.h"
 
 TLANG_NAMESPACE_BEGIN
 
@@ -7,7 +8,11 @@ namespace irpass {
 
 class Offloader {
  public:
-  Offloader(IRNode *root) {
+  // Global temporaries holding non-constant range-for bounds
+  std::map<Stmt *, std::size_t> bound_offsets;
+  std::size_t global_offset;
+
+  Offloader(IRNode *root) : global_offset(0) {
     run(root);
   }
 
@@ -28,11 +33,57 @@ class Offloader {
         [&]() { return Stmt::make<LoopIndexStmt>(index, is_struct_for); });
   }
 
+  static int get_num_cpu_threads(int parallelize) {
+    auto max_num_threads = get_current_program().config.cpu_max_num_threads;
+    if (parallelize) {
+      return std::min(parallelize, max_num_threads);
+    } else {
+      return max_num_threads;
+    }
+  }
+
+  // Range-for bounds that are not constants are evaluated in the serial
+  // tasks and passed to the range-for task through global temporaries, so
+  // that the loop does not need to be recompiled when they change.
+  void allocate_bound(Stmt *bound) {
+    if (bound->is<ConstStmt>() ||
+        bound_offsets.find(bound) != bound_offsets.end())
+      return;
+    bound_offsets[bound] = global_offset;
+    global_offset += data_type_size(DataType::i32);
+  }
+
+  void store_bound(Stmt *bound, Block *serial_block) {
+    auto offset = bound_offsets.find(bound);
+    if (offset == bound_offsets.end())
+      return;
+    auto value = bound;
+    if (bound->ret_type.data_type != DataType::i32) {
+      auto cast = Stmt::make_typed<UnaryOpStmt>(UnaryOpType::cast, bound);
+      cast->cast_type = DataType::i32;
+      cast->cast_by_value = true;
+      value = cast.get();
+      serial_block->insert(std::move(cast));
+    }
+    auto ptr = Stmt::make_typed<GlobalTemporaryStmt>(
+        offset->second, VectorType(1, DataType::i32));
+    auto store = Stmt::make_typed<GlobalStoreStmt>(ptr.get(), value);
+    serial_block->insert(std::move(ptr));
+    serial_block->insert(std::move(store));
+  }
+
   void run(IRNode *root) {
     auto root_block = dynamic_cast<Block *>(root);
     auto root_statements = std::move(root_block->statements);
     root_block->statements.clear();
 
+    for (auto &stmt : root_statements) {
+      if (auto s = stmt->cast<RangeForStmt>()) {
+        allocate_bound(s->begin);
+        allocate_bound(s->end);
+      }
+    }
+
     auto pending_serial_statements =
         Stmt::make_typed<OffloadedStmt>(OffloadedStmt::TaskType::serial);
 
@@ -51,9 +102,21 @@ class Offloader {
         auto offloaded =
             Stmt::make_typed<OffloadedStmt>(OffloadedStmt::TaskType::range_for);
         offloaded->body = std::make_unique<Block>();
-        offloaded->begin = s->begin->as<ConstStmt>()->val[0].val_int32();
-        offloaded->end = s->end->as<ConstStmt>()->val[0].val_int32();
+        if (auto begin = s->begin->cast<ConstStmt>()) {
+          offloaded->begin = begin->val[0].val_int32();
+        } else {
+          offloaded->const_begin = false;
+          offloaded->begin_offset = bound_offsets[s->begin];
+        }
+        if (auto end = s->end->cast<ConstStmt>()) {
+          offloaded->end = end->val[0].val_int32();
+        } else {
+          offloaded->const_end = false;
+          offloaded->end_offset = bound_offsets[s->end];
+        }
         offloaded->block_dim = s->block_dim;
+        offloaded->reversed = s->reversed;
+        offloaded->num_cpu_threads = get_num_cpu_threads(s->parallelize);
         fix_loop_index_load(s, s->loop_var, 0, false);
         for (int j = 0; j < (int)s->body->statements.size(); j++) {
           offloaded->body->insert(std::move(s->body->statements[j]));
@@ -63,7 +126,10 @@ class Offloader {
         assemble_serial_statements();
         emit_struct_for(s, root_block);
       } else {
+        auto serial_stmt = stmt.get();
         pending_serial_statements->body->insert(std::move(stmt));
+        // Store the bound right after its definition, in the same task
+        store_bound(serial_stmt, pending_serial_statements->body.get());
       }
     }
     assemble_serial_statements();
@@ -87,6 +153,7 @@ class Offloader {
       auto offloaded_listgen =
           Stmt::make_typed<OffloadedStmt>(OffloadedStmt::TaskType::listgen);
       offloaded_listgen->snode = snode_child;
+      offloaded_listgen->num_cpu_threads = get_num_cpu_threads(0);
       root_block->insert(std::move(offloaded_listgen));
     }
 
@@ -104,6 +171,8 @@ class Offloader {
     }
 
     offloaded_struct_for->block_dim = for_stmt->block_dim;
+    offloaded_struct_for->num_cpu_threads =
+        get_num_cpu_threads(for_stmt->parallelize);
     offloaded_struct_for->snode = for_stmt->snode;
 
     root_block->insert(std::move(offloaded_struct_for));
@@ -135,10 +204,9 @@ public:
     return ret;
   }
 
-  IdentifyLocalVars() {
+  IdentifyLocalVars(std::size_t global_offset) : global_offset(global_offset) {
     allow_undefined_visitor = true;
     current_offloaded = nullptr;
-    global_offset = 0;
   }
 
   void visit(OffloadedStmt *stmt) override {
@@ -172,8 +240,9 @@ public:
     test_and_allocate(stmt->ptr);
   }
 
-  static std::map<Stmt *, std::size_t> run(IRNode *root) {
-    IdentifyLocalVars pass;
+  static std::map<Stmt *, std::size_t> run(IRNode *root,
+                                           std::size_t global_offset) {
+    IdentifyLocalVars pass(global_offset);
     root->accept(&pass);
     return pass.local_to_global;
   }
@@ -249,11 +318,13 @@ public:
 };
 
 void offload(IRNode *root) {
-  Offloader _(root);
+  Offloader offloader(root);
   irpass::typecheck(root);
   irpass::fix_block_parents(root);
   {
-    auto local_to_global = IdentifyLocalVars::run(root);
+    // Temporaries of promoted locals follow those of the range-for bounds
+    auto local_to_global =
+        IdentifyLocalVars::run(root, offloader.global_offset);
     PromoteLocals::run(root, local_to_global);
   }
   irpass::re_id(root);
@@ -44,6 +44,14 @@ class TypeCheck : public IRVisitor {
   }
 
   void visit(AtomicOpStmt *stmt) {
+    if (stmt->dest->is<ExternalPtrStmt>()) {
+      auto dt = stmt->dest->as<ExternalPtrStmt>()
+                    ->base_ptrs[0]
+                    ->ret_type.data_type;
+      TC_ERROR_IF(widened_type(dt) != dt,
+                  "Atomic operations on {} external arrays are not supported.",
+                  data_type_name(dt));
+    }
     auto ret_type = promoted_type(stmt->dest->ret_type.data_type,
                                   stmt->val->ret_type.data_type);
     if (ret_type != stmt->dest->ret_type.data_type) {
@@ -88,6 +96,12 @@ class TypeCheck : public IRVisitor {
   }
 
   void visit(SNodeOpStmt *stmt) {
+    if (stmt->op_type == SNodeOpType::append) {
+      auto dt = stmt->snodes[0]->ch[0]->dt;
+      if (stmt->val->ret_type.data_type != dt) {
+        stmt->val = insert_type_cast_before(stmt, stmt->val, dt);
+      }
+    }
     stmt->ret_type = VectorType(1, DataType::i32);
   }
 
@@ -264,13 +278,17 @@ class TypeCheck : public IRVisitor {
     auto arg = args[stmt->arg_id];
     auto arg_type = arg.dt;
     TC_ASSERT(arg.is_return_value);
-    TC_ASSERT(stmt->val->ret_type.data_type == arg_type);
+    if (stmt->val->ret_type.data_type != arg_type) {
+      stmt->val = insert_type_cast_before(stmt, stmt->val, arg_type);
+    }
     stmt->ret_type = VectorType(1, arg_type);
   }
 
   void visit(ExternalPtrStmt *stmt) {
-    stmt->ret_type = VectorType(stmt->base_ptrs.size(),
-                                stmt->base_ptrs[0]->ret_type.data_type);
+    // Narrow types are converted on loads and stores
+    stmt->ret_type =
+        VectorType(stmt->base_ptrs.size(),
+                   widened_type(stmt->base_ptrs[0]->ret_type.data_type));
   }
 
   void visit(LoopIndexStmt *stmt) {
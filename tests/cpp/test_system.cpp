@@ -6,6 +6,7 @@
 #include <taichi/util.h>
 #include <taichi/testing.h>
 #include <taichi/system/virtual_memory.h>
+#include <taichi/system/threading.h>
 
 TC_NAMESPACE_BEGIN
 
@@ -23,4 +24,21 @@ TC_TEST("Virtual Memory") {
 
 }
 
+TC_TEST("Thread Pool") {
+  ThreadPool pool(8);
+  for (int desired_num_threads : {1, 3, 8, 16}) {
+    for (int splits : {0, 1, 7, 1000}) {
+      std::vector<std::atomic<int>> counters(splits);
+      for (auto &c : counters)
+        c = 0;
+      pool.run(splits, desired_num_threads, &counters,
+               [](void *context, int task_id) {
+                 (*(std::vector<std::atomic<int>> *)context)[task_id]++;
+               });
+      for (auto &c : counters)
+        CHECK(c == 1);
+    }
+  }
+}
+
 TC_NAMESPACE_END
@@ -89,3 +89,111 @@ def test_f64():
   for i in range(n):
     for j in range(m):
       assert val[i, j] == (i + j * 3) * 2e100
+
+@ti.all_archs
+def test_gather_scatter_2d():
+  val = ti.var(ti.f32)
+
+  n = 16
+  m = 7
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.ij, (n, m)).place(val)
+
+  indices = np.array([[0, 0], [3, 5], [15, 6], [8, 2]])
+  val.scatter(indices, np.array([1, 2, 3, 4]))
+  assert val[3, 5] == 2
+  assert val[15, 6] == 3
+  assert val[3, 4] == 0
+
+  # Scalars are broadcast
+  val.scatter(indices[2:], 10)
+  arr = val.gather(indices)
+  assert arr.dtype == np.float32
+  assert list(arr) == [1, 2, 10, 10]
+
+@ti.all_archs
+def test_gather_1d():
+  val = ti.var(ti.i32)
+
+  n = 128
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.i, n).place(val)
+
+  val.from_numpy(np.arange(n, dtype=np.int32) * 3)
+  indices = np.arange(0, n, 5)
+  assert (val.gather(indices) == indices * 3).all()
+
+@ti.all_archs
+def test_gather_scatter_out_of_bounds():
+  val = ti.var(ti.i32)
+
+  n = 16
+  m = 7
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.ij, (n, m)).place(val)
+
+  for indices in [[[0, 0], [3, 7]], [[-1, 0]], [[2**32, 0]]]:
+    try:
+      val.gather(np.array(indices))
+    except AssertionError:
+      pass
+    else:
+      assert False, 'Indices {} must be rejected'.format(indices)
+    try:
+      val.scatter(np.array(indices), 1)
+    except AssertionError:
+      pass
+    else:
+      assert False, 'Indices {} must be rejected'.format(indices)
+  assert val[0, 0] == 0
+
+@ti.all_archs
+def test_matrix_to_numpy():
+  mat = ti.Matrix(2, 3, dt=ti.f32)
+
+  n = 4
+  m = 7
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.ij, (n, m)).place(mat)
+
+  for i in range(n):
+    for j in range(m):
+      for p in range(2):
+        for q in range(3):
+          mat(p, q)[i, j] = i + j * 3 + p * 10 + q * 100
+
+  arr = mat.to_numpy()
+  assert arr.shape == (n, m, 2, 3)
+  for i in range(n):
+    for j in range(m):
+      for p in range(2):
+        for q in range(3):
+          assert arr[i, j, p, q] == i + j * 3 + p * 10 + q * 100
+
+  mat.from_numpy(arr * 2)
+  assert mat(1, 2)[3, 5] == (3 + 15 + 10 + 200) * 2
+
+@ti.all_archs
+def test_vector_from_numpy():
+  vec = ti.Vector(3, dt=ti.i32)
+
+  n = 16
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.i, n).place(vec)
+
+  arr = np.arange(n * 3, dtype=np.int32).reshape(n, 3)
+  vec.from_numpy(arr)
+  for i in range(n):
+    for p in range(3):
+      assert vec(p)[i] == i * 3 + p
+  assert (vec.to_numpy() == arr.reshape(n, 3, 1)).all()
@@ -0,0 +1,76 @@
+import taichi as ti
+
+@ti.all_archs
+def test_pointer_deactivate():
+  if ti.get_os_name() == 'win':
+    return
+  x = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+
+  n = 16
+  block = None
+
+  @ti.layout
+  def place():
+    nonlocal block
+    block = ti.root.dense(ti.i, n).pointer()
+    block.dense(ti.i, n).place(x)
+    ti.root.place(s)
+
+  @ti.kernel
+  def count():
+    for i in x:
+      ti.atomic_add(s[None], 1)
+
+  x[0] = 1
+  x[n * 3] = 2
+
+  count()
+  assert s[None] == n * 2
+
+  block.deactivate_all()
+  s[None] = 0
+  count()
+  assert s[None] == 0
+
+  # Recycled nodes are reused and read as zero
+  for k in range(4):
+    x[n * 5 + 1] = k + 1
+    assert x[n * 5] == 0
+    assert x[n * 5 + 1] == k + 1
+    s[None] = 0
+    count()
+    assert s[None] == n
+    block.deactivate_all()
+
+
+@ti.all_archs
+def test_dynamic_deactivate():
+  if ti.get_os_name() == 'win':
+    return
+  x = ti.var(ti.i32)
+
+  n = 128
+  block = None
+
+  @ti.layout
+  def place():
+    nonlocal block
+    block = ti.root.dense(ti.i, 4)
+    block.dynamic(ti.j, n, 16).place(x)
+
+  for i in range(4):
+    for j in range(n):
+      x[i, j] = i * n + j + 1
+
+  block.deactivate_all()
+
+  # Recycled chunks are reused and read as zero
+  m = n // 2
+  for i in range(4):
+    x[i, m - 1] = m
+    for j in range(m - 1):
+      assert x[i, j] == 0
+      x[i, j] = j + 1
+    for j in range(m):
+      assert x[i, j] == j + 1
@@ -0,0 +1,73 @@
+import taichi as ti
+import numpy as np
+
+
+# An array of another library that only exposes DLPack
+class DLPackOnly:
+  def __init__(self, arr):
+    self.arr = arr
+
+  def __dlpack__(self, stream=None):
+    return self.arr.__dlpack__()
+
+  def __dlpack_device__(self):
+    return self.arr.__dlpack_device__()
+
+
+@ti.host_arch
+def test_dlpack_ext_arr():
+  if not hasattr(np.ndarray, '__dlpack__'):
+    return
+  n, m = 4, 6
+
+  @ti.kernel
+  def square(arr: ti.ext_arr()):
+    for i in range(n):
+      for j in range(m):
+        arr[i, j] = arr[i, j] * arr[i, j]
+
+  a = np.arange(n * 2 * m, dtype=np.float32).reshape(n, 2 * m)
+  expected = a.copy()
+  expected[:, ::2] **= 2
+  # Strided arrays are accessed in place
+  square(DLPackOnly(a[:, ::2]))
+  assert (a == expected).all()
+
+
+@ti.host_arch
+def test_dlpack_export():
+  if not hasattr(np, 'from_dlpack'):
+    return
+  x = ti.var(ti.i32)
+  n, m = 8, 6
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.ij, (n, m)).place(x)
+
+  @ti.kernel
+  def fill():
+    for i, j in x:
+      x[i, j] = i * m + j
+
+  fill()
+  arr = np.from_dlpack(x)
+  assert arr.shape == (n, m)
+  assert arr.dtype == np.int32
+  assert (arr == np.arange(n * m).reshape(n, m)).all()
+
+  # The array shares memory with the tensor
+  arr[2, 3] = -1
+  assert x[2, 3] == -1
+
+  # The memory stays valid until the array is released
+  try:
+    ti.reset()
+  except AssertionError:
+    pass
+  else:
+    assert False, 'ti.reset() must fail while exported arrays are alive'
+  fill()
+  assert arr[2, 3] == 2 * m + 3
+  del arr
+  ti.reset()
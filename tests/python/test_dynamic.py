@@ -40,3 +40,83 @@ def test_dynamic2():
   
   for i in range(n):
     assert x[i] == i
+
+
+@ti.all_archs
+def test_dynamic_small_chunks():
+  x = ti.var(ti.i32)
+  y = ti.var(ti.f32)
+  n = 1024
+
+  @ti.layout
+  def place():
+    ti.root.dynamic(ti.i, n, 4).place(x, y)
+
+  for i in range(n):
+    x[i] = i * 2
+    y[i] = i + 0.5
+
+  for i in reversed(range(n)):
+    assert x[i] == i * 2
+    assert y[i] == i + 0.5
+
+
+@ti.all_archs
+def test_append_parallel():
+  x = ti.var(ti.i32)
+  l = ti.var(ti.i32)
+  n = 1024
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, 4).dynamic(ti.j, n, 32).place(x)
+    ti.root.dense(ti.i, 4).place(l)
+
+  @ti.kernel
+  def fill():
+    # One more than the capacity of each list
+    for k in range(n * 4 + 4):
+      ti.append(x, k % 4, k)
+
+  @ti.kernel
+  def get_len():
+    for i in range(4):
+      l[i] = ti.length(x, i)
+
+  fill()
+  get_len()
+
+  for i in range(4):
+    assert l[i] == n
+    values = set(x[i, j] for j in range(n))
+    assert len(values) == n
+    for v in values:
+      assert v % 4 == i
+
+
+@ti.all_archs
+def test_dynamic_struct_for_partial():
+  x = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+  n = 128
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, 4).dynamic(ti.j, n, 8).place(x)
+    ti.root.place(s)
+
+  @ti.kernel
+  def fill():
+    for i in range(4):
+      for k in range(i * 5):
+        ti.append(x, i, k + 1)
+
+  @ti.kernel
+  def total():
+    # Only the appended cells are visited
+    for i, j in x:
+      ti.atomic_add(s[None], 1)
+
+  fill()
+  total()
+  assert s[None] == 5 * (0 + 1 + 2 + 3)
@@ -0,0 +1,143 @@
+import taichi as ti
+
+@ti.all_archs
+def test_hash_struct_for():
+  if ti.get_os_name() == 'win':
+    return
+  x = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.hash(ti.ij, 1024, table_size=64).dense(ti.ij, 4).place(x)
+    ti.root.place(s)
+
+  @ti.kernel
+  def count():
+    for i, j in x:
+      ti.atomic_add(s[None], 1)
+
+  x[0, 0] = 1
+  x[4000, 17] = 2
+  x[4095, 4095] = 3
+
+  count()
+  assert s[None] == 3 * 16
+  assert x[0, 0] == 1
+  assert x[4000, 17] == 2
+  assert x[4001, 17] == 0
+  assert x[4095, 4095] == 3
+
+
+@ti.all_archs
+def test_hash_parallel_activate():
+  if ti.get_os_name() == 'win':
+    return
+  x = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+  n = 1000
+  block = None
+
+  @ti.layout
+  def place():
+    nonlocal block
+    block = ti.root.hash(ti.i, 1 << 20)
+    block.dense(ti.i, 8).place(x)
+    ti.root.place(s)
+
+  @ti.kernel
+  def activate():
+    for k in range(n):
+      x[k * 4099] = k + 1
+
+  @ti.kernel
+  def total():
+    for i in x:
+      ti.atomic_add(s[None], x[i])
+
+  activate()
+  total()
+  assert s[None] == n * (n + 1) // 2
+  for k in range(0, n, 97):
+    assert x[k * 4099] == k + 1
+
+  block.deactivate_all()
+  s[None] = 0
+  total()
+  assert s[None] == 0
+
+
+@ti.all_archs
+def test_hash_moving_window():
+  if ti.get_os_name() == 'win':
+    return
+  x = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+  window = 8
+  block = None
+
+  @ti.layout
+  def place():
+    nonlocal block
+    block = ti.root.hash(ti.i, 4096, table_size=16)
+    block.dense(ti.i, 4).place(x)
+    ti.root.place(s)
+
+  @ti.kernel
+  def advance(t: ti.i32):
+    # The table is never empty, so the slots of deactivated cells must be
+    # reused for the 100 distinct cells to fit in 16 slots
+    x[(t + window) * 4] = t + window + 1
+    ti.deactivate(block, [t * 4])
+
+  @ti.kernel
+  def count():
+    for i in x:
+      ti.atomic_add(s[None], 1)
+
+  for t in range(window):
+    x[t * 4] = t + 1
+
+  for t in range(100):
+    advance(t)
+
+  count()
+  assert s[None] == window * 4
+  for t in range(100, 100 + window):
+    assert x[t * 4] == t + 1
+  assert x[99 * 4] == 0
+
+
+@ti.all_archs
+def test_hash_unbounded_indices():
+  if ti.get_os_name() == 'win':
+    return
+  x = ti.var(ti.i32)
+  si = ti.var(ti.i32)
+  sj = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.hash(ti.ij, 16, table_size=8).dense(ti.ij, 4).place(x)
+    ti.root.place(si, sj)
+
+  @ti.kernel
+  def total():
+    for i, j in x:
+      if x[i, j] != 0:
+        ti.atomic_add(si[None], i)
+        ti.atomic_add(sj[None], j)
+
+  # Indices beyond the dimensions of the hash node, or negative, do not wrap
+  x[-5001, 10**8] = 1
+  x[10**8, -3] = 2
+  x[7, 7] = 3
+
+  total()
+  assert si[None] == -5001 + 10**8 + 7
+  assert sj[None] == 10**8 - 3 + 7
+  assert x[-5001, 10**8] == 1
+  assert x[10**8, -3] == 2
+  assert x[7, 7] == 3
+  assert x[-5001 + 64, 10**8] == 0
+  assert x[10**8 - 64, -3] == 0
@@ -0,0 +1,63 @@
+import taichi as ti
+
+
+@ti.all_archs
+def test_return_scalar():
+  @ti.kernel
+  def add_i32(a: ti.i32, b: ti.i32) -> ti.i32:
+    return a + b
+
+  @ti.kernel
+  def half(a: ti.f32) -> ti.f64:
+    return a * 0.5
+
+  assert add_i32(3, -7) == -4
+  assert half(5) == 2.5
+
+
+@ti.all_archs
+def test_return_reduction():
+  x = ti.var(ti.f32)
+  s = ti.var(ti.f32)
+
+  n = 128
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(x)
+    ti.root.place(s)
+
+  @ti.kernel
+  def fill():
+    for i in x:
+      x[i] = i
+
+  @ti.kernel
+  def total() -> ti.f32:
+    for i in x:
+      ti.atomic_add(s[None], x[i])
+    return s[None]
+
+  fill()
+  assert total() == n * (n - 1) / 2
+
+
+@ti.all_archs
+def test_return_vector():
+  @ti.kernel
+  def pack(a: ti.f32, b: ti.f32) -> (ti.f32, ti.i32, ti.f32):
+    v = ti.Vector([a + b, 3, a * b])
+    return v
+
+  assert pack(2, 3) == (5, 3, 6)
+
+
+@ti.must_throw(ti.TaichiSyntaxError)
+def test_return_in_branch():
+  @ti.kernel
+  def func(a: ti.i32) -> ti.i32:
+    if a > 0:
+      return 1
+    return 0
+
+  func(1)
@@ -0,0 +1,100 @@
+import taichi as ti
+import numpy as np
+
+
+@ti.all_archs
+def test_capture_replay():
+  n = 16
+  x = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(x)
+
+  @ti.kernel
+  def add(k: ti.i32):
+    for i in range(n):
+      x[i] += k
+
+  @ti.kernel
+  def double():
+    for i in range(n):
+      x[i] *= 2
+
+  with ti.capture() as g:
+    add(1)
+    double()
+  assert len(g) == 2
+  for i in range(n):
+    assert x[i] == 2
+
+  g.replay(3)
+  for i in range(n):
+    assert x[i] == 62
+
+
+@ti.all_archs
+def test_capture_ext_arr():
+  n = 4
+
+  @ti.kernel
+  def inc(arr: ti.ext_arr()):
+    for i in range(n):
+      arr[i] += 1
+
+  a = np.zeros(n, dtype=np.int32)
+  with ti.capture() as g:
+    inc(a)
+  g.replay(4)
+  for i in range(n):
+    assert a[i] == 5
+
+
+@ti.host_arch
+def test_capture_rejects_copied_views():
+  n = 4
+
+  @ti.kernel
+  def inc(arr: ti.ext_arr()):
+    for i in range(n):
+      arr[i] += 1
+
+  a = np.zeros(n, dtype=np.int32)
+  try:
+    with ti.capture():
+      inc(a[::-1])
+  except AssertionError:
+    pass
+  else:
+    assert False, 'Views with negative strides must not be captured'
+  # Views accessed in place can still be captured
+  with ti.capture() as g:
+    inc(a[::2])
+  g.replay(2)
+  assert list(a) == [3, 0, 3, 0]
+
+
+@ti.all_archs
+def test_capture_skips_host_access():
+  n = 4
+  x = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(x)
+
+  @ti.kernel
+  def inc():
+    for i in range(n):
+      x[i] += 1
+
+  with ti.capture() as g:
+    x[0] = 10
+    inc()
+    assert x[0] == 11
+    arr = x.to_numpy()
+    x.from_numpy(arr)
+  assert len(g) == 1
+  g.replay(2)
+  assert x[0] == 13
+  assert x[1] == 3
@@ -0,0 +1,57 @@
+import taichi as ti
+
+@ti.all_archs
+def test_listgen_sparse():
+  x = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+  n = 256
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.ij, 4).pointer().dense(ti.ij, 4).pointer().dense(
+        ti.ij, n // 16).place(x)
+    ti.root.place(s)
+
+  @ti.kernel
+  def activate():
+    for i in range(n):
+      x[i, (i * 7) % n] = 1
+
+  @ti.kernel
+  def count():
+    for i, j in x:
+      ti.atomic_add(s[None], x[i, j])
+
+  activate()
+  count()
+  assert s[None] == n
+
+
+@ti.all_archs
+def test_listgen_child_offset():
+  # The listed node is not the first child of its parent
+  x = ti.var(ti.i32)
+  y = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+  n = 64
+
+  @ti.layout
+  def place():
+    block = ti.root.dense(ti.i, n // 8)
+    block.dense(ti.i, 8).place(x)
+    block.pointer().dense(ti.i, 8).place(y)
+    ti.root.place(s)
+
+  @ti.kernel
+  def activate():
+    for i in range(n // 2):
+      y[i * 2] = i
+
+  @ti.kernel
+  def count():
+    for i in y:
+      ti.atomic_add(s[None], 1)
+
+  activate()
+  count()
+  assert s[None] == n
@@ -79,3 +79,51 @@ def test_nested_loops():
         x[0, 0] = i
 
   paint()
+
+
+@ti.all_archs
+def test_runtime_loop_bounds():
+  x = ti.var(ti.i32)
+  count = ti.var(ti.i32)
+  N = 256
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, N).place(x)
+    ti.root.place(count)
+
+  @ti.kernel
+  def fill(begin: ti.i32):
+    for i in range(begin, count[None]):
+      x[i] += 1
+
+  # The same compiled kernel handles different bounds
+  for begin, end in [(0, 10), (5, N), (20, 20)]:
+    count[None] = end
+    fill(begin)
+  for i in range(N):
+    assert x[i] == int(i < 10) + int(i >= 5)
+
+
+
+@ti.all_archs
+def test_runtime_loop_bounds_shared():
+  x = ti.var(ti.i32)
+  y = ti.var(ti.i32)
+  N = 64
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, N).place(x, y)
+
+  @ti.kernel
+  def fill(n: ti.i32):
+    for i in range(n):
+      x[i] = i
+    for i in range(n):
+      y[i] = x[i] * 2
+
+  fill(N // 2)
+  for i in range(N):
+    assert x[i] == (i if i < N // 2 else 0)
+    assert y[i] == (i * 2 if i < N // 2 else 0)
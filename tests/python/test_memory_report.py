@@ -0,0 +1,41 @@
+import taichi as ti
+
+@ti.all_archs
+def test_memory_report():
+  if ti.get_os_name() == 'win':
+    return
+  x = ti.var(ti.i32)
+
+  n = 16
+  block = None
+
+  @ti.layout
+  def place():
+    nonlocal block
+    block = ti.root.dense(ti.i, n).pointer()
+    block.dense(ti.i, n).place(x)
+
+  def pointer_stat():
+    stats = ti.memory_report(verbose=False)
+    return [s for s in stats if s['type'] == 'pointer'][0]
+
+  base = pointer_stat()
+  assert base['num_bytes'] == base['node_size'] * base['max_num_nodes']
+
+  x[0] = 1
+  x[n * 3] = 2
+  x[n * 5] = 3
+  stat = pointer_stat()
+  assert stat['num_active_nodes'] == base['num_active_nodes'] + 3
+  assert stat['max_num_nodes'] == base['max_num_nodes'] + 3
+
+  block.deactivate_all()
+  stat = pointer_stat()
+  assert stat['num_active_nodes'] == base['num_active_nodes']
+  # Recycled nodes are kept by the allocator
+  assert stat['max_num_nodes'] == base['max_num_nodes'] + 3
+
+  stats = ti.memory_report()
+  root = [s for s in stats if s['type'] == 'root'][0]
+  assert root['num_bytes'] > 0
+  assert stat['element_list_max_size'] >= 3
@@ -41,6 +41,61 @@ def test_numpy_i32():
 def test_numpy_i64():
   with_data_type(np.int64)
 
+@ti.all_archs
+def test_numpy_f16():
+  with_data_type(np.float16)
+
+@ti.all_archs
+def test_numpy_i8():
+  with_data_type(np.int8)
+
+@ti.all_archs
+def test_numpy_i16():
+  with_data_type(np.int16)
+
+@ti.all_archs
+def test_numpy_u8():
+  with_data_type(np.uint8)
+
+@ti.all_archs
+def test_numpy_u16():
+  with_data_type(np.uint16)
+
+@ti.all_archs
+def test_numpy_uint8_range():
+  n = 4
+
+  @ti.kernel
+  def invert(arr: ti.ext_arr()):
+    for i in range(n):
+      arr[i] = 255 - arr[i]
+
+  a = np.array([0, 1, 128, 255], dtype=np.uint8)
+  invert(a)
+  assert (a == np.array([255, 254, 127, 0], dtype=np.uint8)).all()
+
+@ti.host_arch
+def test_numpy_narrow_legacy_backend():
+  old_use_llvm = ti.cfg.use_llvm
+  ti.cfg.use_llvm = False
+  try:
+    n = 4
+
+    @ti.kernel
+    def invert(arr: ti.ext_arr()):
+      for i in range(n):
+        arr[i] = 255 - arr[i]
+
+    # The legacy backends do not convert narrow elements
+    try:
+      invert(np.zeros(n, dtype=np.uint8))
+    except AssertionError:
+      pass
+    else:
+      assert False, 'uint8 arrays must be rejected without LLVM'
+  finally:
+    ti.cfg.use_llvm = old_use_llvm
+
 @ti.all_archs
 def test_numpy_2d():
   val = ti.var(ti.i32)
@@ -160,3 +215,90 @@ def test_index_mismatch():
   val = ti.var(ti.i32, shape=(1, 2, 3))
   val[0, 0] = 1
 
+
+
+@ti.all_archs
+def test_numpy_non_contiguous():
+  n = 4
+  val = ti.var(ti.i32)
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.i, n).place(val)
+
+  @ti.kernel
+  def load(arr: ti.ext_arr()):
+    for i in range(n):
+      val[i] = arr[i]
+
+  a = np.arange(n * 2, dtype=np.int32)
+  # Strided views are read in place
+  load(a[::2])
+  for i in range(n):
+    assert val[i] == i * 2
+
+@ti.all_archs
+def test_numpy_strided_write():
+  n = 4
+  m = 6
+
+  @ti.kernel
+  def inc(arr: ti.ext_arr()):
+    for i in range(n):
+      for j in range(m):
+        arr[i, j] += i * 10 + j
+
+  a = np.zeros(shape=(m, n * 2), dtype=np.float32)
+  # A transposed and sliced view is written in place
+  inc(a.T[::2])
+  for i in range(n):
+    for j in range(m):
+      assert a[j, i * 2] == i * 10 + j
+      assert a[j, i * 2 + 1] == 0
+
+  b = np.zeros(shape=(n, m), dtype=np.float32)
+  # Views with negative strides are copied and written back
+  inc(b[::-1])
+  for i in range(n):
+    for j in range(m):
+      assert b[n - 1 - i, j] == i * 10 + j
+
+@ti.host_arch
+def test_numpy_strided_legacy_backend():
+  old_use_llvm = ti.cfg.use_llvm
+  ti.cfg.use_llvm = False
+  try:
+    n = 4
+
+    @ti.kernel
+    def inc(arr: ti.ext_arr()):
+      for i in range(n):
+        arr[i] += i + 1
+
+    a = np.zeros(n * 2, dtype=np.int32)
+    # The legacy backends ignore strides, so views are copied
+    inc(a[::2])
+    assert list(a) == [1, 0, 2, 0, 3, 0, 4, 0]
+  finally:
+    ti.cfg.use_llvm = old_use_llvm
+
+@ti.host_arch
+def test_numpy_read_only_copied_view():
+  n = 4
+  val = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(val)
+
+  @ti.kernel
+  def load(arr: ti.ext_arr()):
+    for i in range(n):
+      val[i] = arr[i]
+
+  a = np.arange(n, dtype=np.int32)
+  a.flags.writeable = False
+  # Copies of read-only views are not written back
+  load(a[::-1])
+  for i in range(n):
+    assert val[i] == n - 1 - i
@@ -0,0 +1,96 @@
+import taichi as ti
+import numpy as np
+
+@ti.host_arch
+def test_numpy_view_1d():
+  x = ti.var(ti.f32)
+
+  n = 100
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(x)
+
+  @ti.kernel
+  def fill():
+    for i in x:
+      x[i] = i * 2
+
+  fill()
+  view = x.numpy_view()
+  assert view.shape == (n,)
+  assert view.dtype == np.float32
+  for i in range(n):
+    assert view[i] == i * 2
+
+  # Writes go to the tensor
+  view[3] = -1
+  assert x[3] == -1
+
+@ti.host_arch
+def test_numpy_view_interleaved():
+  x = ti.var(ti.i32)
+  y = ti.var(ti.f64)
+
+  n, m = 8, 6
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.ij, (n, m)).place(x, y)
+
+  @ti.kernel
+  def fill():
+    for i, j in x:
+      x[i, j] = i * 10 + j
+      y[i, j] = i - j
+
+  fill()
+  vx = x.numpy_view()
+  vy = y.numpy_view()
+  assert vx.shape == (n, m)
+  for i in range(n):
+    for j in range(m):
+      assert vx[i, j] == i * 10 + j
+      assert vy[i, j] == i - j
+
+@ti.host_arch
+def test_numpy_view_blocked():
+  x = ti.var(ti.i32)
+
+  n = 16
+
+  @ti.layout
+  def place():
+    # Contiguous blocks along i, so a stride per index still exists
+    ti.root.dense(ti.i, n // 4).dense(ti.ij, (4, n)).place(x)
+
+  @ti.kernel
+  def fill():
+    for i, j in x:
+      x[i, j] = i * n + j
+
+  fill()
+  view = x.numpy_view()
+  assert view.shape == (n, n)
+  assert (view == np.arange(n * n).reshape(n, n)).all()
+
+
+@ti.host_arch
+def test_numpy_view_blocks_reset():
+  x = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, 8).place(x)
+
+  view = x.numpy_view()
+  try:
+    ti.reset()
+  except AssertionError:
+    pass
+  else:
+    assert False, 'ti.reset() must fail while views are alive'
+  view[2] = 5
+  assert x[2] == 5
+  del view
+  ti.reset()
@@ -0,0 +1,59 @@
+import taichi as ti
+import os
+import tempfile
+
+
+def run_fill(cache_dir, max_size=None):
+  cfg = ti.cfg
+  old = (cfg.offline_cache, cfg.offline_cache_path, cfg.offline_cache_max_size)
+  try:
+    ti.reset()
+    ti.cfg.arch = ti.x86_64
+    ti.cfg.offline_cache = True
+    ti.cfg.offline_cache_path = cache_dir
+    if max_size is not None:
+      ti.cfg.offline_cache_max_size = max_size
+    fill_and_check()
+  finally:
+    (cfg.offline_cache, cfg.offline_cache_path,
+     cfg.offline_cache_max_size) = old
+
+
+def fill_and_check():
+  n = 128
+  x = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(x)
+
+  @ti.kernel
+  def fill(k: ti.i32):
+    for i in range(n):
+      x[i] = i * k
+
+  fill(3)
+  for i in range(n):
+    assert x[i] == i * 3
+
+
+@ti.host_arch
+def test_offline_cache():
+  cache_dir = tempfile.mkdtemp()
+  run_fill(cache_dir)
+  entries = set(os.listdir(cache_dir))
+  assert any(f.endswith('.o') for f in entries)
+  assert any(f.endswith('.tasks') for f in entries)
+  # The second run loads the object instead of adding new entries
+  run_fill(cache_dir)
+  assert set(os.listdir(cache_dir)) == entries
+
+
+@ti.host_arch
+def test_offline_cache_eviction():
+  # The cache is never evicted on OSX
+  if ti.get_os_name() == 'osx':
+    return
+  cache_dir = tempfile.mkdtemp()
+  run_fill(cache_dir, max_size=1)
+  assert not any(f.endswith('.o') for f in os.listdir(cache_dir))
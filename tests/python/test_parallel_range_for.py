@@ -0,0 +1,63 @@
+import taichi as ti
+import numpy as np
+
+@ti.all_archs
+def test_parallel_range_for():
+  n = 1024 * 1024
+  val = ti.var(ti.i32)
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.i, n).place(val)
+
+  @ti.kernel
+  def fill():
+    ti.parallelize(8)
+    ti.block_dim(8)
+    for i in range(n):
+      val[i] = i
+
+  fill()
+  assert np.array_equal(val.to_numpy(), np.arange(n, dtype=np.int32))
+
+
+@ti.host_arch
+def test_parallel_range_for_atomics():
+  n = 100000
+  s = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.place(s)
+
+  @ti.kernel
+  def func():
+    for i in range(n):
+      ti.atomic_add(s[None], 1)
+
+  func()
+  assert s[None] == n
+
+
+@ti.host_arch
+def test_serial_range_for():
+  old_max_num_threads = ti.cfg.cpu_max_num_threads
+  ti.cfg.cpu_max_num_threads = 1
+  try:
+    n = 1024
+    val = ti.var(ti.i32)
+
+    @ti.layout
+    def values():
+      ti.root.dense(ti.i, n).place(val)
+
+    @ti.kernel
+    def fill():
+      for i in range(n):
+        val[i] = i * 2
+
+    fill()
+    for i in range(n):
+      assert val[i] == i * 2
+  finally:
+    ti.cfg.cpu_max_num_threads = old_max_num_threads
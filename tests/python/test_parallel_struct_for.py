@@ -0,0 +1,50 @@
+import taichi as ti
+
+def _test_struct_for_sum(grain_size, layout):
+  ti.cfg.default_cpu_block_dim = grain_size
+  x = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+  n = 1024 * 16
+
+  @ti.layout
+  def place():
+    layout(x, n)
+    ti.root.place(s)
+
+  @ti.kernel
+  def activate():
+    for i in range(n):
+      x[i] = i
+
+  @ti.kernel
+  def reduce():
+    for i in x:
+      ti.atomic_add(s[None], x[i] - i + 1)
+
+  activate()
+  reduce()
+  assert s[None] == n
+
+
+def dense_layout(x, n):
+  ti.root.dense(ti.i, n // 64).dense(ti.i, 64).place(x)
+
+
+def pointer_layout(x, n):
+  ti.root.dense(ti.i, n // 64).pointer().dense(ti.i, 64).place(x)
+
+
+def dynamic_layout(x, n):
+  ti.root.dynamic(ti.i, n, 256).place(x)
+
+
+@ti.host_arch
+def test_parallel_struct_for():
+  old_block_dim = ti.cfg.default_cpu_block_dim
+  try:
+    for layout in [dense_layout, pointer_layout, dynamic_layout]:
+      for grain_size in [0, 1, 16, 64, 512]:
+        ti.reset()
+        _test_struct_for_sum(grain_size, layout)
+  finally:
+    ti.cfg.default_cpu_block_dim = old_block_dim
@@ -0,0 +1,88 @@
+import taichi as ti
+import os
+import tempfile
+
+
+@ti.host_arch
+def test_precompile():
+  n = 16
+  x = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(x)
+
+  @ti.kernel
+  def fill(k: ti.i32):
+    for i in range(n):
+      x[i] = i * k
+
+  @ti.kernel
+  def add(t: ti.template(), k: ti.i32):
+    for i in range(n):
+      t[i] += k
+
+  ti.precompile([fill], templates={add: [(x, 0)]})
+  fill(2)
+  add(x, 1)
+  for i in range(n):
+    assert x[i] == i * 2 + 1
+
+
+@ti.host_arch
+def test_precompile_workers():
+  if not hasattr(os, 'fork'):
+    return
+  old = (ti.cfg.offline_cache, ti.cfg.offline_cache_path)
+  cache_dir = tempfile.mkdtemp()
+  try:
+    ti.cfg.offline_cache = True
+    ti.cfg.offline_cache_path = cache_dir
+    n = 16
+    x = ti.var(ti.i32)
+    y = ti.var(ti.i32)
+
+    @ti.layout
+    def place():
+      ti.root.dense(ti.i, n).place(x, y)
+
+    @ti.kernel
+    def fill(t: ti.template(), k: ti.i32):
+      for i in range(n):
+        t[i] = i * k
+
+    ti.precompile(templates={fill: [(x, 0), (y, 0)]}, num_workers=2)
+    # Both instances were compiled by the workers and loaded from the cache
+    assert len([f for f in os.listdir(cache_dir) if f.endswith('.o')]) == 2
+    assert ti.get_runtime().prog.get_offline_cache_hits() == 2
+    fill(x, 2)
+    fill(y, 3)
+    for i in range(n):
+      assert x[i] == i * 2
+      assert y[i] == i * 3
+  finally:
+    ti.cfg.offline_cache, ti.cfg.offline_cache_path = old
+
+
+@ti.host_arch
+def test_precompile_serial_warning():
+  import warnings
+  n = 16
+  x = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(x)
+
+  @ti.kernel
+  def fill(t: ti.template(), k: ti.i32):
+    for i in range(n):
+      t[i] = i * k
+
+  x[0] = 1
+  with warnings.catch_warnings(record=True) as w:
+    warnings.simplefilter('always')
+    ti.precompile(templates={fill: [(x, 0), (x, 1)]}, num_workers=2)
+  assert any('serially' in str(m.message) for m in w)
+  fill(x, 2)
+  assert x[3] == 6
@@ -27,7 +27,45 @@ def test_bitmasked():
 
   func()
   assert s[None] == 256
-  
+
+
+@ti.all_archs
+def test_bitmasked_sparse_words():
+  if ti.get_os_name() == 'win':
+    # This test not supported on Windows due to the VirtualAlloc issue #251
+    return
+  x = ti.var(ti.i32)
+  s = ti.var(ti.i32)
+
+  n = 1000
+  block = None
+
+  @ti.layout
+  def place():
+    nonlocal block
+    block = ti.root.dense(ti.i, n).bitmasked()
+    block.dense(ti.i, 4).place(x)
+    ti.root.place(s)
+
+  @ti.kernel
+  def func():
+    for i in x:
+      ti.atomic_add(s[None], x[i])
+
+  # Cells at word boundaries, within one word and in the last partial word
+  cells = [0, 63, 64, 65, 127, 128, 500, 511, 512, 998, 999]
+  for c in cells:
+    x[c * 4 + 1] = c + 1
+
+  func()
+  assert s[None] == sum(c + 1 for c in cells)
+
+  block.deactivate_all()
+  s[None] = 0
+  func()
+  assert s[None] == 0
+
+
 @ti.all_archs
 def test_pointer():
   if ti.get_os_name() == 'win':
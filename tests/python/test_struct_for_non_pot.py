@@ -49,3 +49,54 @@ def test_2d():
 
   for i in range(n):
     assert sum[None] == gt
+
+@ti.all_archs
+def test_packed_2d():
+  x = ti.var(ti.i32)
+  sum = ti.var(ti.i32)
+
+  n = 100
+  m = 19
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.ij, (n, m), packed=True).place(x)
+    ti.root.place(sum)
+
+  @ti.kernel
+  def fill():
+    for i, j in x:
+      x[i, j] = i * m + j
+
+  @ti.kernel
+  def accumulate():
+    for i, j in x:
+      ti.atomic_add(sum, x[i, j])
+
+  fill()
+  accumulate()
+
+  assert sum[None] == (n * m - 1) * n * m // 2
+  assert x[n - 1, m - 1] == n * m - 1
+  assert x[37, 5] == 37 * m + 5
+
+@ti.all_archs
+def test_packed_blocked():
+  x = ti.var(ti.i32)
+  sum = ti.var(ti.i32)
+
+  n = 75
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n, packed=True).dense(ti.i, 4).place(x)
+    ti.root.place(sum)
+
+  @ti.kernel
+  def accumulate():
+    for i in x:
+      ti.atomic_add(sum, i)
+
+  accumulate()
+
+  assert sum[None] == (n * 4 - 1) * n * 4 // 2
@@ -0,0 +1,76 @@
+import taichi as ti
+
+try:
+  import torch
+except ImportError:
+  torch = None
+
+
+@ti.host_arch
+def test_io_2d():
+  if torch is None:
+    return
+  n, m = 4, 6
+  x = ti.var(ti.f32)
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.ij, (n, m)).place(x)
+
+  t = torch.arange(n * m, dtype=torch.float32).view(n, m)
+  ti.from_torch(x, t)
+  for i in range(n):
+    for j in range(m):
+      assert x[i, j] == i * m + j
+
+  out = torch.zeros(n, m, dtype=torch.float32)
+  ti.to_torch(x, out)
+  assert torch.equal(out, t)
+
+
+@ti.host_arch
+def test_io_strided():
+  if torch is None:
+    return
+  n, m = 4, 6
+  x = ti.var(ti.i32)
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.ij, (n, m)).place(x)
+
+  t = torch.arange(n * m, dtype=torch.int32).view(m, n).t()
+  assert not t.is_contiguous()
+  ti.from_torch(x, t)
+  for i in range(n):
+    for j in range(m):
+      assert x[i, j] == t[i, j].item()
+
+  # Writes go to the original storage
+  base = torch.zeros(m, n, dtype=torch.int32)
+  ti.to_torch(x, base.t())
+  assert torch.equal(base.t(), t)
+
+
+@ti.host_arch
+def test_io_matrix():
+  if torch is None:
+    return
+  n = 4
+  x = ti.Matrix(2, 3, dt=ti.f32)
+
+  @ti.layout
+  def values():
+    ti.root.dense(ti.i, n).place(x)
+
+  t = torch.arange(n * 6, dtype=torch.float32).view(n, 2, 3)
+  ti.from_torch(x, t)
+  for i in range(n):
+    for p in range(2):
+      for q in range(3):
+        assert x(p, q)[i] == i * 6 + p * 3 + q
+
+  # The matrix dimensions of a transposed tensor cannot be merged in place
+  out = torch.zeros(n, 3, 2, dtype=torch.float32).transpose(1, 2)
+  ti.to_torch(x, out)
+  assert torch.equal(out, t)
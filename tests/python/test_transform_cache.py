@@ -0,0 +1,52 @@
+import taichi as ti
+from taichi.lang.kernel import transformed_code_cache
+
+
+@ti.host_arch
+def test_transform_cache():
+  n = 8
+  x = ti.var(ti.i32)
+  y = ti.var(ti.i32)
+
+  @ti.layout
+  def place():
+    ti.root.dense(ti.i, n).place(x, y)
+
+  @ti.func
+  def value(i):
+    return i * 2
+
+  @ti.kernel
+  def fill(t: ti.template()):
+    for i in t:
+      t[i] = value(i)
+
+  fill(x)
+  fill(y)
+  for i in range(n):
+    assert x[i] == i * 2
+    assert y[i] == i * 2
+
+  # Both instances share a single transformed AST
+  keys = [k for k in transformed_code_cache if k[0] == id(fill.func.__code__)]
+  assert len(keys) == 1
+
+
+@ti.host_arch
+def test_transform_cache_annotations():
+  def make_double(dt):
+    @ti.kernel
+    def double(a: dt) -> dt:
+      return a * 2
+    return double
+
+  double_i32 = make_double(ti.i32)
+  double_f32 = make_double(ti.f32)
+  assert double_i32(3) == 6
+  assert double_f32(1.25) == 2.5
+
+  # The kernels share a code object but not their annotations
+  code = double_i32.func.__code__
+  assert double_f32.func.__code__ is code
+  keys = [k for k in transformed_code_cache if k[0] == id(code)]
+  assert len(keys) == 2